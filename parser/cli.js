@@ -9,15 +9,18 @@ var cliHelper = require('./lib/cliHelper');
 var colors = require('colors');
 
 var exec = require('child_process').exec;
+var net = require('net');
 
 
 var options = {
     boolean: ['help', 'quiet', 'recursive'],
+    string: ['socket'],
     alias: {
         help: ['h'],
         in: ['i'],
         quiet: ['q'],
-        recursive: ['r']
+        recursive: ['r'],
+        socket: ['s']
     },
     default: {
         in: '../data/puzzles/',
@@ -44,6 +47,13 @@ var puzzlePaths = _.map(puzzleDirs, function (dir) {
     return [topDir, dir].join('');
 });
 
+// Parse with an already-running daemon ("./lib/parse.py --daemon"), rather than starting the parser for every run
+if (argv.socket) {
+    return parseViaDaemon(argv.socket, puzzlePaths, function (err) {
+        if (err) throw err;
+    });
+}
+
 var pyParser = './lib/parse.py';
 var pyArgs = ['-i'].concat(puzzlePaths, '2> /dev/null');
 
@@ -53,3 +63,49 @@ exec([pyParser].concat(pyArgs).join(' '), function (err, stdout, stderr) {
     console.log(stdout);
     // util.print(stdout);
 });
+
+
+/**
+ * Send each puzzle's clues to the parse daemon as a batch, and print the parses it sends back
+ * @param {string} socketPath     - The daemon's Unix socket
+ * @param {string[]} puzzlePaths  - Puzzle directories, each containing "entities.txt" and "clues.txt"
+ * @param {function} cb
+ */
+function parseViaDaemon(socketPath, puzzlePaths, cb) {
+    var client = net.connect(socketPath);
+    var callbacks = {};
+    var buffered = '';
+
+    client.setEncoding('utf8');
+    client.on('error', cb);
+    client.on('data', function (data) {
+        var lines = (buffered + data).split('\n');
+        buffered = lines.pop();
+        _.each(lines, function (line) {
+            var response = JSON.parse(line);
+            callbacks[response.id](response.error ? new Error(response.error) : null, response.results);
+        });
+    });
+
+    async.eachSeries(puzzlePaths, function (puzzlePath, next) {
+        var request = {
+            id: puzzlePath,
+            entities: cliHelper.readEntities([puzzlePath, 'entities.txt'].join('/')),
+            clues: cliHelper.readLines([puzzlePath, 'clues.txt'].join('/'))
+        };
+        callbacks[request.id] = function (err, results) {
+            if (err) return next(err);
+
+            console.log(puzzlePath.blue);
+            _.each(results, function (result, idx) {
+                console.log((idx + 1) + '. ' + result.clue);
+                console.log(result.parse ? '   ' + result.parse : ('   ' + result.error).red);
+            });
+            next();
+        };
+        client.write(JSON.stringify(request) + '\n');
+    }, function (err) {
+        client.end();
+        cb(err);
+    });
+}
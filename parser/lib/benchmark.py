@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+import os
+import sys
+import json
+import time
+import codecs
+import argparse
+import resource
+
+import parse
+from parse import PROMPT_COLORS
+
+# The puzzle tiers under the data directory, from the simplest to the hardest
+TIERS = ['puzzles', 'puzzlesEasy', 'puzzlesModerate', 'puzzlesChallenging', 'puzzlesAdvanced']
+
+# Parsing stages, as timed by parse.timed() (plus the fallbacks and backends, which include the stages within them)
+STAGES = ['dictionary', 'chunker', 'parse_sent', 'linkages', 'matching', 'entities', 'nerFallback', 'plainFallback',
+          'backend_chunker', 'backend_linkgrammar']
+
+argparser = argparse.ArgumentParser(description="Benchmark the Logic Puzzle parser against the puzzle corpus")
+argparser.add_argument('-i', '--input', type=str, default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data'),
+                       help='the data directory, containing a directory of puzzle directories for each tier')
+argparser.add_argument('-t', '--tiers', nargs="+", type=str, default=TIERS, help='the tiers of puzzles to benchmark')
+argparser.add_argument('-s', '--save', type=str, help='file to save the results to, as a JSON baseline')
+argparser.add_argument('-b', '--baseline', type=str, help='a JSON baseline (see "--save") to compare the results against')
+argparser.add_argument('--threshold', type=float, default=0.25,
+                       help='fraction by which a tier may be slower than the baseline before the benchmark fails')
+argparser.add_argument('--cache', type=str,
+                       help='linkage cache file to use. By default, the benchmark parses every clue with link-grammar')
+argparser.add_argument('--null-tiers', type=str, default=','.join(map(str, parse.DEFAULT_NULL_TIERS)),
+                       help='comma-separated maximum numbers of null links to parse each clue with, in order')
+argparser.add_argument('--max-linkages', type=int, default=None, help='maximum number of linkages to consider for each clue')
+argparser.add_argument('--time-limit', type=float, default=None, help='maximum number of seconds to spend parsing each clue')
+argparser.add_argument('--backends', type=str, default=','.join(parse.DEFAULT_BACKENDS),
+                       help='comma-separated backends to parse each clue with, in order ("chunker" and/or "linkgrammar")')
+argparser.add_argument('--ner-first', action="store_true",
+                       help='whether or not to parse each clue with its entities replaced by placeholder words first')
+
+
+# ************************************************************************************
+def benchmark(dataDir, tiers, options, cacheFile=None):
+    results = {'tiers': {}}
+
+    start = time.time()
+    p = parse.loadParser(parse.getParser())
+    results['dictionary'] = time.time() - start
+
+    if cacheFile:
+        options['cache'] = parse.LinkageCache(cacheFile, getattr(p, 'version', None))
+
+    for tier in tiers:
+        tierDir = os.path.join(dataDir, tier)
+        if not os.path.isdir(tierDir):
+            print PROMPT_COLORS['YELLOW'] + "Skipping missing tier: " + tierDir + PROMPT_COLORS['COLOR_NONE']
+            continue
+        results['tiers'][tier] = benchmarkTier(tierDir, p, options)
+
+    results['total'] = summarize(results['tiers'].values())
+    results['total']['stages']['dictionary'] = results['dictionary']
+    return results
+
+
+# ************************************************************************************
+def benchmarkTier(tierDir, p, options):
+    inputDirs = sorted(parse.get_immediate_subdirectories(tierDir))
+
+    parse.STATS.clear()
+    parse.TIMINGS.clear()
+    total, success = [0, 0]
+
+    # Keep the parser's own output out of the benchmark's
+    stdout = sys.stdout
+    sys.stdout = codecs.getwriter('utf8')(open(os.devnull, 'w'))
+    start = time.time()
+    try:
+        for inputDir in inputDirs:
+            total_i, success_i, fail_i = parse.main(inputDir, False, True, p, options)
+            total += total_i
+            success += success_i
+    finally:
+        wall = time.time() - start
+        sys.stdout = stdout
+
+    return {
+        'puzzles': len(inputDirs),
+        'sentences': total,
+        'success': success,
+        'wall': wall,
+        'peakMemory': peakMemory(),
+        'stages': dict((stage, parse.TIMINGS[stage]) for stage in STAGES if stage in parse.TIMINGS),
+        'stats': dict(parse.STATS)
+    }
+
+
+# ************************************************************************************
+def summarize(tierResults):
+    total = {'puzzles': 0, 'sentences': 0, 'success': 0, 'wall': 0.0, 'peakMemory': 0.0, 'stages': {}, 'stats': {}}
+    for result in tierResults:
+        for key in ['puzzles', 'sentences', 'success', 'wall']:
+            total[key] += result[key]
+        total['peakMemory'] = max(total['peakMemory'], result.get('peakMemory', 0.0))
+        for group in ['stages', 'stats']:
+            for key, value in result[group].items():
+                total[group][key] = total[group].get(key, 0) + value
+    return total
+
+
+# ************************************************************************************
+def printResults(results):
+    print PROMPT_COLORS['WHITE'] + "{0:<20} {1:>9} {2:>9} {3:>9} {4:>9} {5:>11} {6:>12} {7:>9}".format(
+        'Tier', 'Accuracy', 'Seconds', 'Sent/sec', 'ms/sent', 'Links/sent', 'Timeouts', 'Peak MB') + PROMPT_COLORS['COLOR_NONE']
+    for name, result in sorted(results['tiers'].items()) + [('TOTAL', results['total'])]:
+        print "{0:<20} {1:>8.1f}% {2:>9.2f} {3:>9.1f} {4:>9.1f} {5:>11.1f} {6:>12} {7:>9.1f}".format(
+            name, accuracy(result), result['wall'], throughput(result['sentences'], result['wall']),
+            1000 * throughput(result['wall'], result['sentences']),
+            throughput(float(result['stats'].get('linkages', 0)), result['sentences']), result['stats'].get('timeouts', 0),
+            result.get('peakMemory', 0.0))
+
+    print ""
+    print PROMPT_COLORS['WHITE'] + "{0:<20} {1:>9} {2:>9}".format('Stage', 'Seconds', 'Sent/sec') + PROMPT_COLORS['COLOR_NONE']
+    sentences = results['total']['sentences']
+    for stage in STAGES:
+        seconds = results['total']['stages'].get(stage, 0.0)
+        print "{0:<20} {1:>9.3f} {2:>9.1f}".format(stage, seconds, throughput(sentences, seconds))
+
+
+# ************************************************************************************
+# returns a list of the ways the results regressed against the baseline
+def compareResults(results, baseline, threshold):
+    regressions = []
+    named = sorted(results['tiers'].items())
+    if sorted(results['tiers']) == sorted(baseline['tiers']):
+        named.append(('TOTAL', results['total']))
+    for name, result in named:
+        base = baseline['total'] if name == 'TOTAL' else baseline['tiers'].get(name)
+        if not base:
+            continue
+
+        if accuracy(result) < accuracy(base):
+            regressions.append("{0}: accuracy dropped from {1:.1f}% to {2:.1f}%".format(name, accuracy(base), accuracy(result)))
+
+        slowdown = (result['wall'] / base['wall'] - 1) if base['wall'] else 0
+        if slowdown > threshold:
+            regressions.append("{0}: {1:.0f}% slower ({2:.2f}s, was {3:.2f}s)".format(
+                name, 100 * slowdown, result['wall'], base['wall']))
+
+    return regressions
+
+
+# ************************************************************************************
+def accuracy(result):
+    return (100.0 * result['success'] / result['sentences']) if result['sentences'] else 0.0
+
+
+# ************************************************************************************
+def throughput(count, seconds):
+    return (count / seconds) if seconds else 0.0
+
+
+# ************************************************************************************
+# returns the process's peak memory use so far, in MB. It never goes down, so benchmark the tiers from smallest to
+# largest (e.g. puzzles generated at increasing sizes, see generatePuzzles.py) to see how memory scales
+def peakMemory():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024.0 * 1024.0) if sys.platform == 'darwin' else peak / 1024.0
+
+
+# ************************************************************************************
+if __name__ == "__main__":
+    args = argparser.parse_args()
+
+    if args.time_limit:
+        parse.PARSER_OPTIONS['max_parse_time'] = int(parse.math.ceil(args.time_limit))
+    options = {
+        'cache': None,
+        'maxLinkages': args.max_linkages,
+        'timeLimit': args.time_limit,
+        'nullTiers': [int(tier) for tier in args.null_tiers.split(',')],
+        'writeActual': False,
+        'nerFirst': args.ner_first,
+        'backends': parse.getBackends(args.backends)
+    }
+
+    results = benchmark(args.input, args.tiers, options, args.cache)
+    printResults(results)
+
+    if args.save:
+        with open(args.save, 'w') as baselineFile:
+            json.dump(results, baselineFile, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as baselineFile:
+            baseline = json.load(baselineFile)
+        regressions = compareResults(results, baseline, args.threshold)
+
+        print ""
+        if regressions:
+            print PROMPT_COLORS['RED'] + '## FAILURE'
+            for regression in regressions:
+                print "   " + regression
+            print PROMPT_COLORS['COLOR_NONE']
+            sys.exit(1)
+
+        print PROMPT_COLORS['GREEN'] + '## SUCCESS' + PROMPT_COLORS['COLOR_NONE']
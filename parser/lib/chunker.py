@@ -0,0 +1,142 @@
+import re
+import itertools
+from linkageCache import Constituent, FlatLinkage
+
+# Word classes, for the words which aren't part of a known entity. Any other word is part of a noun phrase
+AUXILIARIES = set(['is', 'was', 'were', 'are', 'am', 'be', 'been', 'being', 'has', 'have', 'had', 'do', 'does', 'did',
+                   'will', 'would', 'can', 'could', 'should', "isn't", "wasn't", "weren't", "aren't", "hasn't",
+                   "haven't", "hadn't", "don't", "doesn't", "didn't", "won't", "wouldn't", "can't", "couldn't", 'not'])
+VERBS = set(['paid', 'sold', 'got', 'spoke', 'won', 'made', 'gave', 'came', 'went', 'found', 'run', 'ran', 'began',
+             'begins', 'sent', 'seen', 'saw', 'left', 'costs', 'cost', 'owns', 'requires', 'rents', 'starts', 'works',
+             'wins', 'cooks', 'took', 'bought', 'wrote', 'drove', 'ate', 'chose', 'held', 'taught', 'brought', 'built',
+             'build', 'kept', 'led', 'met', 'read', 'rode', 'sang', 'swam', 'told', 'wore', 'flew', 'drew', 'grew',
+             'threw', 'knew', 'put', 'lives', 'plays', 'sells', 'buys', 'takes', 'gets', 'makes', 'gives', 'goes',
+             'comes', 'leaves', 'holds', 'uses', 'needs', 'weighs', 'measures', 'stars', 'hosts', 'teaches', 'spent',
+             'order', 'work', 'leave', 'start', 'likes', 'hit', 'set', 'born', 'shot', 'dug', 'spun', 'stood'])
+NOT_VERBS = set(['hundred', 'red', 'bed', 'speed', 'seed', 'feed', 'breed', 'shed', 'sled', 'indeed', 'need',
+                 'weed', 'reed', 'steed', 'deed', 'naked', 'wicked', 'sacred', 'rugged', 'ragged', 'beloved'])
+PREPOSITIONS = set(['with', 'by', 'of', 'in', 'on', 'for', 'from', 'to', 'at', 'about', 'into', 'than', 'as', 'during',
+                    'per', 'under', 'over', 'near', 'across', 'through', 'without', 'within', 'since', 'until'])
+# Words which are either a preposition ("shaped like a turtle") or a verb ("they like")
+PREPOSITION_VERBS = set(['like'])
+WH_WORDS = set(['who', 'that', 'which', 'whose', 'whom'])
+
+# Words which compare one entity to another. Link-grammar makes them either adjective or adverb phrases
+COMPARATIVES = set(['more', 'less', 'fewer', 'larger', 'smaller', 'taller', 'shorter', 'higher', 'lower', 'older',
+                    'younger', 'farther', 'closer', 'further', 'nearer', 'longer', 'bigger', 'heavier', 'lighter',
+                    'cheaper', 'earlier', 'later', 'faster', 'slower', 'greater', 'wider', 'deeper', 'hotter', 'colder'])
+# Words which compare in time or place. Link-grammar makes them either prepositions or adverb phrases
+TEMPORALS = set(['before', 'after', 'ahead', 'behind'])
+# Words which modify a comparison, and so belong to its phrase
+MODIFIERS = set(['somewhat', 'sometime', 'sometimes', 'much', 'exactly', 'just', 'only', 'even', 'far'])
+
+# Sentences which have more than this many variants only get the first few, in order
+MAX_VARIANTS = 4
+
+PUNCTUATION = '.,;:!?"()'
+
+
+# ************************************************************************************
+# A rule-based chunker, for parsing clues without link-grammar
+#
+# Splits a sentence into the same flat constituents as a link-grammar linkage (see readConstituents in parse.py),
+# e.g. "Oliver paid 1 dollar more than Irene" => S, NP [Oliver], VP [paid], NP [1, dollar], ADJP [more], PP [than], NP [Irene]
+# using word lists rather than a grammar, so it's much quicker but only understands simpler sentences.
+# Known entities are never split between phrases.
+#
+# Some words could be in either of 2 phrases (e.g. comparatives are adjectives or adverbs), so a sentence's
+# chunks come in a few variants, much like link-grammar's several linkages of a sentence.
+#
+# spans - the (start, end, entity) spans of the sentence which are known entities (see EntityIndex.spans)
+# returns a FlatLinkage for each variant, most likely first
+def chunk(sentence, spans):
+    words = readWords(sentence, spans)
+
+    # The phrase types each word could be in, most likely first
+    choices = [classify(word, isEntity) for word, isEntity in words]
+
+    return [FlatLinkage(buildPhrases([word for word, isEntity in words], types))
+            for types in itertools.islice(itertools.product(*choices), MAX_VARIANTS)]
+
+
+# ************************************************************************************
+# returns (word, whether or not it's part of a known entity) for each of the sentence's words
+def readWords(sentence, spans):
+    words = []
+    end = 0
+    for spanStart, spanEnd, entity in spans:
+        words += [(word, False) for word in splitWords(sentence[end:spanStart])]
+        words += [(word, True) for word in sentence[spanStart:spanEnd].split()]
+        end = spanEnd
+    words += [(word, False) for word in splitWords(sentence[end:])]
+    return words
+
+
+def splitWords(text):
+    words = [word.strip(PUNCTUATION) for word in text.split()]
+    return [word for word in words if word and word not in ["'s", "'"]]
+
+
+# ************************************************************************************
+# returns the phrase types the word could be in, most likely first
+def classify(word, isEntity):
+    if isEntity:
+        return ['NP']
+
+    word = word.lower()
+    if word in WH_WORDS:
+        return ['WHNP']
+    if word in PREPOSITIONS:
+        return ['PP']
+    if word in COMPARATIVES:
+        return ['ADJP', 'ADVP']
+    if word in PREPOSITION_VERBS:
+        return ['PP', 'VP']
+    if word in TEMPORALS:
+        return ['PP', 'ADVP']
+    if word in MODIFIERS:
+        return ['MOD']
+    if word in AUXILIARIES or word in VERBS or isVerbForm(word):
+        return ['VP']
+    return ['NP']
+
+
+# ************************************************************************************
+# Regular past tense and participles (e.g. 'ordered', 'working'), which are verbs far more often than not
+VERB_FORM = re.compile(r"^[a-z]{2,}(ed|ing)$")
+
+
+def isVerbForm(word):
+    return bool(VERB_FORM.match(word)) and word not in NOT_VERBS
+
+
+# ************************************************************************************
+# Groups the words into phrases of their types, following link-grammar's flat constituents:
+#   - every clause starts with an S, and a relative clause with an SBAR (e.g. "who" => SBAR, WHNP [who], S)
+#   - consecutive noun words make up a single NP
+#   - each verb (auxiliary or not) and preposition is a phrase of its own
+#   - modifiers (e.g. 'somewhat') join the comparison they modify
+def buildPhrases(words, types):
+    parts = [Constituent('S', [])]
+    modifiers = []
+    for word, type in zip(words, types):
+        if type == 'MOD':
+            modifiers.append(word)
+            continue
+
+        if type == 'WHNP':
+            parts += [Constituent('SBAR', []), Constituent('WHNP', [word]), Constituent('S', [])]
+        elif type == 'NP' and parts[-1].type == 'NP':
+            parts[-1].words.append(word)
+        else:
+            parts.append(Constituent(type, [word]))
+
+        if modifiers and type in ['ADJP', 'ADVP']:
+            parts[-1].words[0:0] = modifiers
+        elif modifiers:
+            parts.insert(len(parts) - 1, Constituent('ADVP', modifiers))
+        modifiers = []
+
+    if modifiers:
+        parts.append(Constituent('ADVP', modifiers))
+    return parts
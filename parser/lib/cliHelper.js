@@ -69,6 +69,28 @@ function fileContent(file) {
     return fs.readFileSync(file, 'utf8');
 }
 
+/**
+ * Given a file path, return its non-empty lines
+ * @param {string} file
+ * @returns {string[]} The file's lines
+ */
+function readLines(file) {
+    return _.compact(fileContent(file).split('\n'));
+}
+
+/**
+ * Given an "entities.txt" file path, return its entities grouped by type
+ * @param {string} file - Entity types on the first line, then a blank line, then each type's entities on a line
+ * @returns {Object} Map of entity type to a list of its entities
+ */
+function readEntities(file) {
+    var sections = fileContent(file).split('\n\n');
+    var types = sections[0].split(', ');
+    return _.object(types, _.map(_.compact(sections[1].split('\n')), function (entities) {
+        return entities.split(', ');
+    }));
+}
+
 
 function inRange(start, stop) {
     return function checkInRange(val, idx) {
@@ -85,6 +107,7 @@ function printHelp(argv) {
     console.log("Usage: " + process.argv.slice(0, 2));
     console.log("\nOptions:");
     console.log("  --in (-i)            - Data directory from which to read Logic Puzzle data");
+    console.log("  --socket (-s)        - Unix socket of a running parse daemon (\"./lib/parse.py --daemon\") to parse with");
     console.log("\nFlags:");
     console.log("  --help (-h)          - Print usage");
     console.log("  --quiet (-q)         - Don't print any excess statements");
@@ -95,5 +118,7 @@ exports.listFlatFilesInDir = listFlatFilesInDir;
 exports.hasWhitelistedExtension = hasWhitelistedExtension;
 exports.fileSize = fileSize;
 exports.fileContent = fileContent;
+exports.readLines = readLines;
+exports.readEntities = readEntities;
 exports.inRange = inRange;
 exports.printHelp = printHelp;
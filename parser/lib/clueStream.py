@@ -0,0 +1,91 @@
+import json
+import collections
+
+
+# ************************************************************************************
+# Streams puzzle records from JSON lines, parsing each clue and writing its result as soon as it's parsed.
+#
+# Each input line is a puzzle record:
+#   {"id": "game1", "entities": {"Type": ["Entity", ...], ...}, "clues": ["...", ...]}
+# (or with a single "clue"), and each clue gets an output line, in input order:
+#   {"record": 0, "id": "game1", "index": 0, "clue": "...", "parse": "is(X, Y)", "error": null}
+#
+# 'record' is the record's line number in the input, so a run can be resumed from the record after the
+# last one in its output (any clues already written for a partially-written record are written again).
+# Only one record, plus at most 'window' parsed-but-unwritten clues, is held in memory at a time.
+#
+# Clues are parsed by 'worker' (called as worker((entitiesByType, clue, None))), which returns (parse, error),
+# either in this process or (given a pool) in the pool's worker processes.
+
+
+# ************************************************************************************
+# returns (record number, record, error) for each of the lines from offset on, where error is None unless the record's invalid
+def readRecords(lines, offset=0):
+    for recordNum, line in enumerate(lines):
+        if recordNum < offset or not line.strip():
+            continue
+
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict) or not isEntities(record.get('entities')):
+                raise ValueError('Records must have "entities": {"Type": ["Entity", ...], ...}')
+            clues = [record['clue']] if 'clue' in record else record.get('clues')
+            if not isinstance(clues, list) or not all(isinstance(clue, basestring) for clue in clues):
+                raise ValueError('Records must have a "clue" string or a "clues" list of strings')
+        except ValueError as e:
+            yield recordNum, None, str(e)
+            continue
+
+        yield recordNum, dict(record, clues=clues), None
+
+
+# ************************************************************************************
+# returns whether or not entitiesByType is a puzzle's entities, i.e. {"Type": ["Entity", ...], ...}
+def isEntities(entitiesByType):
+    return isinstance(entitiesByType, dict) and all(
+        isinstance(entityType, basestring) and isinstance(entities, list)
+        and all(isinstance(entity, basestring) for entity in entities)
+        for entityType, entities in entitiesByType.items())
+
+
+# ************************************************************************************
+# Parses the records' clues, writing a JSON line for each of them to outFile as soon as it (and every clue before it)
+# is parsed. Returns the number of clues written
+def streamResults(records, worker, outFile, pool=None, window=64):
+    pending = collections.deque()
+    written = 0
+
+    for recordNum, record, error in records:
+        if error:
+            pending.append(({'record': recordNum, 'id': None, 'error': error}, None))
+            record = {'clues': []}
+
+        for index, clue in enumerate(record['clues']):
+            result = {'record': recordNum, 'id': record.get('id'), 'index': index, 'clue': clue}
+            job = (record['entities'], clue, None)
+            pending.append((result, pool.apply_async(worker, (job,)) if pool else worker(job)))
+
+            # Write out whatever's ready, waiting on the oldest clue once the window's full
+            while pending and (len(pending) >= window or isReady(pending[0][1])):
+                written += writeResult(outFile, *pending.popleft())
+
+        while pending and isReady(pending[0][1]):
+            written += writeResult(outFile, *pending.popleft())
+
+    while pending:
+        written += writeResult(outFile, *pending.popleft())
+    return written
+
+
+# ************************************************************************************
+def isReady(task):
+    return task is None or isinstance(task, (list, tuple)) or task.ready()
+
+
+def writeResult(outFile, result, task):
+    if task is not None:
+        # NOTE: get() always has a timeout, since waiting without one can't be interrupted in Python 2
+        result['parse'], result['error'] = task if isinstance(task, (list, tuple)) else task.get(365 * 24 * 60 * 60)
+    outFile.write(json.dumps(result) + '\n')
+    outFile.flush()
+    return 1 if task is not None else 0
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+import os
+import sys
+import sqlite3
+import argparse
+
+# How many files to buffer up before writing them to the store
+DEFAULT_WRITE_BATCH = 500
+
+
+# ************************************************************************************
+# A corpus of puzzles packed into a single SQLite file, in place of a directory tree of small files
+#
+# Each puzzle is named by its directory's path relative to the corpus root (e.g. 'puzzlesEasy/puzzle01'),
+# and holds the same files its directory would (e.g. 'clues.txt', 'screenshot.png'), by name.
+# Writes are buffered, and written together in one transaction once 'writeBatch' files are buffered
+# (or on flush()), so a run over many puzzles doesn't pay for a transaction per file.
+#
+# Like the LinkageCache, several processes (e.g. "--jobs" workers) can safely share one store file.
+class CorpusStore(object):
+    def __init__(self, path, writeBatch=DEFAULT_WRITE_BATCH):
+        self.path = path
+        self.writeBatch = writeBatch
+        self.pending = []
+        self.db = None
+        self.pid = None
+
+    def connect(self):
+        # SQLite connections mustn't be shared with forked processes, so each process opens its own
+        if self.db and self.pid == os.getpid():
+            return self.db
+
+        self.db = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        self.db.text_factory = str
+        self.db.execute('CREATE TABLE IF NOT EXISTS files '
+                        '(puzzle TEXT NOT NULL, name TEXT NOT NULL, content BLOB NOT NULL, PRIMARY KEY (puzzle, name))')
+        self.pid = os.getpid()
+        self.pending = []  # Any pending writes belong to the parent process
+        return self.db
+
+    # returns the names of the puzzles (in order), optionally only those within the 'prefix' directory
+    def puzzles(self, prefix=None):
+        db = self.connect()
+        if not prefix:
+            rows = db.execute('SELECT DISTINCT puzzle FROM files ORDER BY puzzle')
+        else:
+            prefix = prefix.rstrip('/') + '/'
+            rows = db.execute('SELECT DISTINCT puzzle FROM files WHERE substr(puzzle, 1, ?) = ? ORDER BY puzzle',
+                              (len(prefix), prefix))
+        return [row[0] for row in rows]
+
+    # returns all of the puzzle's files, by name
+    def readPuzzle(self, puzzle):
+        self.flush()
+        rows = self.connect().execute('SELECT name, content FROM files WHERE puzzle = ?', (puzzle,))
+        return dict((name, str(content)) for name, content in rows)
+
+    def write(self, puzzle, name, content):
+        self.connect()
+        self.pending.append((puzzle, name, sqlite3.Binary(content)))
+        if len(self.pending) >= self.writeBatch:
+            self.flush()
+
+    # Writes any buffered files to the store
+    def flush(self):
+        if not self.pending:
+            return
+
+        db = self.connect()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            db.executemany('INSERT OR REPLACE INTO files (puzzle, name, content) VALUES (?, ?, ?)', self.pending)
+            db.execute('COMMIT')
+        except:
+            db.execute('ROLLBACK')
+            raise
+        self.pending = []
+
+    def close(self):
+        if self.db and self.pid == os.getpid():
+            self.flush()
+            self.db.close()
+        self.db = None
+
+    # Packs every puzzle directory (any directory with a clues.txt) under rootDir into the store
+    # returns the number of puzzles imported
+    def importDir(self, rootDir):
+        count = 0
+        for dirPath, dirNames, fileNames in os.walk(rootDir):
+            dirNames.sort()
+            if 'clues.txt' not in fileNames:
+                continue
+
+            puzzle = os.path.relpath(dirPath, rootDir).replace(os.sep, '/')
+            for name in sorted(fileNames):
+                with open(os.path.join(dirPath, name), 'rb') as puzzleFile:
+                    self.write(puzzle, name, puzzleFile.read())
+            count += 1
+
+        self.flush()
+        return count
+
+    # Unpacks the puzzles (optionally only those within the 'prefix' directory) into directories under rootDir
+    # returns the number of puzzles exported
+    def exportDir(self, rootDir, prefix=None):
+        puzzles = self.puzzles(prefix)
+        for puzzle in puzzles:
+            puzzleDir = os.path.join(rootDir, *puzzle.split('/'))
+            if not os.path.isdir(puzzleDir):
+                os.makedirs(puzzleDir)
+            for name, content in self.readPuzzle(puzzle).items():
+                with open(os.path.join(puzzleDir, name), 'wb') as puzzleFile:
+                    puzzleFile.write(content)
+        return len(puzzles)
+
+
+# ************************************************************************************
+# Converts between the directory layout (e.g. the data directory) and a corpus store
+argparser = argparse.ArgumentParser(description="Pack puzzle directories into a single-file corpus store, or unpack them")
+argparser.add_argument('command', choices=['import', 'export', 'list'],
+                       help='"import" the puzzle directories under DIR into STORE, "export" STORE\'s puzzles into directories '
+                            'under DIR, or "list" STORE\'s puzzles')
+argparser.add_argument('store', metavar='STORE', type=str, help='the corpus store file')
+argparser.add_argument('dir', metavar='DIR', type=str, nargs='?', help='the corpus\'s root directory (e.g. the data directory)')
+argparser.add_argument('-p', '--prefix', type=str, help='only export/list the puzzles within this directory (e.g. "puzzlesEasy")')
+
+if __name__ == "__main__":
+    args = argparser.parse_args()
+    store = CorpusStore(args.store)
+
+    if args.command == 'list':
+        for puzzle in store.puzzles(args.prefix):
+            print puzzle
+    elif not args.dir:
+        argparser.error('"' + args.command + '" needs a DIR')
+    elif args.command == 'import':
+        print "Imported {0} puzzles into {1}".format(store.importDir(args.dir), args.store)
+    else:
+        print "Exported {0} puzzles into {1}".format(store.exportDir(args.dir, args.prefix), args.dir)
+
+    store.close()
+    sys.exit()
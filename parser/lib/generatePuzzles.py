@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+import os
+import sys
+import random
+import argparse
+
+# The types of a generated puzzle, in order: the first is named, the rest are either categories (named by made up
+# words) or numbers (whose clues compare them). Puzzles with more types than this repeat the categories
+CATEGORY_TYPES = ['colors', 'towns', 'pets', 'drinks', 'sports', 'hobbies', 'flowers', 'cars', 'snacks', 'jobs']
+NUMBER_TYPES = {
+    # type: [first value, step, how a clue refers to an entity, comparison templates (lesser first), their comparisons,
+    #        unit of their quantifiers]
+    'years': [1950, 1, "the {noun} from {entity}", ["{a} was {n} {unit} before {b}.", "{b} was {n} {unit} after {a}."],
+              ['before', 'after'], 'year'],
+    'points': [10, 5, "the {noun} with {entity} points", ["{a} scored {n} {unit} lower than {b}.",
+                                                          "{b} scored {n} {unit} higher than {a}."],
+               ['lower', 'higher'], 'point'],
+}
+NUMBER_TYPE_ORDER = ['years', 'points']
+# Comparisons which the GridSolver can place without a quantifier (see COMPARISON_CONTEXTS), and how to say them
+UNQUANTIFIED = {'years': ["{a} was before {b}.", "{b} was after {a}."]}
+
+NOUN = 'entry'
+
+# Syllables of the made up names
+ONSETS = ['B', 'Br', 'C', 'Ch', 'D', 'Dr', 'F', 'G', 'Gr', 'H', 'J', 'K', 'L', 'M', 'N', 'P', 'Pr', 'R', 'S', 'St',
+          'T', 'Tr', 'V', 'W', 'Z']
+VOWELS = ['a', 'e', 'i', 'o', 'u', 'ai', 'ea', 'io', 'ou']
+CODAS = ['', 'n', 'r', 'l', 'm', 's', 'x', 'nd', 'rt', 'th']
+
+# Once propagation leaves no more than this many entities without a known row, search (with this many nodes) to see
+# if the solution is unique already
+SEARCH_UNKNOWN = 4
+SEARCH_NODES = 100
+
+# How often each kind of clue is generated
+CLUE_WEIGHTS = [('is', 1), ('either', 3), ('of', 2), ('different', 2), ('comparison', 4)]
+
+
+# ************************************************************************************
+# Generates a logic grid puzzle of any size, with its clues, their expected parses and its answers
+#
+# The clues use the sentence shapes the parser already knows (see PHRASE_MATCHERS and parseSpecialClause), e.g.
+#   "Brandol is the Kestra entry."                                 => is(Brandol, Kestra)
+#   "The entry from 1953 is either Vexil or the Morrun entry."     => is(1953, xor(Vexil, Morrun))
+#   "Of Brandol and Vexil, one is ... and the other is ..."        => is(xor(Brandol, Vexil), xor(..., ...))
+#   "Brandol, the Kestra entry and ... are all different entries." => not(Brandol, Kestra, ...)
+#   "Vexil was 2 years after the entry from 1951."                 => after(Vexil, 1951, 2 years)
+# and are all true of a random solution. Without a clue count, clues are added until the GridSolver (and, if it
+# needs to, the SearchSolver) proves the solution unique, so the puzzle is solvable.
+#
+# rng - a random.Random, so puzzles are reproducible from its seed
+class PuzzleGenerator(object):
+    def __init__(self, rng, typeCount, size):
+        if typeCount < 3 or size < 3:
+            raise ValueError('Puzzles need at least 3 types and 3 entities of each')
+        self.rng = rng
+        self.size = size
+
+        numberTypes = NUMBER_TYPE_ORDER[:max(1, typeCount - 2)]
+        categories = [CATEGORY_TYPES[t % len(CATEGORY_TYPES)] + repeat(t // len(CATEGORY_TYPES))
+                      for t in range(typeCount - 1 - len(numberTypes))]
+        self.types = ['names'] + categories + numberTypes
+
+        # Made up names can't clash with each other (or with the numbers)
+        names = set()
+        self.entities = []
+        for entityType in self.types:
+            if entityType in NUMBER_TYPES:
+                # The values start above the largest quantifier ((size - 1) * step), so no quantifier (e.g. "20 points
+                # lower") is also one of the type's entities, which the parser would read as a third entity
+                first, step = NUMBER_TYPES[entityType][:2]
+                first = max(first, step * size)
+                self.entities.append([str(first + step * i) for i in range(size)])
+                continue
+            entities = []
+            while len(entities) < size:
+                name = self.makeName()
+                if name not in names:
+                    names.add(name)
+                    entities.append(name)
+            self.entities.append(sorted(entities))
+        if len(set(sum(self.entities, []))) < typeCount * size:
+            raise ValueError('Too many entities for their names to all be different')
+
+        # The solution: rows[t][r] is the index of type t's entity in row r. Rows are in order of the first type
+        self.rows = [range(size)] + [rng.sample(range(size), size) for t in range(1, typeCount)]
+        self.clues = []
+
+    def makeName(self):
+        syllables = [self.rng.choice(ONSETS) + self.rng.choice(VOWELS) for i in range(self.rng.randint(2, 3))]
+        return (''.join(syllables) + self.rng.choice(CODAS)).capitalize()
+
+    # returns an entity's name and how a clue refers to it, e.g. ['1951', 'the entry from 1951']
+    def refer(self, t, row):
+        entity = self.entities[t][self.rows[t][row]]
+        if self.types[t] in NUMBER_TYPES:
+            return [entity, NUMBER_TYPES[self.types[t]][2].format(noun=NOUN, entity=entity)]
+        if t == 0:
+            return [entity, entity]
+        return [entity, "the {0} {1}".format(entity, NOUN)]
+
+    # returns a new [clue, expected parse], which is true of the solution
+    def makeClue(self):
+        kinds, weights = zip(*CLUE_WEIGHTS)
+        kind = weightedChoice(self.rng, kinds, weights)
+        typeCount = len(self.types)
+        rng = self.rng
+
+        if kind == 'is':
+            row = rng.randrange(self.size)
+            a, b = [self.refer(t, row) for t in rng.sample(range(typeCount), 2)]
+            return [sentence("{0} is {1}.", a[1], b[1]), "is({0}, {1})".format(a[0], b[0])]
+
+        if kind == 'either':
+            row, other = rng.sample(range(self.size), 2)
+            t, u, v = [rng.randrange(typeCount) for i in range(3)]
+            while u == t or v == t:
+                t, u, v = [rng.randrange(typeCount) for i in range(3)]
+            a, options = [self.refer(t, row), [self.refer(u, row), self.refer(v, other)]]
+            rng.shuffle(options)
+            return [sentence("{0} is either {1} or {2}.", a[1], options[0][1], options[1][1]),
+                    "is({0}, xor({1}, {2}))".format(a[0], options[0][0], options[1][0])]
+
+        if kind == 'of':
+            rows = rng.sample(range(self.size), 2)
+            t, u = rng.sample(range(typeCount), 2)
+            pair, others = [[self.refer(t, row) for row in rows], [self.refer(u, row) for row in rows]]
+            rng.shuffle(others)
+            return [sentence("Of {0} and {1}, one is {2} and the other is {3}.", pair[0][1], pair[1][1], others[0][1],
+                             others[1][1]),
+                    "is(xor({0}, {1}), xor({2}, {3}))".format(pair[0][0], pair[1][0], others[0][0], others[1][0])]
+
+        if kind == 'different':
+            count = min(rng.randint(3, 4), typeCount)
+            entities = [self.refer(t, row) for t, row in zip(rng.sample(range(typeCount), count),
+                                                             rng.sample(range(self.size), count))]
+            return [sentence("{0} and {1} are all different {2}.", ', '.join(entity[1] for entity in entities[:-1]),
+                             entities[-1][1], plural(NOUN)),
+                    "not({0})".format(', '.join(entity[0] for entity in entities))]
+
+        # Comparisons, by one of the number types
+        c = rng.choice([t for t in range(typeCount) if self.types[t] in NUMBER_TYPES])
+        first, step, reference, templates, comparisons, unit = NUMBER_TYPES[self.types[c]]
+        lesserRow, greaterRow = sorted(rng.sample(range(self.size), 2), key=lambda row: self.rows[c][row])
+        t, u = [rng.choice([t for t in range(typeCount) if t != c]) for i in range(2)]
+        a, b = [self.refer(t, lesserRow), self.refer(u, greaterRow)]
+        n = (self.rows[c][greaterRow] - self.rows[c][lesserRow]) * step
+        which = rng.randrange(2)
+        args = [a[0], b[0]] if which == 0 else [b[0], a[0]]
+
+        if self.types[c] in UNQUANTIFIED and rng.random() < 0.3:
+            return [sentence(UNQUANTIFIED[self.types[c]][which], a=a[1], b=b[1]),
+                    "{0}({1}, {2})".format(comparisons[which], args[0], args[1])]
+        units = unit if n == 1 else plural(unit)
+        return [sentence(templates[which], a=a[1], b=b[1], n=n, unit=units),
+                "{0}({1}, {2}, {3} {4})".format(comparisons[which], args[0], args[1], n, units)]
+
+    # Adds clues until there are 'count' of them, or (without a count) until the solution is unique
+    # returns whether or not the solution is known to be unique
+    def generate(self, count=None, maxClues=None):
+        if count:
+            while len(self.clues) < count:
+                self.addClue()
+            return False
+
+        import gridSolver
+        import searchSolver
+        solver = gridSolver.GridSolver(self.types, dict(zip(self.types, self.entities)))
+        maxClues = maxClues or 10 * self.size * len(self.types)
+        while len(self.clues) < maxClues:
+            solver.add(self.addClue()[1])
+            solver.solve()
+            if solver.isSolved():
+                return True
+
+            # Propagation alone can't always finish a puzzle, so search once it's close
+            unknown = (solver.grid[0].sum(axis=2) > 1).sum()
+            if unknown <= SEARCH_UNKNOWN and searchSolver.SearchSolver(solver, SEARCH_NODES).search() == searchSolver.UNIQUE:
+                return True
+        return False
+
+    def addClue(self):
+        clue = self.makeClue()
+        while clue in self.clues:
+            clue = self.makeClue()
+        self.clues.append(clue)
+        return clue
+
+    # Writes the puzzle's files into the directory
+    def write(self, puzzleDir):
+        if not os.path.isdir(puzzleDir):
+            os.makedirs(puzzleDir)
+        writeLines(os.path.join(puzzleDir, 'entities.txt'),
+                   [', '.join(self.types), ''] + [', '.join(entities) for entities in self.entities])
+        writeLines(os.path.join(puzzleDir, 'clues.txt'), [clue for clue, parse in self.clues])
+        writeLines(os.path.join(puzzleDir, 'parseExpected.txt'), [parse for clue, parse in self.clues])
+        writeLines(os.path.join(puzzleDir, 'answers.txt'),
+                   [', '.join(self.entities[t][self.rows[t][row]] for t in range(len(self.types)))
+                    for row in range(self.size)])
+
+
+# ************************************************************************************
+def sentence(template, *args, **kwargs):
+    text = template.format(*args, **kwargs)
+    return text[0].upper() + text[1:]
+
+
+# returns the suffix of the n'th repeat of the CATEGORY_TYPES (e.g. 'colors2'), if it is one
+def repeat(n):
+    return str(n + 1) if n else ''
+
+
+def plural(word):
+    return word[:-1] + 'ies' if word.endswith('y') else word + 's'
+
+
+def weightedChoice(rng, choices, weights):
+    pick = rng.uniform(0, sum(weights))
+    for choice, weight in zip(choices, weights):
+        pick -= weight
+        if pick <= 0:
+            return choice
+    return choices[-1]
+
+
+def writeLines(path, lines):
+    with open(path, 'w') as outFile:
+        outFile.write('\n'.join(lines) + '\n')
+
+
+# ************************************************************************************
+argparser = argparse.ArgumentParser(description="Generate Logic Grid Puzzles of any size, e.g. for benchmarking the parser "
+                                                "and solvers on grids much larger than those in the data directory")
+argparser.add_argument('dir', metavar='DIR', type=str, help='directory to write the puzzle directories into')
+argparser.add_argument('-n', '--puzzles', type=int, default=1, help='number of puzzles to generate')
+argparser.add_argument('-t', '--types', type=int, default=3, help='number of entity types per puzzle (at least 3)')
+argparser.add_argument('-e', '--entities', type=int, default=4, help='number of entities of each type (at least 3)')
+argparser.add_argument('-c', '--clues', type=int, default=None,
+                       help='number of clues per puzzle. By default, clues are added until the solution is unique, '
+                            'which needs NumPy (see gridSolver.py)')
+argparser.add_argument('-s', '--seed', type=int, default=0, help='random seed, so the same arguments give the same puzzles')
+argparser.add_argument('-p', '--prefix', type=str, default='puzzle', help='name of the puzzle directories, before their number')
+
+if __name__ == "__main__":
+    args = argparser.parse_args()
+    if args.types < 3 or args.entities < 3:
+        argparser.error('Puzzles need at least 3 types and 3 entities of each')
+    if not args.clues:
+        try:
+            import gridSolver
+        except ImportError:
+            argparser.error('Without "--clues", generating puzzles needs NumPy')
+
+    clues, unique = [0, 0]
+    for n in range(args.puzzles):
+        generator = PuzzleGenerator(random.Random(args.seed * 1000003 + n), args.types, args.entities)
+        unique += generator.generate(args.clues)
+        generator.write(os.path.join(args.dir, '{0}{1:02d}'.format(args.prefix, n + 1)))
+        clues += len(generator.clues)
+
+    print "Generated {0} puzzles ({1} types x {2} entities, {3:.1f} clues each) in {4}".format(
+        args.puzzles, args.types, args.entities, clues / float(args.puzzles), args.dir)
+    if not args.clues:
+        print "{0} of them have a solution proven unique".format(unique)
+    sys.exit()
@@ -0,0 +1,414 @@
+#!/usr/bin/env python
+import os
+import re
+import sys
+import codecs
+import argparse
+import numpy
+from searchSolver import SearchSolver, DEFAULT_MAX_NODES, NONE
+
+# Comparisons saying that the first entity is lesser than the second in some type (e.g. 'before(A, B)'),
+# and those saying that it's greater (e.g. 'after(A, B)')
+LESSER = set(['before', 'less', 'smaller', 'lower', 'fewer', 'short', 'closer', 'shorter', 'younger', 'earlier',
+              'behind', 'shallower'])
+GREATER = set(['after', 'more', 'larger', 'higher', 'taller', 'longer', 'far', 'farther', 'further', 'older', 'later',
+               'ahead', 'deeper'])
+
+# Words in the names of the types which a comparison could be about (e.g. 'older' is about 'ages')
+DATES = ['age', 'month', 'date', 'time', 'year']
+COMPARISON_CONTEXTS = {
+    'taller': ['height', 'distance'], 'shorter': ['height', 'distance', 'day', 'week', 'month', 'year', 'length'],
+    'higher': ['height', 'distance'], 'lower': ['height', 'distance'],
+    'farther': ['distance'], 'further': ['distance'], 'closer': ['distance'],
+    'older': DATES, 'younger': DATES, 'after': DATES, 'before': DATES, 'later': DATES, 'earlier': DATES,
+    'deeper': ['depth', 'feet', 'meter', 'mile'], 'shallower': ['depth', 'feet', 'meter', 'mile'],
+    'longer': ['distance', 'day', 'week', 'month', 'year', 'length']
+}
+
+MAGNITUDES = {'thousand': 1000, 'million': 1000000, 'billion': 1000000000}
+NUMBER = re.compile(r"(\d+(?:\.\d+)?)\s*([a-z]*)")
+DIGIT_GROUPING = re.compile(r"(?<=\d),(?=\d{3}(?!\d))")
+
+STATEMENT = re.compile(r"^\s*(\w+)\((.*)\)\s*$")
+
+
+# ************************************************************************************
+# Solves a logic grid puzzle from its clues' parses (e.g. the lines of parseActual.txt)
+#
+# Every pair of types (a, b) has a grid of which of a's entities could still go with which of b's, and all of
+# the grids are held in one boolean array, grid[a, b, i, j] (grid[a, a] is always the identity). Each of the
+# rules is applied to every grid at once:
+#   - one-to-one:   an entity only has one match in each type, so a row (or column) with a single possibility
+#                   rules that possibility out for the rest of its column (or row)
+#   - transitivity: entities can only match if, in every other type, they have some possibility in common
+#   - the clues:    is, not, xor and the comparisons (e.g. 'before', 'more'), with any offset (e.g. '2 years')
+# until none of them rule out anything more. Clues which don't make sense (e.g. unknown entities) are skipped.
+#
+# Types which are compared (e.g. ages) are ordered by their entities' values if they're all numbers
+# (e.g. '$1,200' or '1.5 million'), otherwise in the order they're listed in.
+class GridSolver(object):
+    # types          - the puzzle's types, in order (the solution is listed by the first of them)
+    # entitiesByType - the puzzle's entities, e.g. {'ages': ['4', '5', ...], ...}. Every type needs as many entities
+    def __init__(self, types, entitiesByType):
+        self.types = types
+        self.entities = [[entity.strip() for entity in entitiesByType[entityType]] for entityType in types]
+        self.size = len(self.entities[0])
+        if any(len(entities) != self.size for entities in self.entities):
+            raise ValueError('Every type must have the same number of entities')
+
+        # Each entity's (type, index)
+        self.refs = {}
+        for t, entities in enumerate(self.entities):
+            for i, entity in enumerate(entities):
+                self.refs.setdefault(entity, (t, i))
+
+        count = len(types)
+        self.grid = numpy.ones((count, count, self.size, self.size), dtype=bool)
+        self.grid[numpy.arange(count), numpy.arange(count)] = numpy.eye(self.size, dtype=bool)
+        self.xors = []  # (base, a, b) refs
+        self.comparisons = []  # (lesser, greater, context type, relation matrix)
+        self.skipped = []
+
+    # Adds a clue's parse (e.g. 'is(Greg, maroon)'), returning whether or not it could be used
+    def add(self, statement):
+        match = STATEMENT.match(statement)
+        if not match:
+            self.skipped.append(statement)
+            return False
+        name, args = [match.group(1), splitArgs(match.group(2))]
+
+        try:
+            if name == 'is':
+                self.addIs(args)
+            elif name == 'not':
+                refs = [self.ref(arg) for arg in args]
+                for idx, a in enumerate(refs):
+                    for b in refs[idx + 1:]:
+                        self.exclude(a, b)
+            elif name in LESSER or name in GREATER:
+                if len(args) < 2:
+                    raise ValueError('Comparisons need 2 entities')
+                a, b = [self.ref(args[0]), self.ref(args[1])]
+                self.addComparison(name, b if name in GREATER else a, a if name in GREATER else b,
+                                   args[2] if len(args) > 2 else None)
+            else:
+                raise ValueError('Unknown comparison: ' + name)
+        except ValueError:
+            self.skipped.append(statement)
+            return False
+        return True
+
+    def addIs(self, args):
+        xors = [splitArgs(arg[len('xor('):-1]) for arg in args if arg.startswith('xor(')]
+        if not xors:
+            refs = [self.ref(arg) for arg in args]
+            for idx, a in enumerate(refs):
+                for b in refs[idx + 1:]:
+                    self.match(a, b)
+        elif len(args) == 2 and len(xors) == 1:
+            base = [arg for arg in args if not arg.startswith('xor(')][0]
+            self.addXor(self.ref(base), [self.ref(arg) for arg in xors[0]])
+        elif len(args) == 2 and len(xors) == 2:
+            # "Of A and B, one is C and the other is D": each of them is one of the other two
+            first, second = [[self.ref(arg) for arg in xor] for xor in xors]
+            for base in first:
+                self.addXor(base, second)
+            for base in second:
+                self.addXor(base, first)
+        else:
+            raise ValueError('Unsupported xor')
+
+    def addXor(self, base, options):
+        if len(options) != 2:
+            raise ValueError('xor needs 2 entities')
+        self.exclude(options[0], options[1])
+        self.xors.append((base, options[0], options[1]))
+
+    # lesser, greater - the entities being compared
+    # quantity        - by how much they differ (e.g. '2 years'), if known
+    def addComparison(self, name, lesser, greater, quantity):
+        context = self.getContext(name, lesser, greater, quantity)
+        values = self.getValues(context)
+        offset = parseNumber(quantity) if quantity else None
+
+        # relation[k, l] - whether or not the lesser entity's k'th context entity can go with the greater's l'th
+        if values is not None:
+            differences = values[None, :] - values[:, None]
+            relation = (numpy.abs(differences - offset) < 1e-6) if offset else (differences > 0)
+        else:
+            positions = numpy.arange(self.size)
+            differences = positions[None, :] - positions[:, None]
+            relation = (differences == int(offset)) if offset else (differences > 0)
+        if not relation.any():
+            raise ValueError('Nothing can be ' + name + ' by ' + str(quantity))
+
+        self.exclude(lesser, greater)
+        self.comparisons.append((lesser, greater, context, relation))
+
+    # returns the type a comparison is about: going by the comparison (e.g. 'older' => ages) or its quantity
+    # (e.g. '2 years' => years) if they tell us, otherwise the only other type (or the first other numeric one)
+    def getContext(self, name, lesser, greater, quantity):
+        names = [entityType.lower() for entityType in self.types]
+        candidates = [t for t, entityType in enumerate(names)
+                      if any(word in entityType for word in COMPARISON_CONTEXTS.get(name, []))]
+        if len(candidates) != 1 and quantity:
+            units = re.findall(r"[a-z]+", quantity.lower())
+            candidates = [t for t, entityType in enumerate(names) if any(unit in entityType for unit in units)]
+        if len(candidates) != 1:
+            candidates = [t for t in range(len(self.types)) if t not in [lesser[0], greater[0]]]
+            if len(candidates) > 1:
+                candidates = [t for t in candidates if self.getValues(t) is not None] or candidates
+        if not candidates:
+            raise ValueError('No type to compare by')
+        return candidates[0]
+
+    # returns the numeric values of the type's entities, or None if they aren't all numbers
+    def getValues(self, t):
+        values = [parseNumber(entity) for entity in self.entities[t]]
+        return numpy.array(values, dtype=float) if None not in values else None
+
+    # returns an entity's (type, index)
+    def ref(self, entity):
+        entity = entity.strip()
+        if entity not in self.refs:
+            raise ValueError('Unknown entity: ' + entity)
+        return self.refs[entity]
+
+    def match(self, a, b):
+        if a[0] == b[0]:
+            if a != b:
+                raise ValueError('Different entities of the same type can\'t match')
+            return
+        row = numpy.zeros(self.size, dtype=bool)
+        row[b[1]] = True
+        self.grid[a[0], b[0], a[1]] &= row
+        self.grid[a[0], b[0], :, b[1]] &= numpy.arange(self.size) == a[1]
+        self.grid[b[0], a[0]] = self.grid[a[0], b[0]].T
+
+    def exclude(self, a, b):
+        if a[0] != b[0]:
+            self.grid[a[0], b[0], a[1], b[1]] = False
+            self.grid[b[0], a[0], b[1], a[1]] = False
+
+    # Applies the rules until they don't rule out anything more
+    # returns the number of passes it took, or raises a Contradiction if the clues can't all be true
+    def solve(self, maxPasses=None):
+        passes = 0
+        while not maxPasses or passes < maxPasses:
+            passes += 1
+            before = self.grid.copy()
+            self.applyXors()
+            self.applyComparisons()
+            self.applyOneToOne()
+            self.applyTransitivity()
+            self.check()
+            if numpy.array_equal(before, self.grid):
+                break
+
+        return passes
+
+    def applyOneToOne(self):
+        grid = self.grid
+        solved = grid & (grid.sum(axis=3) == 1)[..., None]
+        taken = solved.sum(axis=2)
+        if (taken > 1).any():
+            raise Contradiction('Two entities have the same match')
+        grid &= solved | (taken == 0)[:, :, None, :]
+        grid &= grid.transpose(1, 0, 3, 2)
+
+    def applyTransitivity(self):
+        values = self.grid.astype(numpy.float32)
+        for c in range(len(self.types)):
+            # Whether or not entity i (of type a) and j (of type b) could share some entity of type c
+            self.grid &= numpy.matmul(values[:, c, None], values[None, c]) > 0
+
+    def applyXors(self):
+        if not self.xors:
+            return
+        grid = self.grid
+        base, a, b = [numpy.array(refs) for refs in zip(*self.xors)]
+        allTypes = numpy.arange(len(self.types))[None, :]
+
+        # In every type, the base's matches are among those of whichever of its 2 options it could still be
+        canBeA = grid[base[:, 0], a[:, 0], base[:, 1], a[:, 1]][:, None, None]
+        canBeB = grid[base[:, 0], b[:, 0], base[:, 1], b[:, 1]][:, None, None]
+        options = (grid[a[:, :1], allTypes, a[:, 1:]] & canBeA) | (grid[b[:, :1], allTypes, b[:, 1:]] & canBeB)
+        numpy.logical_and.at(grid, (base[:, :1], allTypes, base[:, 1:]), options)
+        grid &= grid.transpose(1, 0, 3, 2)
+
+    def applyComparisons(self):
+        if not self.comparisons:
+            return
+        grid = self.grid
+        lesser, greater, context, relations = zip(*self.comparisons)
+        lesser, greater, context, relations = [numpy.array(lesser), numpy.array(greater), numpy.array(context),
+                                               numpy.array(relations)]
+
+        # Each entity keeps only the context entities which still have a counterpart for the other entity
+        lesserRows = grid[lesser[:, 0], context, lesser[:, 1]]
+        greaterRows = grid[greater[:, 0], context, greater[:, 1]]
+        numpy.logical_and.at(grid, (lesser[:, 0], context, lesser[:, 1]), (relations & greaterRows[:, None, :]).any(axis=2))
+        numpy.logical_and.at(grid, (greater[:, 0], context, greater[:, 1]), (relations & lesserRows[:, :, None]).any(axis=1))
+        grid &= grid.transpose(1, 0, 3, 2)
+
+    def check(self):
+        if not self.grid.any(axis=3).all():
+            raise Contradiction('An entity has no possible matches left')
+
+    def isSolved(self):
+        return bool((self.grid.sum(axis=3) == 1).all())
+
+    # returns each of the first type's entities and its matches (or possible matches) in each of the other types,
+    # like answers.txt (e.g. 'Dustin, hang gliding, 2002'), sorted
+    def solution(self):
+        lines = []
+        for i, entity in enumerate(self.entities[0]):
+            matches = [', '.join(self.entities[t][j] for j in numpy.flatnonzero(self.grid[0, t, i]))
+                       for t in range(1, len(self.types))]
+            lines.append(', '.join([entity] + matches))
+        return sorted(lines)
+
+
+# ************************************************************************************
+class Contradiction(Exception):
+    pass
+
+
+# ************************************************************************************
+# Splits a statement's arguments on the commas which aren't within parentheses (e.g. 'A, xor(B, C)' => ['A', 'xor(B, C)'])
+def splitArgs(args):
+    parts = ['']
+    depth = 0
+    for c in args:
+        if c == ',' and not depth:
+            parts.append('')
+            continue
+        depth += {'(': 1, ')': -1}.get(c, 0)
+        parts[-1] += c
+    return [part.strip() for part in parts if part.strip()]
+
+
+# returns the number a string starts with (e.g. '$1,200' => 1200, '1.5 million' => 1500000), or None
+def parseNumber(x):
+    match = NUMBER.search(DIGIT_GROUPING.sub('', x.lower()))
+    if not match:
+        return None
+    return float(match.group(1)) * MAGNITUDES.get(match.group(2), 1)
+
+
+# Whether or not a solution line matches a line of answers.txt, which sometimes groups digits differently, spaces
+# its commas differently or ends with a comma (e.g. 'Theodore, Disraeli, A-,12 minutes,')
+def sameAnswer(line, answer):
+    return answerFields(line) == answerFields(answer)
+
+
+# returns the fields of a solution (or answers.txt) line, without digit grouping or trailing empty fields
+def answerFields(line):
+    fields = [field.strip() for field in DIGIT_GROUPING.sub('', line).split(',')]
+    while fields and not fields[-1]:
+        fields.pop()
+    return fields
+
+
+# ************************************************************************************
+# returns a GridSolver for a puzzle
+# entitiesContent - the contents of entities.txt (its first line lists the types, the solution is listed by the first)
+def readSolver(entitiesContent):
+    header, entities = entitiesContent.split('\n\n')[:2]
+    entitiesByType = dict((entityType, line.split(', '))
+                          for entityType, line in zip(header.split(', '), [line for line in entities.split('\n') if line])
+                          if entityType)
+    types = [entityType for entityType in header.split(', ') if entityType in entitiesByType]
+    return GridSolver(types, entitiesByType)
+
+
+# ************************************************************************************
+# Solves a puzzle from its clues' parses
+# entitiesContent - the contents of entities.txt (see readSolver)
+# statements      - the parses (e.g. the lines of parseActual.txt)
+# answers         - the lines of answers.txt, if there is one
+# search          - options for a SearchSolver (e.g. {'maxNodes': 1000}) to finish the puzzle with, if propagation
+#                   can't, or None to stop at propagation
+# returns [the solution (see GridSolver.solution), number of its lines in answers, error, the SearchSolver if it was
+#         used] - error is the Contradiction if the parses can't all be true (and the solution None), otherwise None
+def solveParses(entitiesContent, statements, answers=None, search=None):
+    solver = readSolver(entitiesContent)
+    for statement in statements:
+        solver.add(statement)
+    try:
+        solver.solve()
+    except Contradiction as e:
+        return [None, 0, e, None]
+
+    searcher = None
+    solution = solver.solution()
+    if search is not None and not solver.isSolved():
+        searcher = SearchSolver(solver, **search)
+        if searcher.search() == NONE:
+            return [None, 0, Contradiction('No solution satisfies every clue'), searcher]
+        solution = searcher.solution()
+
+    correct = len([line for line in solution if any(sameAnswer(line, answer.strip()) for answer in answers or [])])
+    return [solution, correct, None, searcher]
+
+
+# ************************************************************************************
+# Solves a puzzle directory from its parses
+# search - see solveParses
+# returns [number of answers.txt lines solved correctly, number of answers.txt lines], or None if there's no answers.txt
+def solvePuzzle(inputDir, parseFile, quiet=False, search=None):
+    with open(os.path.join(inputDir, 'entities.txt')) as entitiesFile:
+        entitiesContent = entitiesFile.read()
+    with open(os.path.join(inputDir, parseFile)) as statementsFile:
+        statements = [statement for statement in statementsFile.read().split('\n') if statement]
+    answersPath = os.path.join(inputDir, 'answers.txt')
+    answers = None
+    if os.path.exists(answersPath):
+        with open(answersPath) as answersFile:
+            answers = [answer.strip() for answer in answersFile.read().split('\n') if answer.strip()]
+
+    solution, correct, error, searcher = solveParses(entitiesContent, statements, answers, search)
+    if error:
+        print u"\u0078 " + inputDir + ": " + str(error)
+    else:
+        print (u"\u2713 " if answers and correct == len(answers) else u"\u0078 ") + inputDir
+    if searcher and not quiet:
+        print "   " + searcher.summary()
+    if solution and not quiet:
+        for line in solution:
+            print "   " + line + ("" if answers is None or any(sameAnswer(line, answer) for answer in answers) else "\t (Wrong)")
+    return [correct, len(answers)] if answers is not None else None
+
+
+# ************************************************************************************
+argparser = argparse.ArgumentParser(description="Solve Logic Grid Puzzles from their clues' parses")
+argparser.add_argument('-i', '--input', nargs="+", type=str, required=True,
+                       help='puzzle directories, each containing "entities.txt" and the parses (plus "answers.txt" to check against)')
+argparser.add_argument('-d', '--directory', action="store_true", help='whether or not the "-i" input is a directory of puzzle directories')
+argparser.add_argument('-p', '--parses', type=str, default='parseExpected.txt',
+                       help='the file of parses to solve from (e.g. "parseActual.txt")')
+argparser.add_argument('-q', '--quiet', action="store_true", help='whether or not to only print whether each puzzle was solved')
+argparser.add_argument('-s', '--search', action="store_true",
+                       help='whether or not to search (see searchSolver.py) for the solution of puzzles which propagation can\'t finish')
+argparser.add_argument('--max-nodes', type=int, default=DEFAULT_MAX_NODES, help='maximum number of nodes to search per puzzle')
+argparser.add_argument('--time-limit', type=float, default=None, help='maximum number of seconds to search per puzzle')
+
+if __name__ == "__main__":
+    sys.stdout = codecs.getwriter('utf8')(sys.stdout)
+    args = argparser.parse_args()
+    inputDirs = args.input
+    if args.directory:
+        inputDirs = sorted(os.path.join(inputDirs[0], name) for name in os.listdir(inputDirs[0])
+                           if os.path.isdir(os.path.join(inputDirs[0], name)))
+
+    search = {'maxNodes': args.max_nodes, 'timeLimit': args.time_limit} if args.search else None
+    correct, total = [0, 0]
+    for inputDir in inputDirs:
+        result = solvePuzzle(inputDir, args.parses, args.quiet, search)
+        if result:
+            correct += result[0]
+            total += result[1]
+
+    if total:
+        print "Solved {0} of {1} answers ({2:.0f}%)".format(correct, total, 100.0 * correct / total)
+    sys.exit()
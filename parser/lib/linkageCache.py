@@ -0,0 +1,194 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+
+# Bump whenever the format of the cached entries changes
+CACHE_FORMAT = 2
+
+DEFAULT_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.cache', 'linkages.sqlite')
+DEFAULT_CACHE_SIZE = 64 * 1024 * 1024
+# Entries are only marked as used again once it's been this many seconds since they last were, so that reading the
+# cache doesn't mean writing to it on every hit
+TOUCH_INTERVAL = 60
+
+
+# ************************************************************************************
+# The parts of a linkage's "constituent_phrases_flat" we actually use
+class Constituent(object):
+    __slots__ = ['type', 'words']
+
+    def __init__(self, type, words):
+        self.type = type
+        self.words = words
+
+    def __repr__(self):
+        if self.words:
+            return "<%s: %s>" % (self.type, ', '.join(self.words))
+        else:
+            return "<%s>" % self.type
+
+
+# ************************************************************************************
+# Stands in for a link-grammar Linkage, when all we've kept of it is its flat constituents
+class FlatLinkage(object):
+    __slots__ = ['constituent_phrases_flat']
+
+    def __init__(self, parts):
+        self.constituent_phrases_flat = parts
+
+
+# ************************************************************************************
+# Persistent, content-addressed cache of link-grammar linkages
+#
+# Entries are keyed by a hash of the sentence, the parser options and the dictionary version,
+# and hold each linkage's flat constituents (tag types and words). An entry may hold only the first
+# few of a sentence's linkages (if parsing stopped early), in which case it isn't 'complete'.
+# Entries are evicted least recently used first, once the cache grows past maxBytes. Their total size is kept up to
+# date in the totals table, as they're added and evicted.
+#
+# Backed by SQLite, so several processes (e.g. "--jobs" workers) can safely share one cache file.
+class LinkageCache(object):
+    def __init__(self, path=DEFAULT_CACHE_FILE, dictionaryVersion=None, maxBytes=DEFAULT_CACHE_SIZE, rebuild=False):
+        self.path = path
+        self.dictionaryVersion = dictionaryVersion
+        self.maxBytes = maxBytes
+        self.rebuild = rebuild
+        self.hits, self.misses = [0, 0]
+        self.db = None
+        self.pid = None
+
+    def connect(self):
+        # SQLite connections mustn't be shared with forked processes, so each process opens its own
+        if self.db and self.pid == os.getpid():
+            return self.db
+
+        cacheDir = os.path.dirname(self.path)
+        if cacheDir and not os.path.isdir(cacheDir):
+            try:
+                os.makedirs(cacheDir)
+            except OSError:
+                pass  # Another process beat us to it
+
+        self.db = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        self.db.text_factory = str
+        self.db.execute('CREATE TABLE IF NOT EXISTS linkages '
+                        '(key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, used REAL NOT NULL)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS linkages_used ON linkages (used)')
+        self.db.execute('CREATE TABLE IF NOT EXISTS totals (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+        self.db.execute("INSERT OR IGNORE INTO totals (name, value) SELECT 'size', COALESCE(SUM(size), 0) FROM linkages")
+        self.pid = os.getpid()
+        return self.db
+
+    def key(self, sentence, options):
+        content = json.dumps([CACHE_FORMAT, sentence, options, self.dictionaryVersion], sort_keys=True)
+        return hashlib.sha1(content).hexdigest()
+
+    # returns [FlatLinkages, complete], or None if the sentence isn't cached
+    def get(self, sentence, options):
+        if self.rebuild:
+            self.misses += 1
+            return None
+
+        db = self.connect()
+        key = self.key(sentence, options)
+        row = db.execute('SELECT value, used FROM linkages WHERE key = ?', (key,)).fetchone()
+        if not row:
+            self.misses += 1
+            return None
+
+        now = time.time()
+        if now - row[1] >= TOUCH_INTERVAL:
+            db.execute('UPDATE linkages SET used = ? WHERE key = ?', (now, key))
+        self.hits += 1
+        complete, linkages = json.loads(row[0])
+        return [[FlatLinkage([Constituent(type, words) for type, words in parts]) for parts in linkages], complete]
+
+    # linkages - link-grammar Linkages (or FlatLinkages) for the sentence
+    # complete  - whether or not these are all of the sentence's linkages
+    def put(self, sentence, options, linkages, complete=True):
+        value = json.dumps([complete, [[[part.type, part.words] for part in linkage.constituent_phrases_flat]
+                                       for linkage in linkages]])
+
+        db = self.connect()
+        key = self.key(sentence, options)
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = db.execute('SELECT size FROM linkages WHERE key = ?', (key,)).fetchone()
+            db.execute('INSERT OR REPLACE INTO linkages (key, value, size, used) VALUES (?, ?, ?, ?)',
+                       (key, value, len(value), time.time()))
+            self.resize(db, len(value) - (row[0] if row else 0))
+            self.evict(db)
+            db.execute('COMMIT')
+        except:
+            db.execute('ROLLBACK')
+            raise
+
+    # Adds change (in bytes) to the entries' total size
+    def resize(self, db, change):
+        if change:
+            db.execute("UPDATE totals SET value = value + ? WHERE name = 'size'", (change,))
+
+    # Drop the least recently used entries until the cache fits within maxBytes
+    def evict(self, db):
+        total = db.execute("SELECT value FROM totals WHERE name = 'size'").fetchone()[0]
+        if total <= self.maxBytes:
+            return
+
+        evicted, size = [[], 0]
+        rows = db.execute('SELECT key, size FROM linkages ORDER BY used ASC')
+        for key, entrySize in rows:
+            if total - size <= self.maxBytes:
+                break
+            evicted.append((key,))
+            size += entrySize
+        rows.close()
+        db.executemany('DELETE FROM linkages WHERE key = ?', evicted)
+        self.resize(db, -size)
+
+    def close(self):
+        if self.db and self.pid == os.getpid():
+            self.db.close()
+        self.db = None
+
+
+# ************************************************************************************
+# Keeps linkages in memory, in front of a LinkageCache (if given)
+#
+# Used by sweeps (see sweep.py), which parse every clue's linkages once and then fork a worker for each parser
+# configuration: the workers share the parsed linkages copy-on-write, rather than each reading them back from the
+# cache file (or parsing them all over again).
+class MemoryLinkageCache(object):
+    def __init__(self, backing=None):
+        self.backing = backing
+        self.entries = {}
+        self.hits, self.misses = [0, 0]
+
+    def key(self, sentence, options):
+        return json.dumps([sentence, options], sort_keys=True)
+
+    # returns [FlatLinkages, complete], or None if the sentence isn't cached
+    def get(self, sentence, options):
+        key = self.key(sentence, options)
+        if key not in self.entries:
+            cached = self.backing.get(sentence, options) if self.backing else None
+            if not cached:
+                self.misses += 1
+                return None
+            self.entries[key] = cached
+
+        self.hits += 1
+        linkages, complete = self.entries[key]
+        return [list(linkages), complete]
+
+    def put(self, sentence, options, linkages, complete=True):
+        flat = [FlatLinkage([Constituent(part.type, part.words) for part in linkage.constituent_phrases_flat])
+                for linkage in linkages]
+        self.entries[self.key(sentence, options)] = [flat, complete]
+        if self.backing:
+            self.backing.put(sentence, options, flat, complete)
+
+    def close(self):
+        if self.backing:
+            self.backing.close()
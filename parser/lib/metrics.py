@@ -0,0 +1,198 @@
+import os
+import json
+import Queue
+import bisect
+import threading
+
+# Upper bounds of the histogram buckets, for durations (in seconds) and for counts
+TIME_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+COUNT_BUCKETS = [0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+
+FORMATS = ['json', 'prometheus']
+
+
+# ************************************************************************************
+# Counts of observations falling into each bucket, plus their sum
+class Histogram(object):
+    __slots__ = ['buckets', 'counts', 'sum', 'count']
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last bucket is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    # returns [[upperBound, cumulativeCount], ...], ending with the +Inf bucket
+    def cumulative(self):
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + [float('inf')], self.counts):
+            total += count
+            result.append([bound, total])
+        return result
+
+
+# ************************************************************************************
+# Labelled counters and histograms, exported as JSON or in the Prometheus text format
+#
+# While disabled, recording is a no-op, so the parser can record metrics unconditionally.
+# Hot paths should still check 'enabled' before building their labels.
+class Metrics(object):
+    def __init__(self, prefix='', descriptions=None, enabled=False):
+        self.prefix = prefix
+        self.descriptions = descriptions or {}
+        self.enabled = enabled
+        self.counters = {}
+        self.histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, buckets=TIME_BUCKETS, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram(buckets)
+        histogram.observe(value)
+
+    def clear(self):
+        self.counters.clear()
+        self.histograms.clear()
+
+    # returns the metrics as plain data, e.g. to send them back from a "--jobs" worker
+    def snapshot(self):
+        return {
+            'counters': self.counters.items(),
+            'histograms': [(key, h.buckets, h.counts, h.sum, h.count) for key, h in self.histograms.items()]
+        }
+
+    # Adds a snapshot's metrics (see snapshot) to these ones
+    def merge(self, snapshot):
+        if not snapshot:
+            return
+        for key, value in snapshot['counters']:
+            self.counters[key] = self.counters.get(key, 0) + value
+        for key, buckets, counts, total, count in snapshot['histograms']:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.counts = [a + b for a, b in zip(histogram.counts, counts)]
+            histogram.sum += total
+            histogram.count += count
+
+    def toJson(self):
+        result = {'counters': {}, 'histograms': {}}
+        for (name, labels), value in sorted(self.counters.items()):
+            result['counters'].setdefault(self.prefix + name, []).append({'labels': dict(labels), 'value': value})
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            result['histograms'].setdefault(self.prefix + name, []).append({
+                'labels': dict(labels),
+                'buckets': [[formatBound(bound), count] for bound, count in histogram.cumulative()],
+                'sum': histogram.sum,
+                'count': histogram.count
+            })
+        return json.dumps(result, indent=2, sort_keys=True)
+
+    def toPrometheus(self):
+        lines = []
+        described = set()
+
+        def describe(name, kind):
+            if name not in described:
+                described.add(name)
+                if name in self.descriptions:
+                    lines.append('# HELP {0}{1} {2}'.format(self.prefix, name, self.descriptions[name]))
+                lines.append('# TYPE {0}{1} {2}'.format(self.prefix, name, kind))
+
+        for (name, labels), value in sorted(self.counters.items()):
+            describe(name, 'counter')
+            lines.append('{0}{1}{2} {3}'.format(self.prefix, name, formatLabels(labels), value))
+
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            describe(name, 'histogram')
+            for bound, count in histogram.cumulative():
+                lines.append('{0}{1}_bucket{2} {3}'.format(self.prefix, name, formatLabels(labels + (('le', formatBound(bound)),)), count))
+            lines.append('{0}{1}_sum{2} {3!r}'.format(self.prefix, name, formatLabels(labels), histogram.sum))
+            lines.append('{0}{1}_count{2} {3}'.format(self.prefix, name, formatLabels(labels), histogram.count))
+
+        return '\n'.join(lines) + '\n'
+
+    # Writes the metrics to the file, replacing it atomically so it can be read mid-run
+    def write(self, path, format='json'):
+        content = self.toPrometheus() if format == 'prometheus' else self.toJson()
+        tmpPath = '{0}.{1}.tmp'.format(path, os.getpid())
+        with open(tmpPath, 'w') as metricsFile:
+            metricsFile.write(content)
+        os.rename(tmpPath, path)
+
+
+# ************************************************************************************
+# Rewrites a metrics file every 'interval' seconds from a background thread, so it's current mid-puzzle rather than
+# only as puzzles finish. Adds in the snapshots (see Metrics.snapshot) "--jobs" workers put on 'queue' as they go
+class PeriodicWriter(threading.Thread):
+    def __init__(self, metrics, path, format='json', interval=60, queue=None):
+        threading.Thread.__init__(self, name='metrics')
+        self.daemon = True
+        self.metrics = metrics
+        self.path = path
+        self.format = format
+        self.interval = interval
+        self.queue = queue
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.write()
+
+    # Adds a snapshot's metrics, from a thread other than this one
+    def merge(self, snapshot):
+        with self.lock:
+            self.metrics.merge(snapshot)
+
+    def write(self):
+        with self.lock:
+            while self.queue is not None:
+                try:
+                    self.metrics.merge(self.queue.get_nowait())
+                except Queue.Empty:
+                    break
+            self.metrics.write(self.path, self.format)
+
+    # Stops the thread, writing the metrics a last time
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        self.write()
+
+
+# ************************************************************************************
+# returns the format to export the metrics file in, going by its extension unless one is given
+def getFormat(path, format=None):
+    if format:
+        return format
+    return 'prometheus' if os.path.splitext(path)[1] in ['.prom', '.txt'] else 'json'
+
+
+def formatLabels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join('{0}="{1}"'.format(key, escapeLabel(value)) for key, value in labels) + '}'
+
+
+def escapeLabel(value):
+    return unicode(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n').encode('utf8')
+
+
+def formatBound(bound):
+    return '+Inf' if bound == float('inf') else repr(bound)
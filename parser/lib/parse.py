@@ -2,16 +2,68 @@
 import os
 import re
 import sys
+import math
+import time
 import codecs
+import hashlib
+import json
+import signal
 import argparse
+import contextlib
+import collections
+import StringIO
 import itertools
-from pylinkgrammar.linkgrammar import Parser, ParseOptions
+import multiprocessing
+from array import array
+from linkageCache import LinkageCache, Constituent, FlatLinkage, DEFAULT_CACHE_FILE, DEFAULT_CACHE_SIZE
+import metrics
+from parseDaemon import ParseDaemon, DEFAULT_SOCKET
+from clueStream import readRecords, streamResults
+from parseManifest import PuzzleManifest
+from corpusStore import CorpusStore
+from runCheckpoint import RunCheckpoint, readCheckpoints, parseShard, shardOf
+import chunker
 
 PARSE_VIA_REGEX = True
 
 # Make sure utf8 chars don't break consumers (e.g. if consuming via a pipe from Node)
 sys.stdout = codecs.getwriter('utf8')(sys.stdout)
 
+PARSER_OPTIONS = {'verbosity': 0}
+
+# Written next to parseActual.txt: the number of each clue parsed and the line of parseActual.txt with its parse ('-'
+# if it failed to parse), so the parses can be scored clue by clue later on (see scorePuzzle)
+ACTUAL_CLUES_FILE = '.parseActualClues.txt'
+
+# link-grammar's bindings, which are only imported once a clue actually needs parsing (see loadLinkGrammar)
+clg, Parser, Linkage = [None, None, None]
+
+# Backends which can parse a clue into its constituents, tried in order until one of them gives a viable parse:
+#   'chunker'     - the rule-based chunker (see chunker.py), which is quick but only understands simpler sentences
+#   'linkgrammar' - link-grammar, with each of the null-link tiers in turn (see LinkageStream)
+BACKENDS = ['chunker', 'linkgrammar']
+DEFAULT_BACKENDS = ['linkgrammar']
+
+# Solvers for "--solve": 'grid' propagates the clues (see gridSolver.py), and 'search' also searches for the solution
+# of puzzles which propagation alone can't finish (see searchSolver.py)
+SOLVERS = ['grid', 'search']
+
+# Nodes a "--pipeline" run searches (with the 'search' solver) after each clue, to see if the solution is unique yet
+PIPELINE_SEARCH_NODES = 1000
+
+# Ways of preferring one phrase match over another, which compareResults tries in order until one of them decides:
+#   'comparison' - prefer actual comparisons (e.g. "before") to plain equalities ("is")
+#   'detail'     - prefer more detailed results, i.e. those with more of their entities, comparison and quantifier
+PREFERENCES = ['comparison', 'detail']
+DEFAULT_PREFERENCES = ['comparison', 'detail']
+
+# Maximum number of null links for each successive parse of a clue (each tier allows from one more than the previous
+# tier's maximum). link-grammar already only returns the linkages with the fewest null links it can, so by default
+# a clue is parsed once, allowing up to 2. More tiers (e.g. 0,1,2) re-parse the clue with more null links when none
+# of the previous tier's linkages give a viable parse, which can find a parse among linkages a single parse never
+# returns, but costs a parse per tier
+DEFAULT_NULL_TIERS = [2]
+
 argparser = argparse.ArgumentParser(description="Analyze statements for a Logic Puzzle game")
 argparser.add_argument('-v', '--verbose', action="store_true", help='whether or not to print verbose logs')
 argparser.add_argument('-q', '--quiet', action="store_true", help='whether or not to trim out unnecessary logs')
@@ -20,82 +72,214 @@ argparser.add_argument('-i', '--input', nargs="+", type=str,
                        help="an input directory containing the files \"entities.txt\", \"clues.txt\", and \"answers.txt\"\n\n"
                             + "Entitites file:  an input file containing information about the Entity Types and specific Entities in use. Structure should be \"Type1,Type2,...\n\nEntity1a,Entity1b,...\nEntity2a,...\"\n"
                             + "Clues files: an input file containing statements for a logic puzzle. Each statement should be on a separate line (e.g separated by newline)")
+argparser.add_argument('-j', '--jobs', type=int, default=1,
+                       help='number of worker processes to parse puzzle directories with. Workers are forked after the link-grammar dictionary is loaded, so they all share it')
+argparser.add_argument('--cache', type=str, default=DEFAULT_CACHE_FILE,
+                       help='file to cache link-grammar linkages in, so unchanged clues needn\'t be re-parsed')
+argparser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE / (1024 * 1024),
+                       help='maximum size (in MB) of the linkage cache. The least recently used entries are evicted first')
+argparser.add_argument('--no-cache', action="store_true", help='whether or not to skip the linkage cache entirely')
+argparser.add_argument('--rebuild-cache', action="store_true",
+                       help='whether or not to ignore cached linkages, re-parsing (and re-caching) every clue')
+argparser.add_argument('--max-linkages', type=int, default=None,
+                       help='maximum number of linkages to consider for each clue')
+argparser.add_argument('--null-tiers', type=str, default=','.join(map(str, DEFAULT_NULL_TIERS)),
+                       help='comma-separated maximum numbers of null links to parse each clue with, in order (e.g. "0,1,2"). '
+                            'A clue is only re-parsed with more null links when none of its linkages give a viable parse')
+argparser.add_argument('--backends', type=str, default=','.join(DEFAULT_BACKENDS),
+                       help='comma-separated backends to parse each clue with, in order ("chunker" and/or "linkgrammar"). '
+                            'A clue is only parsed with the next backend when none of the previous ones give a viable parse')
+argparser.add_argument('--time-limit', type=float, default=None,
+                       help='maximum number of seconds to spend parsing each clue. A clue that runs out of time falls back to '
+                            'recognizing its entities alone')
+argparser.add_argument('--metrics', type=str,
+                       help='file to export metrics (linkages per clue, matcher hits, fallbacks and stage timings) to. '
+                            'Written as JSON, or in the Prometheus text format if the file ends in ".prom"')
+argparser.add_argument('--metrics-format', type=str, choices=metrics.FORMATS, help='format of the "--metrics" file')
+argparser.add_argument('--daemon', nargs='?', type=str, const=DEFAULT_SOCKET,
+                       help='run as a daemon, parsing newline-delimited JSON requests from this Unix socket (see parseDaemon.py) '
+                            'with "--jobs" worker processes, rather than parsing the "-i" input')
+argparser.add_argument('--max-pending', type=int, default=None,
+                       help='maximum number of clues a daemon queues up before it stops reading requests (defaults to 4 per job)')
+argparser.add_argument('--request-timeout', type=float, default=None,
+                       help='maximum number of seconds a daemon spends on a request, unless the request gives its own "timeout"')
+argparser.add_argument('--stream', nargs='?', type=str, const='-',
+                       help='parse puzzle records streamed as JSON lines from this file (or stdin, if "-" or omitted), writing a '
+                            'JSON line to stdout for each clue as soon as it\'s parsed (see clueStream.py), rather than parsing the "-i" input')
+argparser.add_argument('--stream-offset', type=int, default=0,
+                       help='record (line number) of the "--stream" input to start from, e.g. to resume an interrupted run')
+argparser.add_argument('--store', type=str,
+                       help='a corpus store (see corpusStore.py) to read the puzzles from and write their results to. The "-i" '
+                            'inputs are then puzzles (or, with "-d", directories of puzzles) within the store')
+argparser.add_argument('--incremental', action="store_true",
+                       help='whether or not to only re-parse the clues which changed since the last run, reusing the rest of '
+                            'parseActual.txt (see parseManifest.py)')
+argparser.add_argument('--score-only', action="store_true",
+                       help='whether or not to just score the existing parseActual.txt files against parseExpected.txt, '
+                            'without parsing anything (or loading link-grammar)')
+argparser.add_argument('--ner-first', action="store_true",
+                       help='whether or not to parse each clue with its entities replaced by placeholder words first, only '
+                            'falling back to the clue as is if that fails (by default, it\'s the other way around)')
+argparser.add_argument('--no-ner-fallback', action="store_true",
+                       help='whether or not to only parse each clue one way (as is, or with "--ner-first" with its entities '
+                            'replaced), never falling back to the other')
+argparser.add_argument('--matchers', type=str, default='default',
+                       help='order to try the phrase matchers in, which decides between equally good matches: "default", '
+                            '"reversed", or the comma-separated (1-based) positions of the matchers in PHRASE_MATCHERS, e.g. '
+                            '"3,1,2" (leaving out the others)')
+argparser.add_argument('--preferences', type=str, default=','.join(DEFAULT_PREFERENCES),
+                       help='comma-separated ways of preferring one phrase match over another, in order ("comparison" '
+                            'and/or "detail", see compareResults), or "none" to keep the first match')
+argparser.add_argument('--solve', nargs='?', choices=SOLVERS, const=SOLVERS[0],
+                       help='also solve each puzzle from its parses (see gridSolver.py, which needs NumPy), checking the '
+                            'solution against answers.txt. "search" also searches (see searchSolver.py) for the solution of '
+                            'puzzles which the grid\'s propagation alone can\'t finish')
+argparser.add_argument('--pipeline', action="store_true",
+                       help='whether or not to solve each puzzle as its clues are parsed (with the "--solve" solver, '
+                            'which needs NumPy), parsing the cheapest clues first and skipping the rest once it\'s solved. '
+                            'parseActual.txt then only has the parses of the clues parsed')
+argparser.add_argument('--shard', type=str,
+                       help='only parse this shard of the puzzles, as "i/N" (e.g. "0/4" to "3/4"). Each puzzle is in the '
+                            'shard picked by its name\'s hash, so the shards can be run separately (e.g. on different machines)')
+argparser.add_argument('--checkpoint', type=str,
+                       help='file to record each puzzle\'s results in as soon as it\'s done. Puzzles already in it are '
+                            'skipped, so an interrupted run can be resumed by running it again (see runCheckpoint.py)')
+argparser.add_argument('--merge', nargs='+', type=str, metavar='CHECKPOINT',
+                       help='just print the summary of a run from its "--checkpoint" files (e.g. one per "--shard")')
+argparser.add_argument('--metrics-interval', type=float, default=None,
+                       help='also export the metrics every this many seconds while parsing, rather than only at the end')
+
+# Link-grammar parser and options shared (copy-on-write) with forked "--jobs" workers
+PARSER = None
+OPTIONS = None
+
+# Each "--stream"/"--daemon" worker's EntityIndexes of the puzzles it's parsed clues of most recently (see
+# getEntityIndex), since a puzzle's clues usually arrive together
+ENTITY_INDEXES = collections.OrderedDict()
+ENTITY_INDEXES_SIZE = 16
+
+# Whether or not to print verbose logs (set from the command line)
+verbose = False
+
+# Counts of notable events (e.g. 'timeouts') across the run
+STATS = collections.Counter()
+
+# Seconds spent in each stage of parsing across the run (see timed)
+TIMINGS = collections.Counter()
+TIMER_STACK = []
+
+# Detailed metrics, for exporting with "--metrics". Recording them is a no-op unless it's enabled
+METRICS = metrics.Metrics('logicparser_', {
+    'clues_total': 'Clues parsed, by outcome (correct, incorrect, failed)',
+    'parse_paths_total': 'Clues parsed, by how their parse was found (fast, chunker, linkage, default, ner)',
+    'timeouts_total': 'Clues which ran out of time while parsing linkages',
+    'linkages_per_clue': 'Linkages considered for each clue',
+    'matcher_matches_total': 'Linkages matched by each of the phrase matchers',
+    'matcher_wins_total': 'Linkages whose best result came from each of the phrase matchers',
+    'clue_seconds': 'Time taken to parse each clue',
+    'backend_seconds': 'Time taken by each backend to parse a clue, including matching its phrases',
+    'stage_seconds': 'Time taken by each stage of parsing (excluding nested stages), per call',
+})
+METRICS_SENT = 0  # When a "--jobs" worker last sent its metrics so far (see sendMetrics)
+
+
+# options - 'cache':        a LinkageCache to read/write link-grammar linkages from/to
+#           'maxLinkages':  maximum number of linkages to consider per clue (and null-link tier)
+#           'nullTiers':    maximum numbers of null links to parse each clue with, in order
+#           'backends':     the BACKENDS to parse each clue with, in order
+#           'writeActual':  whether or not to write parseActual.txt (defaults to True)
+#           'incremental':  the parser's fingerprint, if unchanged clues' parses should be reused (see parserFingerprint)
+#           'store':        a CorpusStore to read the puzzle from and write its results to, rather than its directory
+#           'timeLimit':    maximum number of seconds to spend parsing each clue
+#           'nerFirst':     whether or not to parse each clue with its entities replaced first (see replaceEntities),
+#                           only falling back to the clue as is if that fails, rather than the other way around
+#           'nerFallback':  whether or not to fall back to the other way of parsing a clue at all (defaults to True)
+#           'matchers':     names of the PHRASE_MATCHERS to try, in order (defaults to all of them, in their order)
+#           'preferences':  the PREFERENCES to choose between phrase matches with, in order (see compareResults)
+#           'pipeline':     whether or not to solve the puzzle as its clues are parsed, stopping once it's solved
+#           'solve':        which of the SOLVERS to solve the puzzle from its parses with, if any (see solveActuals)
+#           'metricsQueue': a "--jobs" worker's queue to send its METRICS to every 'metricsInterval' seconds, if any
+#                           (see sendMetrics)
+def main(inputDir, verbose=False, quiet=False, p=None, options=None):
+    options = options or {}
 
-
-def main(inputDir, verbose=False, quiet=False):
     # Inputs
-    entitiesFile = '/'.join([inputDir, 'entities.txt'])
-    statementsFile = '/'.join([inputDir, 'clues.txt'])
-    expectedParseFile = '/'.join([inputDir, 'parseExpected.txt'])
-    actualParseFile = '/'.join([inputDir, 'parseActual.txt'])
-
-    # ERROR!
-    if not statementsFile:
-        argparser.print_help()
-        return sys.exit()
+    files = PuzzleFiles(inputDir, options.get('store'))
+    entitiesFile = 'entities.txt'
+    statementsFile = 'clues.txt'
+    expectedParseFile = 'parseExpected.txt'
+    actualParseFile = 'parseActual.txt'
 
     # Read in the file inputs
-    statements = readStatements(statementsFile)
-    entitiesByType = readEntities(entitiesFile)
+    statements = parseStatementsText(files.read(statementsFile))
+    entitiesByType = parseEntitiesText(files.read(entitiesFile))
+    entityIndex = EntityIndex(entitiesByType)
     try:
-        expectedParses = readStatements(expectedParseFile)
+        expectedParses = parseStatementsText(files.read(expectedParseFile))
     except:
         expectedParses = None
 
     # Link-grammar parser
-    p = Parser(max_null_count=2, verbosity=0)
+    p = p or getParser()
     print ""  # Whitespace after the Parser's printing
-    print promptColors()['BLUE'] + inputDir + promptColors()['COLOR_NONE']
+    print PROMPT_COLORS['BLUE'] + inputDir + PROMPT_COLORS['COLOR_NONE']
 
     # Book keeping as we parse all the statements
     total, success, fail = [0, 0, 0]
-    actuals = []
-    i = 0
+    parsed = {}  # [parse (None if it failed), whether or not it can be reused] of each clue parsed, by its index
+
+    # Parses of the clues which haven't changed since the last "--incremental" run
+    manifest = None
+    if options.get('incremental') and options.get('writeActual', True):
+        entitiesContent = files.read(entitiesFile)
+        previousActuals = parseStatementsText(files.read(actualParseFile)) if files.exists(actualParseFile) else None
+        manifest = PuzzleManifest(files, options['incremental']).load(entitiesContent, previousActuals)
+
+    # A "--pipeline" run solves the puzzle as it goes, parsing the cheapest clues first and stopping once it's solved
+    order = range(len(statements))
+    pipeline = None
+    if options.get('pipeline'):
+        pipeline = Pipeline(files.read(entitiesFile), options.get('solve') == 'search')
+        order = pipelineOrder(statements, entityIndex)
 
     # Parse each clue statement
-    for s in statements:
-        expected = expectedParses[i] if expectedParses else None
-        i = i + 1
+    for position, index in enumerate(order):
+        s = statements[index]
+        expected = expectedParses[index] if expectedParses and index < len(expectedParses) else None
+        i = index + 1
         if not s:
             continue
 
-        entities, comparison, quantifier = [None, None, None]
-        try:
-            entities, comparison, quantifier = parseSentence(i, p, s, entitiesByType)
-
-        # NAIVE PARSE FAILURE
-        # Try NER parse...
-        except (LinkageError, ParseError) as e:
-            if verbose:
-                print "Problem parsing unadulterated sentence: {0}".format(e)
-                print 'Attempting NER-replacement to help the parser do better...'
-
-            try:
-                replacedEntitiesByType, replacedSentence = replaceEntities(entitiesByType, s)
-                i_orig = i
-                i = str(i) + ' [NER]'
-                replacedEntities, comparison, quantifier = parseSentence(i, p, replacedSentence, replacedEntitiesByType)
-                entities = unreplaceEntities(replacedEntities, replacedEntitiesByType, entitiesByType)
-            except (LinkageError, ParseError) as eNer:
-                if verbose:
-                    print "Problem parsing NER-replaced sentence: {0}".format(eNer)
-            i = i_orig
+        reused = manifest.get(s) if manifest else None
+        if reused:
+            actual, reusable = [reused[0], True]
+            STATS['reusedClues'] += 1
+            printAttempt(ClueAttempt(str(i), s))
+        else:
+            result = parseClue(i, p, s, entitiesByType, entityIndex, options, verbose)
+            entities, comparison, quantifier = [result.entities, result.comparison, result.quantifier]
+            for attempt in result.attempts:
+                printAttempt(attempt)
+
+            # Parses which ran out of time might go differently next time, so always re-parse them
+            actual, reusable = [None, not result.timedOut]
+            if entities:
+                try:
+                    actual = formatParse(entities, comparison, quantifier)
+                except (TypeError) as e:
+                    print "   Entities: {0}, Quantifier: {1}".format(entities, quantifier)
+                    actual = comparison + "(" + "{0}Problem formatting parse: {1}{2}".format(PROMPT_COLORS['RED'], e, PROMPT_COLORS['COLOR_NONE']) + ")"
+                    reusable = False
 
         # PARSE FAILURE
-        if not entities:
+        if not actual:
             if expected:
-                print promptColors()['PURPLE'] + "   " + expected + "\t (Expected)"
+                print PROMPT_COLORS['PURPLE'] + "   " + expected + "\t (Expected)"
             fail += 1
+            METRICS.inc('clues_total', outcome='failed')
 
         # PARSE SUCCESS
         else:
-            try:
-                prettyParsed = ', '.join(entities) + ((', ' + ' '.join(quantifier)) if quantifier else '')
-            except (TypeError) as e:
-                print "   Entities: {0}, Quantifier: {1}".format(entities, quantifier)
-                prettyParsed = "{0}Problem formatting parse: {1}{2}".format(promptColors()['RED'], e, promptColors()['COLOR_NONE'])
-            actual = comparison + "(" + prettyParsed + ")"
-            actuals.append(actual)
 
             if verbose:
                 print ""
@@ -105,23 +289,35 @@ def main(inputDir, verbose=False, quiet=False):
                 if not expectedParses:
                     print "   " + actual + " (Actual)"
                 elif not quiet:
-                    print promptColors()['LIGHT_GREEN'] + (u"\u2713" if expected else " ") + promptColors()['COLOR_NONE'] \
-                          + "  " + actual + promptColors()['COLOR_NONE']
+                    print PROMPT_COLORS['LIGHT_GREEN'] + (u"\u2713" if expected else " ") + PROMPT_COLORS['COLOR_NONE'] \
+                          + "  " + actual + PROMPT_COLORS['COLOR_NONE']
                 success += 1
+                METRICS.inc('clues_total', outcome='correct')
 
             # Incorrect parse
             else:
-                print promptColors()['YELLOW'] + u"\u0078" + promptColors()[
+                print PROMPT_COLORS['YELLOW'] + u"\u0078" + PROMPT_COLORS[
                     'COLOR_NONE'] + "  " + actual + "\t (Actual)"
                 if expected:
-                    print promptColors()['YELLOW'] + "   " + expected + "\t (Expected)" \
-                          + promptColors()['COLOR_NONE']
+                    print PROMPT_COLORS['YELLOW'] + "   " + expected + "\t (Expected)" \
+                          + PROMPT_COLORS['COLOR_NONE']
                 fail += 1
+                METRICS.inc('clues_total', outcome='incorrect')
 
             if verbose:
                 print ""
 
+        parsed[index] = [actual, reusable]
         total += 1
+        sendMetrics(options)
+        if pipeline and actual and pipeline.add(actual):
+            skipped = len(order) - position - 1
+            STATS['pipelineSolved'] += 1
+            STATS['pipelineSkipped'] += skipped
+            if skipped:
+                print PROMPT_COLORS['LIGHT_GRAY'] + "   Solved after {0} of {1} clues, skipping the rest".format(
+                    position + 1, len(order)) + PROMPT_COLORS['COLOR_NONE']
+            break
         #
         # DONE PARSING *THIS* STATEMENT
         ################################
@@ -129,62 +325,669 @@ def main(inputDir, verbose=False, quiet=False):
     #
     # DONE PARSING *ALL* STATEMENTS
     ################################
+    if pipeline:
+        STATS['pipelineClues'] += len(order)
+
+    # The parses, in the order of their clues
+    actuals = []
+    actualClues = []
+    manifestClues = []
+    for index in sorted(parsed):
+        actual, reusable = parsed[index]
+        manifestClues.append((statements[index], len(actuals) if actual else None, reusable))
+        actualClues.append("{0} {1}".format(index + 1, len(actuals) + 1 if actual else '-'))
+        if actual:
+            actuals.append(actual)
+
+    if options.get('writeActual', True):
+        files.write(actualParseFile, '\n'.join(actuals) + '\n')
+        files.write(ACTUAL_CLUES_FILE, '\n'.join(actualClues) + '\n')
+        if manifest:
+            manifest.save(entitiesContent, manifestClues, actuals)
 
-    writeActual(actualParseFile, actuals)
+    if options.get('solve'):
+        solveActuals(files, actuals, options['solve'] == 'search', quiet)
 
     return [total, success, fail]
 
 
 # ************************************************************************************
-def parseSentence(i, p, s, entitiesByType):
+# returns the order to parse the clues in for a "--pipeline" run: the cheapest first, i.e. those with the fewest words
+# besides their entities (which the fast path or the chunker can often parse), then those naming the most entities
+def pipelineOrder(statements, entityIndex):
+    def cost(index):
+        spans = entityIndex.spans(statements[index])
+        entityWords = sum(len(statements[index][start:end].split()) for start, end, entity in spans)
+        return [len(statements[index].split()) - entityWords, -len(spans), index]
+
+    return sorted(range(len(statements)), key=cost)
+
+
+# ************************************************************************************
+# Solves a puzzle as its clues are parsed, for "--pipeline" runs (see gridSolver.py)
+class Pipeline(object):
+    # entitiesContent - the contents of entities.txt
+    # search          - whether or not to search for the solution when propagation alone can't finish it
+    def __init__(self, entitiesContent, search=False):
+        import gridSolver
+        self.solver = gridSolver.readSolver(entitiesContent)
+        self.search = search
+        self.error = None
+
+    # Adds a clue's parse
+    # returns whether or not the puzzle now has a single solution
+    def add(self, actual):
+        import gridSolver
+        import searchSolver
+        if self.error or not self.solver.add(actual):
+            return False
+
+        try:
+            self.solver.solve()
+        except gridSolver.Contradiction as e:
+            self.error = e  # Some parse is wrong, so the rest of the clues are all parsed regardless
+            return False
+        if self.solver.isSolved():
+            return True
+        return self.search and searchSolver.SearchSolver(self.solver, PIPELINE_SEARCH_NODES).search() == searchSolver.UNIQUE
+
+
+# ************************************************************************************
+# Solves the puzzle from its clues' parses with the GridSolver, checking the solution against answers.txt (if any)
+# search - whether or not to search for the solution if the GridSolver can't finish the puzzle (see SearchSolver)
+def solveActuals(files, actuals, search=False, quiet=False):
+    import gridSolver
+
+    answers = [answer.strip() for answer in parseStatementsText(files.read('answers.txt'))] if files.exists('answers.txt') else None
+    with timed('solve'):
+        solution, correct, error, searcher = gridSolver.solveParses(files.read('entities.txt'), actuals, answers,
+                                                                    {} if search else None)
+
+    STATS['solvedPuzzles'] += 1 if answers and correct == len(answers) else 0
+    STATS['answers'] += len(answers or [])
+    STATS['solvedAnswers'] += correct
+    if searcher:
+        STATS['searches'] += 1
+        STATS['searchNodes'] += searcher.nodes
+        STATS['search_' + searcher.status] += 1
+        if not quiet:
+            print PROMPT_COLORS['LIGHT_GRAY'] + "   " + searcher.summary() + PROMPT_COLORS['COLOR_NONE']
+    if error:
+        print PROMPT_COLORS['RED'] + "   Solution: " + str(error) + PROMPT_COLORS['COLOR_NONE']
+    elif not quiet or (answers and correct < len(answers)):
+        for line in solution:
+            wrong = answers and not any(gridSolver.sameAnswer(line, answer) for answer in answers)
+            print (PROMPT_COLORS['YELLOW'] if wrong else PROMPT_COLORS['LIGHT_GRAY']) + "   Solution: " + line \
+                  + ("\t (Wrong)" if wrong else "") + PROMPT_COLORS['COLOR_NONE']
+
+
+# ************************************************************************************
+# Parses a puzzle's clues, without printing anything or touching the puzzle's files
+# entitiesByType - the puzzle's entities, e.g. {'ages': ['4', '5', ...], ...}
+# clues          - the clue sentences
+# options        - see main()
+# returns a ClueParse for each of the clues
+def parsePuzzle(entitiesByType, clues, options=None, p=None):
+    p = p or getParser()
+    entityIndex = EntityIndex(entitiesByType)
+    return [parseClue(i + 1, p, clue, entitiesByType, entityIndex, options or {}) for i, clue in enumerate(clues)]
+
+
+# ************************************************************************************
+# Parses many puzzles (see parsePuzzle), optionally with several worker processes
+# puzzles - (entitiesByType, clues) for each puzzle
+# returns a list of ClueParses for each of the puzzles
+def parsePuzzles(puzzles, options=None, p=None, jobs=1):
+    if jobs <= 1 or len(puzzles) <= 1:
+        return [parsePuzzle(entitiesByType, clues, options, p) for entitiesByType, clues in puzzles]
+
+    # Fork the workers *after* loading the dictionary so they share it copy-on-write. Only the workers' own PARSER and
+    # OPTIONS are set to them, leaving this process's as they were
+    pool = multiprocessing.Pool(min(jobs, len(puzzles)), initParsePuzzles, (loadParser(p or getParser()), options or {}))
+    try:
+        return pool.map(runParsePuzzle, puzzles)
+    finally:
+        pool.close()
+        pool.join()
+
+
+# ************************************************************************************
+# returns a hash of everything besides a clue and its entities which decides how the clue is parsed:
+# this code, the link-grammar dictionary's version and the parsing options
+def parserFingerprint(p, options):
+    with open(re.sub(r'\.pyc$', '.py', os.path.abspath(__file__))) as source:
+        code = source.read()
+    settings = [getattr(p, 'version', None), PARSER_OPTIONS, options.get('maxLinkages'), options.get('nullTiers'),
+                options.get('timeLimit'), bool(options.get('nerFirst')), options.get('backends', DEFAULT_BACKENDS),
+                options.get('nerFallback', True), options.get('matchers'), options.get('preferences', DEFAULT_PREFERENCES)]
+    return hashlib.sha1(code + json.dumps(settings, sort_keys=True)).hexdigest()
+
+
+# ************************************************************************************
+# returns the shared link-grammar parser (a LazyParser, so its dictionary is only loaded once it's needed)
+def getParser():
+    global PARSER
+    if not PARSER:
+        PARSER = LazyParser(**PARSER_OPTIONS)
+    return PARSER
+
+
+# ************************************************************************************
+# Imports link-grammar's bindings, the first time they're needed
+def loadLinkGrammar():
+    global clg, Parser, Linkage
+    if not clg:
+        from pylinkgrammar import clinkgrammar
+        from pylinkgrammar.linkgrammar import Parser as LinkGrammarParser, Linkage as LinkGrammarLinkage
+        clg, Parser, Linkage = [clinkgrammar, LinkGrammarParser, LinkGrammarLinkage]
+
+
+# ************************************************************************************
+# Stands in for a link-grammar Parser, only importing link-grammar and loading its dictionary
+# once something needs them (i.e. once a clue can't be parsed without link-grammar)
+class LazyParser(object):
+    def __init__(self, **options):
+        self.options = options
+        self.parser = None
+
+    def load(self):
+        if not self.parser:
+            loadLinkGrammar()
+            self.parser = Parser(**self.options)
+        return self.parser
+
+    # The library's version, which doesn't need the dictionary loaded
+    @property
+    def version(self):
+        loadLinkGrammar()
+        return clg.linkgrammar_get_version()
+
+    def __getattr__(self, name):
+        return getattr(self.load(), name)
+
+
+# ************************************************************************************
+# Loads the parser's dictionary, if it's a LazyParser that hasn't yet. Done before forking worker processes,
+# so they all share the one dictionary (copy-on-write) rather than each loading their own
+def loadParser(p):
+    return p.load() if isinstance(p, LazyParser) else p
+
+
+# ************************************************************************************
+# One attempt at parsing a clue, either as is or with its entities replaced (NER)
+#   path     - how the parse was found: 'fast' (entities alone), 'chunker', 'linkage' or 'default' (all entities, "is")
+#   matcher  - name of the PHRASE_MATCHERS entry the parse came from, if any
+#   linkages - number of linkages considered
+#   timedOut - whether or not the clue ran out of time parsing linkages
+#   error    - the LinkageError or ParseError the attempt failed with, if it did
+class ClueAttempt(object):
+    __slots__ = ['label', 'sentence', 'path', 'matcher', 'linkages', 'timedOut', 'error']
+
+    def __init__(self, label, sentence):
+        self.label = label
+        self.sentence = sentence
+        self.path, self.matcher, self.error = [None, None, None]
+        self.linkages = 0
+        self.timedOut = False
+
+    def __getstate__(self):
+        return [getattr(self, slot) for slot in self.__slots__]
+
+    def __setstate__(self, state):
+        for slot, value in zip(self.__slots__, state):
+            setattr(self, slot, value)
+
+
+# ************************************************************************************
+# The result of parsing a clue. entities is None if the clue couldn't be parsed
+#   path     - how the parse was found (see ClueAttempt), or 'ner' if it took replacing the clue's entities
+#   matcher  - name of the PHRASE_MATCHERS entry the parse came from, if any
+#   attempts - the ClueAttempts it took, in order
+#   seconds  - time taken to parse the clue
+#   timings  - seconds spent in each stage of parsing the clue (see timed)
+class ClueParse(object):
+    __slots__ = ['clue', 'entities', 'comparison', 'quantifier', 'path', 'matcher', 'attempts', 'seconds', 'timings']
+
+    def __init__(self, clue):
+        self.clue = clue
+        self.entities, self.comparison, self.quantifier = [None, None, None]
+        self.path, self.matcher = [None, None]
+        self.attempts = []
+        self.seconds = 0.0
+        self.timings = {}
+
+    @property
+    def linkages(self):
+        return sum(attempt.linkages for attempt in self.attempts)
+
+    @property
+    def timedOut(self):
+        return any(attempt.timedOut for attempt in self.attempts)
+
+    @property
+    def error(self):
+        return self.attempts[-1].error if not self.entities and self.attempts else None
+
+    def __getstate__(self):
+        return [getattr(self, slot) for slot in self.__slots__]
+
+    def __setstate__(self, state):
+        for slot, value in zip(self.__slots__, state):
+            setattr(self, slot, value)
+
+    # The parse, formatted like parseExpected.txt (e.g. 'is(Greg, maroon)'), or None
+    def __str__(self):
+        return formatParse(self.entities, self.comparison, self.quantifier) if self.entities else 'None'
+
+    def __repr__(self):
+        return "<ClueParse: %s>" % self
+
+
+# ************************************************************************************
+# Parses a single clue, falling back to replacing its entities (NER) if link-grammar can't make sense of it
+# (or, with the 'nerFirst' option, the other way around)
+# returns a ClueParse
+def parseClue(i, p, s, entitiesByType, entityIndex, options, verbose=False):
+    result = ClueParse(s)
+    start = time.time()
+    timingsBefore = dict(TIMINGS)
+
+    entities, comparison, quantifier = [None, None, None]
+    ways = [True, False] if options.get('nerFirst') else [False, True]
+    for ner in (ways if options.get('nerFallback', True) else ways[:1]):
+        placeholders, sentence = replaceEntities(entityIndex, s) if ner else [None, s]
+        if ner and sentence == s:
+            continue  # No entities to replace, so it would just be the same attempt again
+
+        fallback = bool(result.attempts)
+        if fallback and verbose:
+            print 'Attempting NER-replacement to help the parser do better...' if ner \
+                else 'Attempting the unadulterated sentence instead...'
+
+        attemptStart = time.time()
+        attempt = ClueAttempt(str(i) + (' [NER]' if ner else ''), sentence)
+        result.attempts.append(attempt)
+        try:
+            if ner:
+                METRICS.inc('parse_paths_total', path='ner')
+                entities, comparison, quantifier = parseSentence(attempt, p, placeholders.index, options)
+                entities = unreplaceEntities(entities, placeholders)
+                result.path, result.matcher = ['ner', attempt.matcher]
+            else:
+                entities, comparison, quantifier = parseSentence(attempt, p, entityIndex, options)
+                result.path, result.matcher = [attempt.path, attempt.matcher]
+            break
+
+        # PARSE FAILURE
+        # Try the other way...
+        except (LinkageError, ParseError) as e:
+            if verbose:
+                print "Problem parsing {0} sentence: {1}".format('NER-replaced' if ner else 'unadulterated', e)
+        finally:
+            if fallback:
+                STATS['nerFallbacks' if ner else 'plainFallbacks'] += 1
+                # NOTE: Unlike the other stages, this includes the time of the stages within it
+                TIMINGS['nerFallback' if ner else 'plainFallback'] += time.time() - attemptStart
+
+    if entities:
+        result.entities, result.comparison, result.quantifier = [entities, comparison, quantifier]
+    result.seconds = time.time() - start
+    result.timings = dict((stage, seconds - timingsBefore.get(stage, 0)) for stage, seconds in TIMINGS.items()
+                          if seconds != timingsBefore.get(stage, 0))
+    METRICS.observe('clue_seconds', result.seconds)
+    return result
+
+
+# ************************************************************************************
+# Prints how an attempt at parsing a clue went (see ClueAttempt)
+def printAttempt(attempt):
+    print PROMPT_COLORS['LIGHT_GRAY'] + attempt.label + ". " + attempt.sentence + PROMPT_COLORS['COLOR_NONE']
+    if attempt.timedOut:
+        print PROMPT_COLORS['YELLOW'] + "   Ran out of time after " + str(attempt.linkages) + " linkages" \
+              + PROMPT_COLORS['COLOR_NONE']
+    if isinstance(attempt.error, ParseError):
+        print PROMPT_COLORS['LIGHT_RED'] + u"\u0078" \
+              + "  Failed to parse any linkages (tried " + str(attempt.linkages) + ")!" \
+              + PROMPT_COLORS['COLOR_NONE']
+
+
+# ************************************************************************************
+# returns the clue's parse, formatted like parseExpected.txt (e.g. 'is(Greg, maroon)')
+def formatParse(entities, comparison, quantifier):
+    return comparison + "(" + ', '.join(entities) + ((', ' + ' '.join(quantifier)) if quantifier else '') + ")"
+
+
+# ************************************************************************************
+# attempt - the ClueAttempt to parse, which is updated with how it went
+# returns [entities, comparison, quantifier], or raises a LinkageError or ParseError
+def parseSentence(attempt, p, entityIndex, options):
+    try:
+        return parseAttempt(attempt, p, entityIndex, options)
+    except (LinkageError, ParseError) as e:
+        attempt.error = e
+        raise
+
+
+def parseAttempt(attempt, p, entityIndex, options):
     #
     # PARSE THE STATEMENT
     #
-    print promptColors()['LIGHT_GRAY'] + str(i) + ". " + s + promptColors()['COLOR_NONE']
-    l = p.parse_sent(s)
+    s = attempt.sentence
+    if verbose:
+        print "Parsing " + attempt.label + ". " + s
 
-    # PARSE FAILURE
-    if len(l) < 1:
-        raise LinkageError('No linkages found in link-grammar parser')
+    # Some clauses are decided by the sentence alone, in which case there's no need for link-grammar
+    special = parseFastClause(entityIndex, s, verbose)
+    if special:
+        STATS['fastPaths'] += 1
+        METRICS.inc('parse_paths_total', path='fast')
+        attempt.path = 'fast'
+        return special
 
-    # PARSE SUCCESS
-    outFile = 'out/linkage_' + str(i) + '.ps'
+    outFile = 'out/linkage_' + attempt.label + '.ps'
+    start = time.time()
+    tried = 0
+    parsedParts = {}  # Many linkages share the same constituents, so only parse each distinct set once
 
     #
     # LINKAGE PARSE
     #
 
-    # Choose the best linkage from the parse
-    best = [None, None, None]
-    for linkage in l:
-        entities, comparison, quantifier = parseLinkage(linkage, s, entitiesByType, outFile, verbose)
-        if entities and ((entities[0] and 'xor' in entities[1]) or (comparison and quantifier)):
-            best = [entities, comparison, quantifier]
+    # Choose the best linkage from the parse. Linkages are only parsed as we need them, and only parsed
+    # with the next backend (or with more null links) if we haven't found a viable linkage yet
+    best, bestMatcher = [[None, None, None], None]
+    for backend, parserOptions in getParseTiers(options):
+        tierStart = time.time()
+        if backend == 'chunker':
+            if verbose:
+                print "Parsing with the chunker..."
+            l = ChunkStream(s, entityIndex)
+        else:
+            if verbose:
+                print "Parsing with {0}-{1} null links...".format(parserOptions['min_null_count'], parserOptions['max_null_count'])
+            l = LinkageStream(p, s, options, parserOptions, start, verbose)
+        try:
+            for linkage in l:
+                (entities, comparison, quantifier), matcher = parseLinkage(linkage, s, entityIndex, outFile, verbose,
+                                                                           parsedParts, options)
+                if entities and ((entities[0] and 'xor' in entities[1]) or (comparison and quantifier)):
+                    best, bestMatcher = [[entities, comparison, quantifier], matcher]
+                    break
+                elif entities and comparison:
+                    if not best[0]:
+                        best, bestMatcher = [[entities, comparison, quantifier], matcher]
+        finally:
+            l.close()
+            # NOTE: Unlike the other stages, this includes the time of the stages within it
+            TIMINGS['backend_' + backend] += time.time() - tierStart
+            METRICS.observe('backend_seconds', time.time() - tierStart, backend=backend)
+        tried += l.count
+
+        if l.timedOut or best[0]:
             break
-        elif entities and comparison:
-            if not best[0]:
-                best = [entities, comparison, quantifier]
     entities, comparison, quantifier = best
+    attempt.linkages, attempt.timedOut = [tried, l.timedOut]
+    STATS['linkages'] += tried
+    METRICS.observe('linkages_per_clue', tried, metrics.COUNT_BUCKETS)
+
+    if best[0]:
+        STATS['resolved_' + backend] += 1
+        if backend == 'linkgrammar':
+            STATS['nullTier' + str(parserOptions['max_null_count'])] += 1
+        if verbose and backend == 'linkgrammar':
+            print "Parsed with up to {0} null links".format(parserOptions['max_null_count'])
+        elif verbose:
+            print "Parsed with the " + backend
+
+    if l.timedOut:
+        STATS['timeouts'] += 1
+        METRICS.inc('timeouts_total')
+
+    # PARSE FAILURE
+    elif tried < 1:
+        raise LinkageError('No linkages found in link-grammar parser')
 
     if not entities:
 
         # Try to default so we don't totally fail to parse the sentence
-        entities = parseAllEntities(entitiesByType, s, verbose)
-        comparison, quantifier = parseComparisons([], None, entitiesByType, verbose)  # Get default comparison ("is")
+        entities = parseAllEntities(entityIndex, s, verbose)
+        comparison, quantifier = parseComparisons([], None, entityIndex.entitiesByType, verbose)  # Get default comparison ("is")
         if (len(entities) >= 2):
+            METRICS.inc('parse_paths_total', path='default')
+            attempt.path = 'default'
             return [entities, comparison, quantifier]
 
-        print promptColors()['LIGHT_RED'] + u"\u0078" \
-              + "  Failed to parse any linkages (tried " + str(len(l)) + ")!" \
-              + promptColors()['COLOR_NONE']
         raise ParseError('No viable entity/comparison/quantifier parses found')
 
+    path = 'linkage' if backend == 'linkgrammar' else backend
+    METRICS.inc('parse_paths_total', path=path)
+    attempt.path, attempt.matcher = [path, bestMatcher]
     return entities, comparison, quantifier
 
 
 # ************************************************************************************
-def parseLinkage(linkage, sentence, entitiesByType, outFile, verbose=False):
-    if verbose:
+# returns (backend, link-grammar options or None) for each of the tiers to parse a clue with, in order
+def getParseTiers(options):
+    tiers = []
+    for backend in options.get('backends', DEFAULT_BACKENDS):
+        if backend == 'linkgrammar':
+            tiers += [(backend, parserOptions) for parserOptions in getNullTiers(options)]
+        else:
+            tiers.append((backend, None))
+
+    return tiers
+
+
+# ************************************************************************************
+# returns the BACKENDS named in a comma-separated list (e.g. from the command line)
+def getBackends(names):
+    backends = [name.strip() for name in names.split(',') if name.strip()]
+    unknown = [backend for backend in backends if backend not in BACKENDS]
+    if unknown or not backends:
+        argparser.error('Unknown backends: "{0}" (choose from {1})'.format(','.join(unknown), ', '.join(BACKENDS)))
+    return backends
+
+
+# ************************************************************************************
+# returns the names of the PHRASE_MATCHERS in a matcher order (e.g. from the command line): 'default', 'reversed', or
+# the comma-separated (1-based) positions of the matchers in PHRASE_MATCHERS, e.g. '3,1,2'
+def getMatcherOrder(order):
+    if order in ['default', 'reversed']:
+        names = [matcher['name'] for matcher in PHRASE_MATCHERS]
+        return names[::-1] if order == 'reversed' else names
+
+    try:
+        positions = [int(position) for position in order.split(',') if position.strip()]
+    except ValueError:
+        positions = []
+    if not positions or not all(1 <= position <= len(PHRASE_MATCHERS) for position in positions):
+        argparser.error('Unknown matcher order: "{0}" (use "default", "reversed", or positions from 1 to {1})'.format(
+            order, len(PHRASE_MATCHERS)))
+    return [PHRASE_MATCHERS[position - 1]['name'] for position in positions]
+
+
+# ************************************************************************************
+# returns the PREFERENCES named in a comma-separated list (e.g. from the command line), or none for 'none'
+def getPreferences(names):
+    if names.strip() == 'none':
+        return []
+    preferences = [name.strip() for name in names.split(',') if name.strip()]
+    unknown = [preference for preference in preferences if preference not in PREFERENCES]
+    if unknown or not preferences:
+        argparser.error('Unknown preferences: "{0}" (choose from {1}, or "none")'.format(','.join(unknown), ', '.join(PREFERENCES)))
+    return preferences
+
+
+# ************************************************************************************
+# returns the link-grammar options for each of the clue's null-link tiers
+def getNullTiers(options):
+    tiers = []
+    minNullCount = 0
+    for maxNullCount in options.get('nullTiers', DEFAULT_NULL_TIERS):
+        tiers.append(dict(PARSER_OPTIONS, min_null_count=minNullCount, max_null_count=maxNullCount))
+        minNullCount = maxNullCount + 1
+
+    return tiers
+
+
+# ************************************************************************************
+# Iterates over a sentence's chunker variants (see chunker.py), like a LinkageStream does its linkages
+class ChunkStream(object):
+    def __init__(self, s, entityIndex):
+        with timed('chunker'):
+            self.linkages = chunker.chunk(s, entityIndex.spans(s))
+        self.count = 0
+        self.timedOut = False
+
+    def __iter__(self):
+        for linkage in self.linkages:
+            self.count += 1
+            yield linkage
+
+    def close(self):
+        pass
+
+
+# ************************************************************************************
+# Constituent labels, as recognized by pylinkgrammar. Any other labels in the constituent tree are words
+CONSTITUENT_LABELS = set(['NP', 'VP', 'S', 'PP', 'SBAR', 'WHNP', 'WHPP', 'SINV', 'QP', 'WHADVP', 'PRT', 'ADJP', 'ADVP'])
+
+
+# ************************************************************************************
+# Lazily iterates over a sentence's linkages, within the clue's linkage/time budget
+# (the time budget started at 'start', and is shared by all of the clue's null-link tiers)
+#
+# Linkages come from the cache if possible, otherwise they're parsed one by one with link-grammar,
+# freeing each linkage's C objects as soon as its constituents are extracted.
+# Afterwards, 'count' is the number of linkages produced, and 'timedOut' whether the budget ran out.
+class LinkageStream(object):
+    def __init__(self, p, s, options, parserOptions, start, verbose=False):
+        self.p = p
+        self.s = s
+        self.parserOptions = parserOptions
+        self.start = start
+        self.cache = options.get('cache')
+        self.maxLinkages = options.get('maxLinkages')
+        self.timeLimit = options.get('timeLimit')
+        self.verbose = verbose
+        self.count = 0
+        self.timedOut = False
+        self.linkages = self.generate()
+
+    def __iter__(self):
+        return self.linkages
+
+    def close(self):
+        self.linkages.close()
+
+    def withinBudget(self):
+        if self.maxLinkages is not None and self.count >= self.maxLinkages:
+            return False
+        if self.timeLimit is not None and time.time() - self.start > self.timeLimit:
+            self.timedOut = True
+            return False
+        return True
+
+    def generate(self):
+        with timed('linkages'):
+            cached = self.cache.get(self.s, self.parserOptions) if self.cache else None
+        linkages, complete = cached or [[], False]
+
+        for linkage in linkages:
+            if not self.withinBudget():
+                return
+            self.count += 1
+            yield linkage
+        if complete:
+            return
+
+        # Parse the rest of the linkages, remembering them for the cache
+        parsed = list(linkages)
+        complete = False
+        loadLinkGrammar()
+        self.p.parse_options.min_null_count = self.parserOptions['min_null_count']
+        self.p.parse_options.max_null_count = self.parserOptions['max_null_count']
+        sent = clg.sentence_create(self.s, self.p.dictionary._dict)
+        try:
+            with timed('parse_sent'):
+                n = clg.sentence_parse(sent, self.p.parse_options._po)
+            if clg.parse_options_timer_expired(self.p.parse_options._po):
+                # link-grammar gave up partway, so its linkages are only a best effort. Don't cache them. It has a
+                # time limit of its own even without "--time-limit", which doesn't count as the clue running out of time
+                # (so it still goes on to the next null-link tier, and isn't counted as a timeout)
+                self.timedOut = self.timeLimit is not None
+                parsed = None
+
+            for idx in range(len(linkages), max(n, 0)):
+                if not self.withinBudget():
+                    return
+                with timed('linkages'):
+                    linkage = self.createLinkage(idx, sent)
+                if parsed is not None:
+                    parsed.append(linkage)
+                self.count += 1
+                yield linkage
+            complete = True
+        finally:
+            clg.sentence_delete(sent)
+            if self.cache and parsed is not None and (complete or len(parsed) > len(linkages)):
+                self.cache.put(self.s, self.parserOptions, parsed, complete)
+
+    def createLinkage(self, idx, sent):
+        linkage = clg.linkage_create(idx, sent, self.p.parse_options._po)
+        try:
+            # Verbose logs want the full linkage (diagram, postscript, etc). Otherwise only keep its constituents
+            if self.verbose:
+                return Linkage(linkage, null_count=clg.sentence_null_count(sent))
+
+            parts = []
+            tree = clg.linkage_constituent_tree(linkage)
+            try:
+                readConstituents(tree, parts)
+            finally:
+                clg.linkage_free_constituent_tree(tree)
+            return FlatLinkage(parts)
+        finally:
+            clg.linkage_delete(linkage)
+
+
+# ************************************************************************************
+# Flattens a link-grammar constituent tree the same way as Linkage.constituent_phrases_flat
+# node  - the first of a list of sibling nodes
+# parts - list the constituents are appended to, in pre-order
+# returns the words among the siblings
+def readConstituents(node, parts):
+    words = []
+    while node:
+        label = clg.linkage_constituent_node_get_label(node)
+        child = clg.linkage_constituent_node_get_child(node)
+        if label in CONSTITUENT_LABELS:
+            part = Constituent(label, [])
+            parts.append(part)
+            if child:
+                part.words = readConstituents(child, parts)
+        elif label:
+            words.append(label)
+        node = clg.linkage_constituent_node_get_next(node)
+
+    return words
+
+
+# ************************************************************************************
+# parsedParts - results of previously parsed linkages of this sentence, by their constituents
+# returns [[entities, comparison, quantifier], matcher] (see parseConstituentParts)
+def parseLinkage(linkage, sentence, entityIndex, outFile, verbose=False, parsedParts=None, options=None):
+    partsOfStatement = ConstituentTable(linkage.constituent_phrases_flat)
+    key = partsOfStatement.key()
+    if parsedParts is not None and key in parsedParts:
+        STATS['dedupedLinkages'] += 1
+        if verbose:
+            print "\nSkipping linkage with the same constituent phrases as an earlier linkage"
+        return parsedParts[key]
+
+    if verbose and isinstance(linkage, FlatLinkage):
+        print "\nParsing cached (or chunked) linkage's constituent phrases..."
+    elif verbose:
         if outFile:
             open(outFile, 'w').write(linkage.postscript)
         print linkage.constituent_phrases_nested
@@ -192,55 +995,76 @@ def parseLinkage(linkage, sentence, entitiesByType, outFile, verbose=False):
 
         print "\nParsing linkage's constituent phrases..."
 
-    partsOfStatement = linkage.constituent_phrases_flat
-    return parseConstituentParts(entitiesByType, partsOfStatement, sentence, verbose)
+    with timed('matching'):
+        results = parseConstituentParts(entityIndex, partsOfStatement, sentence, verbose, options)
+    if parsedParts is not None:
+        parsedParts[key] = results
+    return results
 
 
 # ************************************************************************************
-def replaceEntities(entitiesByType, sentence):
-    # TODO
-    replacedEntitiesByType = dict(entitiesByType)
-    replacedSentence = str(sentence)
+# Replaces each of the entities in the sentence with its placeholder (see EntityPlaceholders)
+# returns [the puzzle's EntityPlaceholders, the replaced sentence]
+def replaceEntities(entityIndex, sentence):
+    placeholders = entityIndex.getPlaceholders()
+    replaced = []
+    end = 0
+    for spanStart, spanEnd, entity in entityIndex.spans(sentence):
+        replaced += [sentence[end:spanStart], placeholders.placeholders[entity]]
+        end = spanEnd
+    replaced.append(sentence[end:])
+    return [placeholders, ''.join(replaced)]
 
-    if 'ages' not in replacedEntitiesByType:
-        return replacedEntitiesByType, sentence
 
-    replacedEntitiesByType['ages'] = ['Entity1', 'Entity2', 'Entity3', 'Entity4']
-    replacedSentence = replacedSentence.replace(entitiesByType['ages'][0], 'Entity1')
-    replacedSentence = replacedSentence.replace(entitiesByType['ages'][1], 'Entity2')
-    replacedSentence = replacedSentence.replace(entitiesByType['ages'][2], 'Entity3')
-    replacedSentence = replacedSentence.replace(entitiesByType['ages'][3], 'Entity4')
-    return replacedEntitiesByType, replacedSentence
+# ************************************************************************************
+# Maps the placeholders in a replaced sentence's parse (e.g. ['Entity2', 'xor(Entity5, Entity7)']) back to their entities
+def unreplaceEntities(replacedEntities, placeholders):
+    if not replacedEntities:
+        return replacedEntities
+    return [PLACEHOLDER.sub(lambda match: placeholders.entities.get(match.group(), match.group()), entity)
+            if entity else entity for entity in replacedEntities]
 
 
 # ************************************************************************************
-def unreplaceEntities(replacedEntities, replacedEntitiesByType, entitiesByType):
-    entities = []
-    for entity in replacedEntities:
-        for category in replacedEntitiesByType:
-            replacedEntities = replacedEntitiesByType[category]
-            if entity in replacedEntities:
-                # Un-replace the entity string
-                entities.append(entitiesByType[category][replacedEntities.index(entity)])
-
-    return entities
+# Named entity placeholders
+#
+# Multi-word entities (like "Charles City") and numbers (like "28000") give link-grammar many more linkages
+# to consider, if it can link them at all, so clues can be parsed with each entity replaced by a single
+# placeholder word instead. Every entity of the puzzle has its own placeholder (e.g. 'Entity7'), numbered in
+# the order of its type and then its position, so the same clue always gets the same replaced sentence.
+PLACEHOLDER = re.compile(r"\bEntity\d+\b")
+
+
+class EntityPlaceholders(object):
+    def __init__(self, entitiesByType):
+        self.entitiesByType = {}  # The placeholders, by the type of their entities
+        self.placeholders = {}  # Each entity's placeholder
+        self.entities = {}  # Each placeholder's entity
+        for entityType in sorted(entitiesByType):
+            self.entitiesByType[entityType] = []
+            for entity in entitiesByType[entityType]:
+                placeholder = 'Entity' + str(len(self.entities) + 1)
+                self.entitiesByType[entityType].append(placeholder)
+                self.entities[placeholder] = entity.strip()
+                self.placeholders.setdefault(entity.strip(), placeholder)
+        self.index = EntityIndex(self.entitiesByType, self.entities)
 
 
 # ************************************************************************************
-def parseFirstEntity(entitiesByType, words, verbose=False):
-    allEntities = parseAllEntities(entitiesByType, words, verbose)
+def parseFirstEntity(entityIndex, words, verbose=False):
+    allEntities = parseAllEntities(entityIndex, words, verbose)
 
     # Hm.. this shouldn't happen
     if len(allEntities) < 1:
         if verbose:
-            print promptColors()['RED'] + "Didn't find any entities, but expected to find 1" + promptColors()[
+            print PROMPT_COLORS['RED'] + "Didn't find any entities, but expected to find 1" + PROMPT_COLORS[
                 'COLOR_NONE']
         return None
 
     # Ah! This wasn't expected!
     if verbose and len(allEntities) > 1:
-        print promptColors()['RED'] + "Found multiple entities, but only expected 1: " + ', '.join(allEntities) + \
-              promptColors()['COLOR_NONE']
+        print PROMPT_COLORS['RED'] + "Found multiple entities, but only expected 1: " + ', '.join(allEntities) + \
+              PROMPT_COLORS['COLOR_NONE']
 
     return allEntities[0]
 
@@ -253,51 +1077,166 @@ def getAllEntities(entitiesByType, verbose=False):
 
 
 # ************************************************************************************
-def parseAllEntities(entitiesByType, words, verbose=False):
-    allEntities = getAllEntities(entitiesByType)
+def parseAllEntities(entityIndex, words, verbose=False):
+    return entityIndex.find(words)
 
-    sentence = ' '.join(words).lower()
 
-    # Some entities (like 'sailboat' get parsed into 2 words 'sail boat',
-    #   so this is a hack to detect those as well
-    sentenceNoSpace = noSpace(sentence)
+# ************************************************************************************
+# Pseudo Named Entity Recognition
+#
+# An Aho-Corasick automaton over all of a puzzle's known entities, so every entity in a sentence
+# is found in a single scan of it. Build one per puzzle (see readEntities) and reuse it.
+#
+# Matching ignores case and whitespace, since some entities (like 'sailboat') get parsed into
+# 2 words ('sail boat'), as well as digit grouping (so '30000' matches '$30,000'). Matches contained in a longer match are dropped, so e.g.
+# "12 silver" isn't also parsed as "2 silver".
+#
+# originals - the entities which the entities stand for, if they're placeholders (see EntityPlaceholders)
+class EntityIndex(object):
+    def __init__(self, entitiesByType, originals=None):
+        self.entitiesByType = entitiesByType
+        self.originals = originals or {}
+        self.placeholders = None
+
+        # Trie of the entities' keys, with each state's [(keyLength, entity), ...] outputs
+        self.goto = [{}]
+        self.outputs = [[]]
+        for entity in getAllEntities(entitiesByType):
+            key = entityKey(entity)
+            if not key:
+                continue
+            state = 0
+            for c in key:
+                if c not in self.goto[state]:
+                    self.goto[state][c] = len(self.goto)
+                    self.goto.append({})
+                    self.outputs.append([])
+                state = self.goto[state][c]
+            self.outputs[state].append((len(key), entity))
+
+        # Failure links: the longest proper suffix of each state that is also in the trie
+        self.fail = [0] * len(self.goto)
+        queue = collections.deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for c, nextState in self.goto[state].iteritems():
+                fallback = self.fail[state]
+                while fallback and c not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[nextState] = self.goto[fallback].get(c, 0)
+                self.outputs[nextState] = self.outputs[nextState] + self.outputs[self.fail[nextState]]
+                queue.append(nextState)
+
+    # words - a list of words, or a sentence string
+    # returns the known entities found in the words, in the order they appear
+    def find(self, words):
+        with timed('entities'):
+            return self.findEntities(words)
+
+    def findEntities(self, words):
+        sentence = words if isinstance(words, basestring) else ' '.join(words)
+
+        # Sort by the order they appeared in the sentence (longest first), dropping overlapped matches and those
+        # which aren't whole words, besides a plural 's' (so e.g. '6 GB' isn't found in '256 GB', but '3 day' is
+        # found in '3 days')
+        positions = keyPositions(sentence)
+        matches = self.scan(''.join(sentence[position] for position in positions).lower())
+        matches.sort(key=lambda match: (match[0], -match[1]))
+        entities = []
+        coverStart, coverEnd = [0, 0]
+        for start, end, entity in matches:
+            if not (isWordBoundary(sentence, positions[start]) and isWordEnd(sentence, positions[end - 1] + 1)):
+                continue
+            if end <= coverEnd and (end - start) < (coverEnd - coverStart):
+                continue
+            if end > coverEnd:
+                coverStart, coverEnd = [start, end]
+            if entity not in entities:
+                entities.append(entity)
+
+        return entities
+
+    # returns the (start, end, entity) spans of the sentence's characters which are known entities, in order.
+    # Unlike find's matches, spans never overlap and only ever cover whole words (so e.g. '2' isn't found in '12 years')
+    def spans(self, sentence):
+        positions = keyPositions(sentence)
+        matches = self.scan(''.join(sentence[position] for position in positions).lower())
+        matches.sort(key=lambda match: (match[0], -match[1]))
+
+        spans = []
+        for start, end, entity in matches:
+            start, end = [positions[start], positions[end - 1] + 1]
+            if spans and start < spans[-1][1]:
+                continue
+            if isWordBoundary(sentence, start) and isWordBoundary(sentence, end):
+                spans.append((start, end, entity))
+
+        return spans
+
+    # returns all of the (start, end, entity) matches in the key (see entityKey), in the order they end
+    def scan(self, key):
+        matches = []
+        state = 0
+        for end, c in enumerate(key, 1):
+            while state and c not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(c, 0)
+            for length, entity in self.outputs[state]:
+                matches.append((end - length, end, entity))
+
+        return matches
+
+    # returns the puzzle's EntityPlaceholders, creating them the first time they're needed
+    def getPlaceholders(self):
+        if self.placeholders is None:
+            self.placeholders = EntityPlaceholders(self.entitiesByType)
+        return self.placeholders
 
-    # Pseudo Named Entity Recognition
-    # Are any of the provided words a known Entity?
-    # NOTE: Logic is done from the known entity perspective so that it will work on multi-word entities
-    entities = [entity for entity in allEntities if (entity.lower() in sentence or noSpace(entity) in sentenceNoSpace)]
 
-    # Sort by the order they appeared in the sentence
-    entities.sort(key=lambda entity: (sentence.index(entity.lower()) if entity.lower() in sentence
-                                      else (sentenceNoSpace.index(noSpace(entity)) if noSpace(entity) in sentenceNoSpace
-                                            else None)))
+# ************************************************************************************
+def noSpace(x):
+    return ''.join(x.lower().split())
 
-    # Ensure we don't mistakenly get extra entities in the case where some entity names exist in other
-    # E.g. "12 silver" would naively be parsed as ["12 silver", "2 silver"]
-    for entity in entities:
-        otherEntities = list(entities)
-        otherEntities.remove(entity)
-        # If this entity is a subsctring of another entity, remove it!
-        if bool([e for e in otherEntities if entity in e]):
-            entities.remove(entity)
 
-    return entities
+# ************************************************************************************
+DIGIT_GROUPING = re.compile(r"(?<=\d),(?=\d{3}(?!\d))")
 
 
-# ************************************************************************************
-def noSpace(x):
-    return ''.join(x.lower().split())
+# How entities are compared against sentences
+def entityKey(x):
+    return noSpace(DIGIT_GROUPING.sub('', x))
+
+
+# returns the position in x of each of the characters of its entityKey
+def keyPositions(x):
+    grouping = set(match.start() for match in DIGIT_GROUPING.finditer(x))
+    return [position for position, c in enumerate(x) if position not in grouping and not c.isspace()]
+
+
+def isWordBoundary(x, position):
+    return position <= 0 or position >= len(x) or not (x[position - 1].isalnum() and x[position].isalnum())
+
+
+# returns whether or not a word ends at the position, or just after it with a plural 's'
+def isWordEnd(x, position):
+    return isWordBoundary(x, position) or (x[position:position + 1] == 's' and isWordBoundary(x, position + 1))
 
 
 # ************************************************************************************
 def readStatements(statementsFile):
-    return [statement for statement in readFile(statementsFile).split("\n") if statement]
+    return parseStatementsText(readFile(statementsFile))
+
+
+def parseStatementsText(content):
+    return [statement for statement in content.split("\n") if statement]
 
 
 # ************************************************************************************
 def readEntities(entitiesFile):
-    content = readFile(entitiesFile)
+    return parseEntitiesText(readFile(entitiesFile))
 
+
+def parseEntitiesText(content):
     x = content.split("\n\n")
     types = x[0].split(", ")
     entitiesByType = {}
@@ -321,14 +1260,42 @@ def writeActual(actualFile, actuals):
 
 # ************************************************************************************
 def readFile(file):
-    input_file = open(file)
-    return input_file.read()
+    with open(file) as input_file:
+        return input_file.read()
 
 
 # ************************************************************************************
 def writeFile(file, contents):
-    input_file = open(file, 'w')
-    return input_file.write(contents + '\n')
+    with open(file, 'w') as output_file:
+        return output_file.write(contents + '\n')
+
+
+# ************************************************************************************
+# A puzzle's files, either in its directory or (given a CorpusStore) packed into the store
+class PuzzleFiles(object):
+    def __init__(self, puzzle, store=None):
+        self.puzzle = puzzle
+        self.store = store
+        self.files = store.readPuzzle(puzzle) if store else None  # All of them at once, in a single query
+
+    def exists(self, name):
+        if self.store:
+            return name in self.files
+        return os.path.exists(os.path.join(self.puzzle, name))
+
+    def read(self, name):
+        if not self.store:
+            return readFile(os.path.join(self.puzzle, name))
+        if name not in self.files:
+            raise IOError("No such file in the corpus store: '{0}/{1}'".format(self.puzzle, name))
+        return self.files[name]
+
+    def write(self, name, content):
+        if not self.store:
+            with open(os.path.join(self.puzzle, name), 'w') as output_file:
+                return output_file.write(content)
+        self.files[name] = content
+        self.store.write(self.puzzle, name, content)
 
 
 # ************************************************************************************
@@ -341,86 +1308,224 @@ def invertEntityMap(entitiesByType):
     return inverted
 
 
-def getWordsByPosIdxLUT(parts):
-    charIdx = 0
-    index = {}
+# ************************************************************************************
+# POS-pattern matcher engine
+#
+# The PHRASE_MATCHERS regexes are written against space-separated POS tags (e.g. 'S NP VP PP NP'),
+# but they're compiled to run against one character per tag, so a group's span is a range of POS indices.
+# All of the matchers are combined into a single regex of optional lookaheads, so one match call
+# reports every matcher that applies, along with its groups.
+ENTITY_PHRASE = r"((NP )?(NP )?((VP )?PP )?)?NP"
+X = ENTITY_PHRASE.count('(')
+ENTITY_PHRASE_SIMPLE = r"(NP )?NP"
+Y = ENTITY_PHRASE_SIMPLE.count('(')
+ENTITY_PHRASE_PASSIVE = r"(NP )?NP SBAR WHNP S (VP (PP )?(NP )?NP)"
+Z = ENTITY_PHRASE_PASSIVE.count('(')
+
+CMP_ADVP = r"^S (" + ENTITY_PHRASE + ").* (VP (NP )?(ADVP )(PP)) (" + ENTITY_PHRASE + ")$"
+CMP_VPVPVP = r"^S (" + ENTITY_PHRASE + ").* VP (VP )+(NP )?(PP )(" + ENTITY_PHRASE + ")$"
+CMP_ADJP = r"^S (" + ENTITY_PHRASE + ").* (VP (NP )?(ADJP )PP) (" + ENTITY_PHRASE + ")$"
+CMP_PP = r"^S (" + ENTITY_PHRASE + ") (VP (NP )?(PP )(NP )?)(" + ENTITY_PHRASE + ")$"
+CMP_NP = r"^S (" + ENTITY_PHRASE + ").* (PP )?(NP )PP (" + ENTITY_PHRASE + ")$"
+CMP_VP = r"^S (" + ENTITY_PHRASE + ").* (VP )(" + ENTITY_PHRASE + ")$"
+# TODO: Convert CMP_WHNP_VP to use ENTITY_PHRASE_PASSIVE
+CMP_WHNP_VP = r"^S .* SBAR WHNP S (VP (PP )?)?(" + ENTITY_PHRASE_SIMPLE + ") (VP )(" + ENTITY_PHRASE_SIMPLE + ")"
+CMP_WHNP_PP = r"^S .*?(" + ENTITY_PHRASE_PASSIVE + ") (VP (NP )?(PP )?NP) (PP )?(" + ENTITY_PHRASE + ")$"
+CMP_WHNP_ADJP_WHNP = r"^S .*?(" + ENTITY_PHRASE_PASSIVE + ") (VP (NP )?(PP )?NP) (ADJP ADVP (PP )?)(" + ENTITY_PHRASE_PASSIVE + "$)"
+CMP_ADJP_ADVP = r"^S (" + ENTITY_PHRASE + ").* PP (NP )?(ADJP )?(ADVP )PP (" + ENTITY_PHRASE + ")$"
+EQUALITY_VP = r"^S .*?(" + ENTITY_PHRASE + ") (VP )?VP (" + ENTITY_PHRASE + ")$"
+
+#
+# Regexes for identifying Entities, Comparisons, and Quantifiers ordered by priority
+# These should be sorted by order of preference. First match found is used.
+#
+# NOTE: 'entities' values are **both** used
+#       'comparison' values are only used for the first match
+#       'quantifier' values are only used for the first match
+#
+# TODO: Use official English tenses (https://www.ego4u.com/en/cram-up/grammar/tenses)
+#       Include examples of each tense
+PHRASE_MATCHERS = [
+    {'name': 'Future (ADVP)', 'reg': CMP_ADVP, 'entities': [1, X + 6], 'comparison': [X + 5], 'quantifier': [X + 4, X + 3]},
+    {'name': 'Future (VPVPVP)', 'reg': CMP_VPVPVP, 'entities': [1, X + 5], 'comparison': [X + 4], 'quantifier': [X + 3]},
+    {'name': 'Simple (NP)', 'reg': CMP_NP, 'entities': [1, X + 4], 'comparison': [X + 3], 'quantifier': [X + 3]},
+    {'name': 'Present (ADJP)', 'reg': CMP_ADJP, 'entities': [1, X + 5], 'comparison': [X + 4], 'quantifier': [X + 3, X + 2]},
+    {'name': 'Present (PP)', 'reg': CMP_PP, 'entities': [1, X + 6], 'comparison': [X + 4], 'quantifier': [X + 3, X + 5]},
+    {'name': 'Simple (VP)', 'reg': CMP_VP, 'entities': [1, X + 3], 'comparison': [X + 2], 'quantifier': []},
+    {'name': 'Past Passive (WHNP_VP)', 'reg': CMP_WHNP_VP, 'entities': [3, Y + 5], 'comparison': [Y + 4], 'quantifier': []},
+    {'name': 'Past Passive (WHNP_PP)', 'reg': CMP_WHNP_PP, 'entities': [1, Z + 6], 'comparison': [Z + 2], 'quantifier': []},
+    {'name': 'Past Passive (WHNP_ADJP)', 'reg': CMP_WHNP_ADJP_WHNP, 'entities': [1, Z + 7], 'comparison': [Z + 5],
+     'quantifier': [Z + 5]},
+]
+
+# One character per POS tag (see pylinkgrammar's ConstituentNode labels). Unknown tags match only '.'
+POS_CODES = {
+    'S': 'S', 'NP': 'N', 'VP': 'V', 'PP': 'P', 'ADVP': 'D', 'ADJP': 'J', 'SBAR': 'B',
+    'WHNP': 'W', 'WHPP': 'H', 'WHADVP': 'A', 'SINV': 'I', 'QP': 'Q', 'PRT': 'R'
+}
+UNKNOWN_POS_CODE = '_'
 
-    for node in parts:
-        index[charIdx] = node.words
-        # Add 1 because the POS tags are separated by spaces
-        charIdx = charIdx + len(node.type) + 1
 
-    return index
+# ************************************************************************************
+# Translates a space-separated POS regex into a regex over POS codes.
+# Only the groups in 'keepGroups' stay capturing (Python's re caps the number of groups
+# in a single regex), so this also returns the new number of each kept group
+def compilePosPattern(reg, keepGroups):
+    # A wildcard with a space on either side spans at least one tag (e.g. '^S .* SBAR' doesn't match 'S SBAR'),
+    # which once the spaces are gone means at least one code
+    reg = re.sub(r"(?<= )\.\*(\??)(?= )", r".+\1", reg)
+    codes = re.sub(r"[A-Z]+", lambda tag: POS_CODES[tag.group(0)], reg).replace(' ', '')
+
+    pattern = ''
+    renumbered = {}
+    groupIdx = 0
+    for c in codes:
+        if c == '(':
+            groupIdx += 1
+            if groupIdx in keepGroups:
+                renumbered[groupIdx] = len(renumbered) + 1
+            else:
+                c = '(?:'
+        pattern += c
 
+    return pattern, renumbered
 
-# lut       - a wordsByPosIdx lookup table
-# idxRange  - a start (inclusive) and end (exclusive) POS idx
-# returns the words found in the POS Idx range
-def getWordsByPosIdx(lut, posIdxRange):
-    words = [v for k, v in lut.iteritems() if posIdxRange[0] <= k < posIdxRange[1]]
-    return flatten(words)
 
+# ************************************************************************************
+def compilePhraseMatchers(matchers):
+    combined = ''
+    groupCount = 0
+    for matcher in matchers:
+        keepGroups = set(matcher['entities'] + matcher['comparison'] + matcher['quantifier'])
+        pattern, renumbered = compilePosPattern(matcher['reg'], keepGroups)
 
-def parseConstituentParts(entitiesByType, parts, sentence, verbose=False):
-    ENTITY_PHRASE = r"((NP )?(NP )?((VP )?PP )?)?NP"
-    X = ENTITY_PHRASE.count('(')
-    ENTITY_PHRASE_SIMPLE = r"(NP )?NP"
-    Y = ENTITY_PHRASE_SIMPLE.count('(')
-    ENTITY_PHRASE_PASSIVE = r"(NP )?NP SBAR WHNP S (VP (PP )?(NP )?NP)"
-    Z = ENTITY_PHRASE_PASSIVE.count('(')
+        # Each matcher is an optional lookahead, wrapped in a group telling us whether it matched
+        matcher['group'] = groupCount + 1
+        matcher['groups'] = dict((idx, matcher['group'] + newIdx) for idx, newIdx in renumbered.items())
+        combined += '(?:(?=(' + pattern + '))|)'
+        groupCount += 1 + len(renumbered)
 
-    CMP_ADVP = r"^S (" + ENTITY_PHRASE + ").* (VP (NP )?(ADVP )(PP)) (" + ENTITY_PHRASE + ")$"
-    CMP_VPVPVP = r"^S (" + ENTITY_PHRASE + ").* VP (VP )+(NP )?(PP )(" + ENTITY_PHRASE + ")$"
-    CMP_ADJP = r"^S (" + ENTITY_PHRASE + ").* (VP (NP )?(ADJP )PP) (" + ENTITY_PHRASE + ")$"
-    CMP_PP = r"^S (" + ENTITY_PHRASE + ") (VP (NP )?(PP )(NP )?)(" + ENTITY_PHRASE + ")$"
-    CMP_NP = r"^S (" + ENTITY_PHRASE + ").* (PP )?(NP )PP (" + ENTITY_PHRASE + ")$"
-    CMP_VP = r"^S (" + ENTITY_PHRASE + ").* (VP )(" + ENTITY_PHRASE + ")$"
-    # TODO: Convert CMP_WHNP_VP to use ENTITY_PHRASE_PASSIVE
-    CMP_WHNP_VP = r"^S .* SBAR WHNP S (VP (PP )?)?(" + ENTITY_PHRASE_SIMPLE + ") (VP )(" + ENTITY_PHRASE_SIMPLE + ")"
-    CMP_WHNP_PP = r"^S .*?(" + ENTITY_PHRASE_PASSIVE + ") (VP (NP )?(PP )?NP) (PP )?(" + ENTITY_PHRASE + ")$"
-    CMP_WHNP_ADJP_WHNP = r"^S .*?(" + ENTITY_PHRASE_PASSIVE + ") (VP (NP )?(PP )?NP) (ADJP ADVP (PP )?)(" + ENTITY_PHRASE_PASSIVE + "$)"
-    CMP_ADJP_ADVP = r"^S (" + ENTITY_PHRASE + ").* PP (NP )?(ADJP )?(ADVP )PP (" + ENTITY_PHRASE + ")$"
-    EQUALITY_VP = r"^S .*?(" + ENTITY_PHRASE + ") (VP )?VP (" + ENTITY_PHRASE + ")$"
+    return re.compile(combined)
 
-    #
-    # Regexes for identifying Entities, Comparisons, and Quantifiers ordered by priority
-    # These should be sorted by order of preference. First match found is used.
-    #
-    # NOTE: 'entities' values are **both** used
-    #       'comparison' values are only used for the first match
-    #       'quantifier' values are only used for the first match
-    #
-    # TODO: Use official English tenses (https://www.ego4u.com/en/cram-up/grammar/tenses)
-    #       Include examples of each tense
-    PHRASE_MATCHERS = [
-        {'name': 'Future (ADVP)', 'reg': CMP_ADVP, 'entities': [1, X + 6], 'comparison': [X + 5], 'quantifier': [X + 4, X + 3]},
-        {'name': 'Future (VPVPVP)', 'reg': CMP_VPVPVP, 'entities': [1, X + 5], 'comparison': [X + 4], 'quantifier': [X + 3]},
-        {'name': 'Simple (NP)', 'reg': CMP_NP, 'entities': [1, X + 4], 'comparison': [X + 3], 'quantifier': [X + 3]},
-        {'name': 'Present (ADJP)', 'reg': CMP_ADJP, 'entities': [1, X + 5], 'comparison': [X + 4], 'quantifier': [X + 3, X + 2]},
-        {'name': 'Present (PP)', 'reg': CMP_PP, 'entities': [1, X + 6], 'comparison': [X + 4], 'quantifier': [X + 3, X + 5]},
-        {'name': 'Simple (VP)', 'reg': CMP_VP, 'entities': [1, X + 3], 'comparison': [X + 2], 'quantifier': []},
-        {'name': 'Past Passive (WHNP_VP)', 'reg': CMP_WHNP_VP, 'entities': [3, Y + 5], 'comparison': [Y + 4], 'quantifier': []},
-        {'name': 'Past Passive (WHNP_PP)', 'reg': CMP_WHNP_PP, 'entities': [1, Z + 6], 'comparison': [Z + 2], 'quantifier': []},
-        {'name': 'Past Passive (WHNP_ADJP)', 'reg': CMP_WHNP_ADJP_WHNP, 'entities': [1, Z + 7], 'comparison': [Z + 5],
-         'quantifier': [Z + 5]},
-    ]
-
-    # Get the Types of the parts as a single string so we can check the pattern with a Regex
-    # Should look like 'S NP VP PP NP NP'
-    posParts = [p.type for p in parts]
-    posStr = ' '.join(posParts)
 
+POS_MATCHER = compilePhraseMatchers(PHRASE_MATCHERS)
+MATCHERS_BY_NAME = dict((matcher['name'], matcher) for matcher in PHRASE_MATCHERS)
+
+
+# ************************************************************************************
+# A linkage's flat constituents, converted once into parallel arrays:
+#   'posCodes' - each constituent's POS code, ready for matchPhrases
+#   'words'    - all of the constituents' words, flattened
+#   'offsets'  - prefix offsets into 'words', so constituent i's words are words[offsets[i]:offsets[i + 1]]
+class ConstituentTable(object):
+    __slots__ = ['types', 'posCodes', 'words', 'offsets']
+
+    def __init__(self, parts):
+        self.types = [part.type for part in parts]
+        self.posCodes = ''.join([POS_CODES.get(type, UNKNOWN_POS_CODE) for type in self.types])
+        self.words = []
+        self.offsets = array('i', [0])
+        for part in parts:
+            self.words.extend(part.words)
+            self.offsets.append(len(self.words))
+
+    # Identifies the constituents, e.g. for spotting duplicate linkages
+    def key(self):
+        return tuple(self.types), tuple(self.words), tuple(self.offsets)
+
+    # idxRange - a start (inclusive) and end (exclusive) POS idx
+    # returns the words found in the POS Idx range
+    def getWords(self, posIdxRange):
+        start, end = posIdxRange
+        if start < 0:
+            return []
+        return self.words[self.offsets[start]:self.offsets[end]]
+
+    def __repr__(self):
+        return repr([Constituent(self.types[i], self.words[self.offsets[i]:self.offsets[i + 1]])
+                     for i in range(len(self.types))])
+
+
+# ************************************************************************************
+# Match all of the PHRASE_MATCHERS against the POS codes, in a single pass
+# matchers - the PHRASE_MATCHERS to return the matches of, in priority order
+# returns [matcher, regs] for each matching matcher (in priority order), where
+#   regs maps the matcher's group indexes to their POS idx ranges
+def matchPhrases(posCodes, matchers=PHRASE_MATCHERS):
+    match = POS_MATCHER.match(posCodes)
+
+    matches = []
+    for matcher in matchers:
+        if match.start(matcher['group']) < 0:
+            continue
+        regs = dict((idx, match.span(group)) for idx, group in matcher['groups'].items())
+        matches.append([matcher, regs])
+
+    return matches
+
+
+# parts - a ConstituentTable of the linkage's constituents
+# returns [[entities, comparison, quantifier], matcher], where matcher is the name of the PHRASE_MATCHERS entry
+# the results came from (None if they didn't come from one)
+def parseConstituentParts(entityIndex, parts, sentence, verbose=False, options=None):
+    options = options or {}
     if verbose:
-        print "POS: " + posStr
+        # Should look like 'S NP VP PP NP NP'
+        print "POS: " + ' '.join(parts.types)
         print parts
 
     # Knowing how many entities are in the sentence helps us make some top-level decisions
-    allWords = [part.words for part in parts]
-    allEntities = parseAllEntities(entitiesByType, flatten(allWords), verbose)
+    allEntities = parseAllEntities(entityIndex, parts.words, verbose)
+
+    special = parseSpecialClause(entityIndex, allEntities, sentence, verbose)
+    if special:
+        return [special, None]
 
     #
-    # Special case for really long sentences
+    # Try to generically parse the Entities/Comparisons/Quantifier based on regex results
     #
+    best, bestMatcher = [None, None]
+    matchers = [MATCHERS_BY_NAME[name] for name in options['matchers']] if options.get('matchers') else PHRASE_MATCHERS
+    preferences = options.get('preferences', DEFAULT_PREFERENCES)
+    for matcher, regs in matchPhrases(parts.posCodes, matchers):
+        METRICS.inc('matcher_matches_total', matcher=matcher['name'])
+        try:
+            results = parseViaRegex(regs, entityIndex, parts, matcher['entities'], matcher['comparison'], matcher['quantifier'])
+            if betterResult(best, results, preferences) is not best:
+                best, bestMatcher = [results, matcher]
+        except:
+            if verbose:
+                print 'No valid matches found despite regex match for ' + matcher['name']
+
+    if not best:
+        return [[None, None, None], None]
+    METRICS.inc('matcher_wins_total', matcher=bestMatcher['name'])
+    return [best, bestMatcher['name']]
+
+
+# ************************************************************************************
+# The special clauses (see parseSpecialClause) which parseLinkage would decide from the sentence alone, whatever
+# its linkages, so they can be parsed without link-grammar. That's "either ... or" clauses, and "Of X and Y, one
+# ... and the other ..." clauses with two entities on either side of the ", one", which pair up the same way
+# whatever the linkage (and don't turn into a big "not" when a linkage loses one of them, e.g. a '$500').
+# Big "not" clauses, and "Of ..." clauses with more or fewer entities, depend on which of the sentence's entities
+# end up among the linkage's words
+# returns [entities, comparison, quantifier] if the sentence is one of them, otherwise None
+def parseFastClause(entityIndex, sentence, verbose=False):
+    if 'Of' in sentence:
+        head, sep, tail = sentence.partition(', one ')
+        if not sep or len(parseAllEntities(entityIndex, head)) != 2 or len(parseAllEntities(entityIndex, tail)) != 2:
+            return None
+    elif not ("either" in sentence and "or" in sentence):
+        return None
+    return parseSpecialClause(entityIndex, parseAllEntities(entityIndex, sentence, verbose), sentence, verbose)
+
+
+# ************************************************************************************
+# Special cases for really long sentences, which are decided by their entities alone
+# allEntities - the entities found in the sentence
+# returns [entities, comparison, quantifier] if the sentence is a special case, otherwise None
+def parseSpecialClause(entityIndex, allEntities, sentence, verbose=False):
     isEitherOr = ("either" in sentence) and ("or" in sentence)
     isDoubleEitherOr = ('Of' in sentence) and (len(allEntities) == 4)
     isBigNot = (not isEitherOr) and (len(allEntities) > 2)
@@ -431,9 +1536,9 @@ def parseConstituentParts(entitiesByType, parts, sentence, verbose=False):
     if isDoubleEitherOr:
         entities = [None, None]
         eitherParts = [' '.join(allEntities[0:2]), ' '.join(allEntities[2:4])]
-        entities[0] = parseEitherEntities(entitiesByType, eitherParts[0], verbose)
-        entities[1] = parseEitherEntities(entitiesByType, eitherParts[1], verbose)
-        comparison, quantifier = parseComparisons([], None, entitiesByType, verbose)  # Get default comparison ("is")
+        entities[0] = parseEitherEntities(entityIndex, eitherParts[0], verbose)
+        entities[1] = parseEitherEntities(entityIndex, eitherParts[1], verbose)
+        comparison, quantifier = parseComparisons([], None, entityIndex.entitiesByType, verbose)  # Get default comparison ("is")
         return [entities, comparison, quantifier]
 
     # Statements saying X is (either Y or Z). This is effectively an XOR
@@ -442,9 +1547,9 @@ def parseConstituentParts(entitiesByType, parts, sentence, verbose=False):
     elif isEitherOr:
         entities = [None, None]
         eitherParts = sentence.split('either')
-        entities[0] = parseEitherEntities(entitiesByType, eitherParts[0], verbose)
-        entities[1] = parseEitherEntities(entitiesByType, eitherParts[1], verbose)
-        comparison, quantifier = parseComparisons([], None, entitiesByType, verbose)  # Get default comparison ("is")
+        entities[0] = parseEitherEntities(entityIndex, eitherParts[0], verbose)
+        entities[1] = parseEitherEntities(entityIndex, eitherParts[1], verbose)
+        comparison, quantifier = parseComparisons([], None, entityIndex.entitiesByType, verbose)  # Get default comparison ("is")
         return [entities, comparison, quantifier]
 
     # Statements like
@@ -457,67 +1562,57 @@ def parseConstituentParts(entitiesByType, parts, sentence, verbose=False):
         quantifier = None
         return [entities, comparison, quantifier]
 
-    #
-    # Try to generically parse the Entities/Comparisons/Quantifier based on regex results
-    #
-    wordLUT = getWordsByPosIdxLUT(parts)
-
-    candidates = []
-    for matcher in PHRASE_MATCHERS:
-        match = re.match(matcher['reg'], posStr)
-        if bool(match):
-            try:
-                results = parseViaRegex(match, entitiesByType, wordLUT, matcher['entities'], matcher['comparison'], matcher['quantifier'])
-                candidates = addResultCandidate(candidates, results)
-            except:
-                if verbose:
-                    print 'No valid matches found despite regex match for ' + matcher['name']
-
-    return candidates[0] if len(candidates) > 0 else [None, None, None]
+    return None
 
 
 # ************************************************************************************
-def addResultCandidate(candidates, results):
-    candidates.append(results)
-    return sorted(candidates, cmp=compareResults)
+# returns whichever of the results is the better match, preferring the current best if they're equally good
+def betterResult(best, results, preferences=DEFAULT_PREFERENCES):
+    if not best or compareResults(results, best, preferences) < 0:
+        return results
+    return best
 
 
 # ************************************************************************************
+# preferences - the PREFERENCES to compare the results by, in order
 # -1 => result1 is a better match
 # +1 => result2 is a better match
 #  0 => equally-good matches
-def compareResults(result1, result2):
-    # A) Prefer comparisons of equalities
-    if ('is' in result1 and 'is' not in result2):
-        return +1
-    if ('is' not in result1 and 'is' in result2):
-        return -1
-
-    size1 = len([x for x in result1 if x])
-    size2 = len([x for x in result2 if x])
-
-    # B) Prefer more detailed results
-    if size1 > size2:
-        return -1
-    if size1 < size2:
-        return +1
-    else:
-        return 0
+def compareResults(result1, result2, preferences=DEFAULT_PREFERENCES):
+    for preference in preferences:
+        # A) Prefer comparisons of equalities
+        if preference == 'comparison':
+            if ('is' in result1 and 'is' not in result2):
+                return +1
+            if ('is' not in result1 and 'is' in result2):
+                return -1
+
+        # B) Prefer more detailed results
+        elif preference == 'detail':
+            size1 = len([x for x in result1 if x])
+            size2 = len([x for x in result2 if x])
+            if size1 > size2:
+                return -1
+            if size1 < size2:
+                return +1
+
+    return 0
 
 
 # ************************************************************************************
-def parseViaRegex(match, entitiesByType, wordLUT, entitiesIdx, comparisonsIdx, quantifiersIdx):
-    entities = [getWordsByPosIdx(wordLUT, match.regs[idx]) for idx in entitiesIdx]
+def parseViaRegex(regs, entityIndex, parts, entitiesIdx, comparisonsIdx, quantifiersIdx):
+    entities = [parts.getWords(regs[idx]) for idx in entitiesIdx]
     # Named Entity Recognition: Filter down to known entities
-    entities = [' '.join(parseAllEntities(entitiesByType, entity, verbose)) for entity in entities]
+    entities = [' '.join(parseAllEntities(entityIndex, entity, verbose)) for entity in entities]
     entities = [entity for entity in entities if entity]
     assert (len(entities) == len(entitiesIdx)), 'Unable to find expected number of entities'
 
-    comparisons = [getWordsByPosIdx(wordLUT, match.regs[idx]) for idx in comparisonsIdx]
-    comparisons = [comp for comp in comparisons if comp][0]
+    # Numbers can be both entities and quantifiers (e.g. "costs 500 dollars less"), so put back any replaced ones
+    comparisons = [parts.getWords(regs[idx]) for idx in comparisonsIdx]
+    comparisons = [flatten([entityIndex.originals.get(word, word).split() for word in comp]) for comp in comparisons if comp][0]
 
-    quantifiers = [getWordsByPosIdx(wordLUT, match.regs[idx]) for idx in quantifiersIdx]
-    quantifiers = [mod for mod in quantifiers if mod]
+    quantifiers = [parts.getWords(regs[idx]) for idx in quantifiersIdx]
+    quantifiers = [flatten([entityIndex.originals.get(word, word).split() for word in mod]) for mod in quantifiers if mod]
     if quantifiers:
         # Naively remove the comparison from the quantifier. This is NOT robust.
         quantifier = [word for word in quantifiers[0] if word not in comparisons]
@@ -527,7 +1622,7 @@ def parseViaRegex(match, entitiesByType, wordLUT, entitiesIdx, comparisonsIdx, q
     else:
         quantifier = None
 
-    [comparison, quantifier] = parseComparisons(comparisons, quantifier, entitiesByType, verbose)
+    [comparison, quantifier] = parseComparisons(comparisons, quantifier, entityIndex.entitiesByType, verbose)
     return [entities, comparison, quantifier]
 
 
@@ -580,8 +1675,8 @@ def parseComparisons(comparisons, quantifier, entitiesByType, verbose=False):
 
 
 # ************************************************************************************
-def parseEitherEntities(entitiesByType, words, verbose=False):
-    entities = parseAllEntities(entitiesByType, words, verbose)
+def parseEitherEntities(entityIndex, words, verbose=False):
+    entities = parseAllEntities(entityIndex, words, verbose)
     if len(entities) == 1:
         return entities[0]
     elif len(entities) > 1:
@@ -601,20 +1696,247 @@ class ParseError(Exception):
 
 
 # ************************************************************************************
-def promptColors():
-    colors = {}
-    colors['RED'] = "\033[0;31m"
-    colors['LIGHT_RED'] = "\033[1;31m"
-    colors['YELLOW'] = "\033[1;33m"
-    colors['GREEN'] = "\033[0;32m"
-    colors['LIGHT_GREEN'] = "\033[1;32m"
-    colors['BLUE'] = "\033[1;94m"
-    colors['LIGHT_BLUE'] = "\033[1;36m"
-    colors['PURPLE'] = "\033[1;34m"
-    colors['WHITE'] = "\033[1;37m"
-    colors['LIGHT_GRAY'] = "\033[0;37m"
-    colors['COLOR_NONE'] = "\033[0m"
-    return colors
+PROMPT_COLORS = {
+    'RED': "\033[0;31m",
+    'LIGHT_RED': "\033[1;31m",
+    'YELLOW': "\033[1;33m",
+    'GREEN': "\033[0;32m",
+    'LIGHT_GREEN': "\033[1;32m",
+    'BLUE': "\033[1;94m",
+    'LIGHT_BLUE': "\033[1;36m",
+    'PURPLE': "\033[1;34m",
+    'WHITE': "\033[1;37m",
+    'LIGHT_GRAY': "\033[0;37m",
+    'COLOR_NONE': "\033[0m"
+}
+
+
+
+# ************************************************************************************
+# Times a stage of parsing, adding its duration to TIMINGS[stage].
+# Stages exclude the time of any stages nested within them, so they add up to the total time
+@contextlib.contextmanager
+def timed(stage):
+    start = time.time()
+    TIMER_STACK.append(0.0)
+    try:
+        yield
+    finally:
+        elapsed = time.time() - start
+        exclusive = elapsed - TIMER_STACK.pop()
+        TIMINGS[stage] += exclusive
+        if TIMER_STACK:
+            TIMER_STACK[-1] += elapsed
+        if METRICS.enabled:
+            METRICS.observe('stage_seconds', exclusive, stage=stage)
+
+
+# ************************************************************************************
+# Runs a single puzzle inside a "--jobs" worker, buffering its output so the parent
+# can print each puzzle's output in the same order as a serial run would
+def runPuzzle(job):
+    inputDir, verbose, quiet = job
+
+    stdout = sys.stdout
+    output = StringIO.StringIO()
+    sys.stdout = codecs.getwriter('utf8')(output)
+    STATS.clear()
+    TIMINGS.clear()
+    METRICS.clear()
+    try:
+        counts = main(inputDir, verbose, quiet, PARSER, OPTIONS)
+        if OPTIONS.get('store'):
+            OPTIONS['store'].flush()
+    finally:
+        sys.stdout = stdout
+
+    return output.getvalue(), counts, dict(STATS), dict(TIMINGS), METRICS.snapshot()
+
+
+# ************************************************************************************
+# Runs a single puzzle in this process, printing its output as it goes, but otherwise like runPuzzle:
+# its share of the STATS and TIMINGS is returned rather than added to them
+def runPuzzleInline(job):
+    inputDir, verbose, quiet = job
+
+    stats, timings = [STATS.copy(), TIMINGS.copy()]
+    STATS.clear()
+    TIMINGS.clear()
+    try:
+        counts = main(inputDir, verbose, quiet, PARSER, OPTIONS)
+        puzzleStats, puzzleTimings = [dict(STATS), dict(TIMINGS)]
+    finally:
+        STATS.clear()
+        STATS.update(stats)
+        TIMINGS.clear()
+        TIMINGS.update(timings)
+
+    return '', counts, puzzleStats, puzzleTimings, None
+
+
+# ************************************************************************************
+# Scores a puzzle's existing parseActual.txt against its parseExpected.txt, without parsing anything
+# returns [total, success, fail], like main() did when it wrote parseActual.txt
+def scorePuzzle(inputDir, quiet=False, store=None):
+    files = PuzzleFiles(inputDir, store)
+    clues = parseStatementsText(files.read('clues.txt'))
+    actuals = parseStatementsText(files.read('parseActual.txt')) if files.exists('parseActual.txt') else None
+    expectedParses = parseStatementsText(files.read('parseExpected.txt')) if files.exists('parseExpected.txt') else None
+
+    parses = readActualClues(files, actuals) if actuals is not None else None
+    if parses is None and actuals is not None and len(actuals) == len(clues):
+        parses = dict(enumerate(actuals))  # Every clue parsed, so there's no telling them apart to record
+    if parses is None:
+        print PROMPT_COLORS['YELLOW'] + "Skipping " + inputDir + ": which clues parseActual.txt has the parses of isn't " \
+              "recorded (see " + ACTUAL_CLUES_FILE + "), so parse it again" + PROMPT_COLORS['COLOR_NONE']
+        return [0, 0, 0]
+
+    # Scored just as main() scored them: clues without an expected parse succeed so long as they parsed
+    success = 0
+    for index, actual in parses.items():
+        expected = expectedParses[index] if expectedParses and index < len(expectedParses) else None
+        if actual and (not expected or actual == expected):
+            success += 1
+
+    total = len(parses)
+    if not quiet:
+        print PROMPT_COLORS['BLUE'] + inputDir + PROMPT_COLORS['COLOR_NONE']
+        print "   {0} of {1} statements parsed as expected".format(success, total)
+    return [total, success, total - success]
+
+
+# ************************************************************************************
+# returns the parse (None if it failed) of each clue parsed, by its index, from ACTUAL_CLUES_FILE and the lines of
+# parseActual.txt, or None if the file is missing or isn't about these lines
+def readActualClues(files, actuals):
+    if not files.exists(ACTUAL_CLUES_FILE):
+        return None
+
+    parses = {}
+    for line in parseStatementsText(files.read(ACTUAL_CLUES_FILE)):
+        number, actualLine = line.split(' ')
+        if actualLine != '-' and int(actualLine) > len(actuals):
+            return None
+        parses[int(number) - 1] = actuals[int(actualLine) - 1] if actualLine != '-' else None
+    if len([actual for actual in parses.values() if actual]) != len(actuals):
+        return None
+    return parses
+
+
+# ************************************************************************************
+# Prints the summary of a run's results
+def printSummary(total, success):
+    print ""
+    print ""
+
+    if (success / float(total)) < 0.70:
+        print PROMPT_COLORS['RED'] + '## FAILURE'
+    elif (success / float(total)) < 0.90:
+        print PROMPT_COLORS['YELLOW'] + '## DECENT'
+    else:
+        print PROMPT_COLORS['GREEN'] + '## SUCCESS'
+
+    print PROMPT_COLORS['WHITE'] + str(100 * success / total) + "% success -  " \
+          + str(success) + " of " + str(total) + " total statements"
+
+
+# ************************************************************************************
+# Prints the summary of a run (or of its checkpoints, see "--merge"), from its totals and the STATS and TIMINGS
+# puzzles  - the number of puzzles in the run
+# backends - the backends the run parsed with
+# solve    - whether or not the run solved the puzzles ("--solve")
+# pipeline - whether or not the run was a "--pipeline" run
+def printReport(total, success, puzzles, backends, quiet=False, solve=False, pipeline=False):
+    printSummary(total, success)
+    if not quiet:
+        print PROMPT_COLORS['LIGHT_GRAY'] + "Viable parses by backend: " \
+              + ', '.join(["{0}: {1} ({2:.2f} seconds)".format(backend, STATS['resolved_' + backend], TIMINGS['backend_' + backend])
+                           for backend in backends])
+        nullTiers = sorted(int(key[len('nullTier'):]) for key in STATS if key.startswith('nullTier'))
+        print PROMPT_COLORS['LIGHT_GRAY'] + "Viable parses by maximum null links: " \
+              + ', '.join(["{0}: {1}".format(n, STATS['nullTier' + str(n)]) for n in nullTiers])
+        if STATS['reusedClues']:
+            print PROMPT_COLORS['LIGHT_GRAY'] + "Reused " + str(STATS['reusedClues']) \
+                  + " parses of clues unchanged since the last run"
+        print PROMPT_COLORS['LIGHT_GRAY'] + "Skipped " + str(STATS['dedupedLinkages']) \
+              + " linkages with the same constituent phrases as an earlier linkage"
+    if pipeline:
+        print PROMPT_COLORS['WHITE'] + "Solved {0} of {1} puzzles while parsing, skipping {2} of {3} clue parses".format(
+            STATS['pipelineSolved'], puzzles, STATS['pipelineSkipped'], STATS['pipelineClues'])
+    if solve:
+        print PROMPT_COLORS['WHITE'] + "Solved {0} of {1} puzzles ({2} of {3} answers)".format(
+            STATS['solvedPuzzles'], puzzles, STATS['solvedAnswers'], STATS['answers'])
+        if STATS['searches']:
+            print PROMPT_COLORS['LIGHT_GRAY'] + "Searched {0} nodes for {1} puzzles: {2} unique, {3} with several solutions, " \
+                  "{4} with none, {5} gave up".format(STATS['searchNodes'], STATS['searches'], STATS['search_unique'],
+                                                      STATS['search_multiple'], STATS['search_none'], STATS['search_budget'])
+    if STATS['timeouts']:
+        print PROMPT_COLORS['YELLOW'] + str(STATS['timeouts']) + " parse attempts ran out of time"
+    print ""
+
+
+# ************************************************************************************
+# Sets up a parsePuzzles() worker with the parser and options to parse its puzzles with
+def initParsePuzzles(p, options):
+    global PARSER, OPTIONS
+    PARSER, OPTIONS = [p, options]
+
+
+# ************************************************************************************
+# Sends a "--jobs" worker's metrics so far to the run's metrics.PeriodicWriter every "--metrics-interval" seconds,
+# rather than only with its puzzle's results, starting them afresh
+def sendMetrics(options):
+    global METRICS_SENT
+    if options.get('metricsQueue') and time.time() - METRICS_SENT >= options['metricsInterval']:
+        options['metricsQueue'].put(METRICS.snapshot())
+        METRICS.clear()
+        METRICS_SENT = time.time()
+
+
+# ************************************************************************************
+# Parses a puzzle inside a parsePuzzles() worker
+def runParsePuzzle(puzzle):
+    entitiesByType, clues = puzzle
+    return parsePuzzle(entitiesByType, clues, OPTIONS, PARSER)
+
+
+# ************************************************************************************
+# Parses a single clue inside a "--daemon" worker
+# returns [parse, error], where parse is formatted like parseExpected.txt, or None if the clue couldn't be parsed
+def runClue(job):
+    entitiesByType, clue, timeout = job
+
+    options = OPTIONS
+    if timeout and not (OPTIONS.get('timeLimit') and OPTIONS['timeLimit'] <= timeout):
+        options = dict(OPTIONS, timeLimit=timeout)
+
+    stdout = sys.stdout
+    sys.stdout = codecs.getwriter('utf8')(StringIO.StringIO())
+    try:
+        # Parse the clue like it was read from the puzzle's files
+        clue = clue.encode('utf8')
+        entitiesByType = dict((entityType.encode('utf8'), [entity.encode('utf8') for entity in entities])
+                              for entityType, entities in entitiesByType.items())
+
+        result = parseClue(1, PARSER, clue, entitiesByType, getEntityIndex(entitiesByType), options)
+        if not result.entities:
+            return [None, str(result.error or 'No viable entity/comparison/quantifier parses found')]
+        return [str(result), None]
+    except Exception as e:
+        return [None, "{0}: {1}".format(type(e).__name__, e)]
+    finally:
+        sys.stdout = stdout
+
+
+# ************************************************************************************
+# returns the EntityIndex of the puzzle's entities, reusing it if the worker's parsed one of its clues recently
+def getEntityIndex(entitiesByType):
+    key = json.dumps(entitiesByType, sort_keys=True)
+    entityIndex = ENTITY_INDEXES.pop(key, None) or EntityIndex(entitiesByType)
+    ENTITY_INDEXES[key] = entityIndex
+    if len(ENTITY_INDEXES) > ENTITY_INDEXES_SIZE:
+        ENTITY_INDEXES.popitem(last=False)
+    return entityIndex
 
 
 # ************************************************************************************
@@ -635,31 +1957,173 @@ if __name__ == "__main__":
     quiet = args.quiet
     inputDirs = args.input
     nestedDirs = args.directory
+    jobs = args.jobs
 
     total, success, fail = [0, 0, 0]
 
-    if nestedDirs:
+    if args.merge:
+        records = readCheckpoints(args.merge)
+        for record in records.values():
+            total_i, success_i, fail_i = record['counts']
+            total += total_i
+            success += success_i
+            fail += fail_i
+            STATS.update(record['stats'])
+            TIMINGS.update(record['timings'])
+        print "Merged {0} puzzles from {1} checkpoints".format(len(records), len(args.merge))
+        printReport(total, success, len(records), [backend for backend in BACKENDS if 'backend_' + backend in TIMINGS],
+                    quiet, 'answers' in STATS, 'pipelineClues' in STATS)
+        sys.exit()
+
+    store = CorpusStore(args.store) if args.store else None
+    if nestedDirs and store:
+        inputDirs = store.puzzles(inputDirs[0])
+    elif nestedDirs:
         inputDirs = get_immediate_subdirectories(inputDirs[0])
         inputDirs.sort()
+    if args.shard:
+        try:
+            shard, shards = parseShard(args.shard)
+        except ValueError as e:
+            argparser.error(str(e))
+        inputDirs = [inputDir for inputDir in inputDirs if shardOf(inputDir, shards) == shard]
+    if nestedDirs:
         print "NESTED DIRS:"
         print inputDirs
 
-    for inputDir in inputDirs:
-        total_i, success_i, fail_i = main(inputDir, verbose, quiet)
-        total += total_i
-        success += success_i
-        fail += fail_i
+    if args.score_only:
+        for inputDir in inputDirs:
+            total_i, success_i, fail_i = scorePuzzle(inputDir, quiet, store)
+            total += total_i
+            success += success_i
+        printSummary(total, success)
+        print ""
+        sys.exit()
 
-    print ""
-    print ""
+    if args.solve or args.pipeline:
+        try:
+            import gridSolver
+        except ImportError:
+            argparser.error('"--solve" and "--pipeline" need NumPy')
+
+    # The link-grammar dictionary is loaded once, when it's first needed (or before forking any workers)
+    if args.time_limit:
+        PARSER_OPTIONS['max_parse_time'] = int(math.ceil(args.time_limit))
+    PARSER = getParser()
+
+    cache = None
+    if not args.no_cache:
+        cache = LinkageCache(args.cache, getattr(PARSER, 'version', None), args.cache_size * 1024 * 1024, args.rebuild_cache)
+    OPTIONS = {'cache': cache, 'maxLinkages': args.max_linkages, 'timeLimit': args.time_limit,
+               'nullTiers': [int(tier) for tier in args.null_tiers.split(',')], 'store': store, 'nerFirst': args.ner_first,
+               'nerFallback': not args.no_ner_fallback, 'matchers': getMatcherOrder(args.matchers),
+               'preferences': getPreferences(args.preferences), 'backends': getBackends(args.backends), 'solve': args.solve,
+               'pipeline': args.pipeline}
+    if args.incremental:
+        OPTIONS['incremental'] = parserFingerprint(PARSER, OPTIONS)
+
+    if args.stream:
+        inFile = sys.stdin if args.stream == '-' else open(args.stream)
+        pool = None
+        if jobs > 1:
+            loadParser(PARSER)
+            pool = multiprocessing.Pool(jobs)
+        try:
+            # NOTE: readline() rather than iterating over the file, whose read-ahead would hold up piped records
+            records = readRecords(iter(inFile.readline, ''), args.stream_offset)
+            streamResults(records, runClue, sys.stdout, pool, 4 * max(jobs, 1))
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+            if cache:
+                cache.close()
+        sys.exit()
 
-    if (success / float(total)) < 0.70:
-        print promptColors()['RED'] + '## FAILURE'
-    elif (success / float(total)) < 0.90:
-        print promptColors()['YELLOW'] + '## DECENT'
+    if args.daemon:
+        # Fork the workers *after* loading the dictionary so they share it copy-on-write
+        loadParser(PARSER)
+        pool = multiprocessing.Pool(max(jobs, 1))
+        server = ParseDaemon(args.daemon, pool, runClue, args.max_pending or 4 * max(jobs, 1), args.request_timeout)
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit())
+        print "Listening on " + args.daemon
+        sys.stdout.flush()
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            pool.terminate()
+            if cache:
+                cache.close()
+        sys.exit()
+
+    # Puzzles already done by an interrupted run with the same checkpoint count towards the totals, but aren't parsed again
+    puzzleCount = len(inputDirs)
+    checkpoint = RunCheckpoint(args.checkpoint) if args.checkpoint else None
+    if checkpoint:
+        done = checkpoint.load()
+        for record in [done[inputDir] for inputDir in inputDirs if inputDir in done]:
+            total_i, success_i, fail_i = record['counts']
+            total += total_i
+            success += success_i
+            fail += fail_i
+            STATS.update(record['stats'])
+            TIMINGS.update(record['timings'])
+        if any(inputDir in done for inputDir in inputDirs):
+            print "Resuming from " + args.checkpoint + ": skipping the {0} puzzles already done".format(
+                len([inputDir for inputDir in inputDirs if inputDir in done]))
+        inputDirs = [inputDir for inputDir in inputDirs if inputDir not in done]
+
+    # Enabled before forking, so the workers record metrics too
+    METRICS.enabled = bool(args.metrics)
+    metricsFormat = metrics.getFormat(args.metrics, args.metrics_format) if args.metrics else None
+    metricsWriter = None
+    if args.metrics and args.metrics_interval:
+        metricsWriter = metrics.PeriodicWriter(METRICS, args.metrics, metricsFormat, args.metrics_interval)
+
+    pool = None
+    if jobs > 1 and len(inputDirs) > 1:
+        # Workers send their metrics every "--metrics-interval" seconds, not just as they finish each puzzle
+        if metricsWriter:
+            metricsWriter.queue = multiprocessing.Queue()
+            OPTIONS.update(metricsQueue=metricsWriter.queue, metricsInterval=args.metrics_interval)
+
+        # Fork the workers *after* loading the dictionary so they share it copy-on-write.
+        # imap() hands out the puzzles, but yields their results back in submission order
+        loadParser(PARSER)
+        pool = multiprocessing.Pool(min(jobs, len(inputDirs)))
+        runs = pool.imap(runPuzzle, [(inputDir, verbose, quiet) for inputDir in inputDirs])
     else:
-        print promptColors()['GREEN'] + '## SUCCESS'
+        runs = (runPuzzleInline((inputDir, verbose, quiet)) for inputDir in inputDirs)
+    if metricsWriter:
+        metricsWriter.start()  # After forking any workers, which mustn't inherit it
+
+    for inputDir, (output, counts, stats, timings, metricsSnapshot) in itertools.izip(inputDirs, runs):
+        sys.stdout.stream.write(output)
+        STATS.update(stats)
+        TIMINGS.update(timings)
+        (metricsWriter or METRICS).merge(metricsSnapshot)
+        if checkpoint:
+            checkpoint.append(inputDir, counts, stats, timings)
+        total_i, success_i, fail_i = counts
+        total += total_i
+        success += success_i
+        fail += fail_i
 
-    print promptColors()['WHITE'] + str(100 * success / total) + "% success -  " \
-          + str(success) + " of " + str(total) + " total statements"
-    print ""
+    if pool:
+        pool.close()
+        pool.join()
+    if cache:
+        cache.close()
+    if store:
+        store.close()
+    if checkpoint:
+        checkpoint.close()
+    if metricsWriter:
+        metricsWriter.stop()
+    elif args.metrics:
+        METRICS.write(args.metrics, metricsFormat)
+
+    printReport(total, success, puzzleCount, OPTIONS['backends'], quiet, args.solve, args.pipeline)
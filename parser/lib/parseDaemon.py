@@ -0,0 +1,136 @@
+import os
+import json
+import time
+import socket
+import threading
+import SocketServer
+import multiprocessing
+
+DEFAULT_SOCKET = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.cache', 'parse.sock')
+
+# How long to wait on a request without a timeout, in seconds
+NO_TIMEOUT = 365 * 24 * 60 * 60
+
+
+# ************************************************************************************
+# Serves parse requests over a Unix socket, so clients needn't pay for starting Python and
+# loading the link-grammar dictionary on every run.
+#
+# Each line a client sends is a JSON request:
+#   {"id": 1, "entities": {"Type": ["Entity", ...], ...}, "clue": "..."}
+#   {"id": 2, "entities": {...}, "clues": ["...", ...], "timeout": 10}
+# and each request gets a JSON line back, in the same order:
+#   {"id": 1, "results": [{"clue": "...", "parse": "is(X, Y)", "error": null}]}
+#   {"id": 2, "error": "..."}
+#
+# Clues are parsed by 'worker' (called as worker((entitiesByType, clue, timeout))) in a pool of processes.
+# At most maxPending clues are queued or parsing at once; beyond that, connections stop being read
+# until there's room, so clients are pushed back on rather than queueing unboundedly. A request which
+# takes longer than its timeout gets an error for the clues that didn't finish in time.
+class ParseDaemon(SocketServer.ThreadingMixIn, SocketServer.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, pool, worker, maxPending, timeout=None):
+        self.path = path
+        self.pool = pool
+        self.worker = worker
+        self.timeout = timeout
+        self.pending = threading.BoundedSemaphore(maxPending)
+
+        socketDir = os.path.dirname(path)
+        if socketDir and not os.path.isdir(socketDir):
+            os.makedirs(socketDir)
+        if os.path.exists(path):
+            removeStaleSocket(path)
+        SocketServer.UnixStreamServer.__init__(self, path, RequestHandler)
+
+    # returns the response to a (decoded) request
+    def respond(self, request):
+        if not isinstance(request, dict):
+            raise RequestError('Requests must be JSON objects')
+        entitiesByType = request.get('entities')
+        if not isinstance(entitiesByType, dict) or not entitiesByType:
+            raise RequestError('Requests must have "entities": {"Type": ["Entity", ...], ...}')
+        clues = [request['clue']] if 'clue' in request else request.get('clues')
+        if not isinstance(clues, list) or not all(isinstance(clue, basestring) for clue in clues):
+            raise RequestError('Requests must have a "clue" string or a "clues" list of strings')
+
+        timeout = request.get('timeout', self.timeout)
+        if 'timeout' in request and (isinstance(timeout, bool) or not isinstance(timeout, (int, long, float))
+                                     or not timeout > 0):
+            raise RequestError('Requests\' "timeout" must be a positive number of seconds')
+        deadline = (time.time() + timeout) if timeout else None
+
+        # Clues still waiting for room in the queue when the request times out aren't parsed at all
+        tasks = []
+        for clue in clues:
+            tasks.append(self.submit((entitiesByType, clue, timeout), deadline))
+
+        results = []
+        for clue, task in zip(clues, tasks):
+            # NOTE: get() always has a timeout, since waiting without one can't be interrupted in Python 2
+            remaining = max(deadline - time.time(), 0) if deadline else NO_TIMEOUT
+            try:
+                if not task:
+                    raise multiprocessing.TimeoutError()
+                parse, error = task.get(remaining)
+            except multiprocessing.TimeoutError:
+                parse, error = [None, 'Timed out after {0} seconds'.format(timeout)]
+            results.append({'clue': clue, 'parse': parse, 'error': error})
+
+        return {'id': request.get('id'), 'results': results}
+
+    # Queues a clue for the workers, waiting for room if maxPending clues are already queued
+    # returns the clue's AsyncResult, or None if there was no room before the deadline
+    def submit(self, job, deadline=None):
+        while not self.pending.acquire(False):
+            if deadline and time.time() >= deadline:
+                return None
+            time.sleep(0.01)
+        # NOTE: The worker must return (parse, error) rather than raise, since callback is only called on success
+        return self.pool.apply_async(self.worker, (job,), callback=lambda result: self.pending.release())
+
+    def server_close(self):
+        SocketServer.UnixStreamServer.server_close(self)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+# ************************************************************************************
+# Reads newline-delimited JSON requests from a connection, answering each in turn
+class RequestHandler(SocketServer.StreamRequestHandler):
+    def handle(self):
+        try:
+            for line in iter(self.rfile.readline, ''):
+                if line.strip():
+                    self.wfile.write(json.dumps(self.respond(line)) + '\n')
+                    self.wfile.flush()
+        except socket.error:
+            pass  # The client went away
+
+    def respond(self, line):
+        request = None
+        try:
+            request = json.loads(line)
+            return self.server.respond(request)
+        except (ValueError, RequestError) as e:
+            return {'id': request.get('id') if isinstance(request, dict) else None, 'error': str(e)}
+
+
+# ************************************************************************************
+class RequestError(Exception):
+    pass
+
+
+# ************************************************************************************
+# Removes a socket file left behind by a daemon which has since died, refusing to replace a live one
+def removeStaleSocket(path):
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except socket.error:
+        os.remove(path)
+        return
+    finally:
+        probe.close()
+    raise RuntimeError('A parse daemon is already listening on ' + path)
@@ -0,0 +1,67 @@
+import json
+import hashlib
+
+# Bump whenever the format of the manifest changes
+MANIFEST_FORMAT = 1
+MANIFEST_FILE = '.parseManifest.json'
+
+
+# ************************************************************************************
+# Remembers what a puzzle's parseActual.txt was parsed from, so an "--incremental" run only
+# re-parses the clues which changed since.
+#
+# The manifest holds hashes of entities.txt, of the parser (its version and options, see main) and
+# of parseActual.txt, plus each clue's hash and the line of parseActual.txt its parse is on (None if
+# the clue failed to parse). If the entities, the parser or parseActual.txt have changed since, none
+# of the previous parses are reused.
+class PuzzleManifest(object):
+    # files - the puzzle's PuzzleFiles, which the manifest is kept with
+    def __init__(self, files, parserHash):
+        self.files = files
+        self.parserHash = parserHash
+        self.previous = {}
+
+    # entities - the contents of entities.txt
+    # actuals  - the lines of the current parseActual.txt (None if there isn't one)
+    def load(self, entities, actuals):
+        self.previous = {}
+        if actuals is None or not self.files.exists(MANIFEST_FILE):
+            return self
+
+        try:
+            manifest = json.loads(self.files.read(MANIFEST_FILE))
+        except ValueError:
+            return self  # Corrupt, so start over
+
+        if manifest.get('format') != MANIFEST_FORMAT or manifest.get('parser') != self.parserHash \
+                or manifest.get('entities') != sha1(entities) or manifest.get('actual') != sha1('\n'.join(actuals)):
+            return self
+
+        for clueHash, line in manifest['clues']:
+            self.previous[clueHash] = actuals[line] if line is not None else None
+        return self
+
+    # returns [parse] (the parse is None if the clue failed to parse), or None if the clue must be re-parsed
+    def get(self, clue):
+        clueHash = sha1(clue)
+        return [self.previous[clueHash]] if clueHash in self.previous else None
+
+    # entities - the contents of entities.txt
+    # clues    - (clue, line of its parse in actuals or None, whether or not its parse can be reused) for each clue
+    # actuals  - the lines written to parseActual.txt
+    def save(self, entities, clues, actuals):
+        manifest = {
+            'format': MANIFEST_FORMAT,
+            'parser': self.parserHash,
+            'entities': sha1(entities),
+            'actual': sha1('\n'.join(actuals)),
+            'clues': [[sha1(clue), line] for clue, line, reusable in clues if reusable]
+        }
+        self.files.write(MANIFEST_FILE, json.dumps(manifest, indent=1))
+
+
+# ************************************************************************************
+def sha1(content):
+    if isinstance(content, unicode):
+        content = content.encode('utf8')
+    return hashlib.sha1(content).hexdigest()
@@ -0,0 +1,83 @@
+import os
+import json
+import hashlib
+
+
+# ************************************************************************************
+# Shards of a corpus run ("--shard i/N"), so one corpus can be split between several processes or machines.
+#
+# Each puzzle belongs to the shard its name's hash picks. The name is the puzzle's directory name (or its name
+# within a CorpusStore), so a puzzle lands in the same shard however the corpus is mounted or sorted.
+
+# returns [i, N] from 'i/N' (0 <= i < N)
+def parseShard(shard):
+    try:
+        index, count = [int(part) for part in shard.split('/')]
+    except ValueError:
+        raise ValueError('Shards look like "i/N", e.g. "0/4"')
+    if not 0 <= index < count:
+        raise ValueError('Shard ' + shard + ' isn\'t one of 0/' + str(count) + ' to ' + str(count - 1) + '/' + str(count))
+    return [index, count]
+
+
+def shardOf(puzzle, count):
+    name = os.path.basename(os.path.normpath(puzzle))
+    return int(hashlib.sha1(name.encode('utf8') if isinstance(name, unicode) else name).hexdigest(), 16) % count
+
+
+# ************************************************************************************
+# Records each puzzle's results as soon as it's done, so an interrupted run can pick up where it stopped
+#
+# The checkpoint is a JSON lines file, with a line appended (and synced to disk) for each completed puzzle:
+#   {"puzzle": "../data/puzzles/example", "counts": [total, success, fail], "stats": {...}, "timings": {...}}
+# where stats and timings are the puzzle's share of parse.py's STATS and TIMINGS. A run killed partway through
+# writing a line leaves it incomplete, so lines which aren't valid JSON are ignored.
+class RunCheckpoint(object):
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    # returns the records of the puzzles already done, by puzzle
+    def load(self):
+        return readCheckpoints([self.path]) if os.path.exists(self.path) else {}
+
+    def append(self, puzzle, counts, stats, timings):
+        if not self.file:
+            # A line cut off by an interrupted run mustn't run into the next one
+            cutOff = os.path.exists(self.path) and os.path.getsize(self.path) and not endsWithNewline(self.path)
+            self.file = open(self.path, 'a')
+            if cutOff:
+                self.file.write('\n')
+
+        record = {'puzzle': puzzle, 'counts': counts, 'stats': stats, 'timings': timings}
+        self.file.write(json.dumps(record, sort_keys=True) + '\n')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        if self.file:
+            self.file.close()
+        self.file = None
+
+
+# ************************************************************************************
+# returns the records of the puzzles done in any of the checkpoints (e.g. those of every shard of a run), by puzzle.
+# A puzzle done more than once (e.g. by overlapping runs) keeps its last record
+def readCheckpoints(paths):
+    records = {}
+    for path in paths:
+        with open(path) as checkpointFile:
+            for line in checkpointFile:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(record, dict) and 'puzzle' in record and 'counts' in record:
+                    records[record['puzzle']] = record
+    return records
+
+
+def endsWithNewline(path):
+    with open(path, 'rb') as checkpointFile:
+        checkpointFile.seek(-1, os.SEEK_END)
+        return checkpointFile.read(1) == '\n'
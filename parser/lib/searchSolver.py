@@ -0,0 +1,270 @@
+import time
+
+# Search budget, past which the search gives up without proving the solution unique
+DEFAULT_MAX_NODES = 100000
+
+# How each search ended
+UNIQUE = 'unique'
+MULTIPLE = 'multiple'
+NONE = 'none'
+BUDGET = 'budget'
+
+
+# ************************************************************************************
+# Solves a puzzle by backtracking search, for when propagation alone (see GridSolver) can't finish it
+#
+# The GridSolver's puzzle is compiled into a compact integer model: for each entity and type, the bitmask of the
+# type's entities it could still go with. An entity's variable is its bitmask of the first type's entities (i.e. the
+# rows of the solution it could be in). The constraints are
+#   - one-to-one:   each entity goes with exactly one of each type's entities (and vice versa)
+#   - transitivity: an entity can only go with another if, in every other type, they have some entity in common
+#   - xors:         (base, a, b), the base goes with exactly one of a and b
+#   - comparisons:  (lesser, greater, context type, relation, inverse relation) - relation[k] is the bitmask of the
+#                   context type's entities the greater entity can go with when the lesser goes with its k'th
+#
+# Every node of the search forward checks (applies the constraints until they don't rule out anything more), then
+# splits on the most constrained variable (the one with the fewest rows left). The search stops as soon as a second
+# solution turns up, or there's provably only one, or it runs out of nodes or time.
+class SearchSolver(object):
+    # grid      - a GridSolver, with its clues added (and ideally solved, which narrows the search down a lot)
+    # maxNodes  - maximum number of nodes to search
+    # timeLimit - maximum number of seconds to search for
+    def __init__(self, grid, maxNodes=DEFAULT_MAX_NODES, timeLimit=None):
+        self.grid = grid
+        self.maxNodes = maxNodes
+        self.timeLimit = timeLimit
+        self.types = len(grid.types)
+        self.size = grid.size
+        self.full = (1 << self.size) - 1
+
+        # Entities are numbered type * size + index, and their bitmask for type u is masks[entity * types + u]
+        self.masks = [toMask(grid.grid[t, u, i]) for t in range(self.types) for i in range(self.size)
+                      for u in range(self.types)]
+        self.xors = [(self.entity(base), self.entity(a), a, self.entity(b), b) for base, a, b in grid.xors]
+        self.comparisons = [(self.entity(lesser), self.entity(greater), context,
+                             [toMask(row) for row in relation], [toMask(column) for column in relation.T])
+                            for lesser, greater, context, relation in grid.comparisons]
+
+        # Statistics
+        self.status = None
+        self.solutions = []
+        self.nodes = 0
+        self.failures = 0
+        self.maxDepth = 0
+        self.seconds = 0.0
+
+    def entity(self, ref):
+        return ref[0] * self.size + ref[1]
+
+    # Searches for the solutions (at most 2, as that's enough to know it isn't unique)
+    # returns the status: UNIQUE, MULTIPLE, NONE or BUDGET (gave up before finding 2 or finishing)
+    def search(self):
+        start = time.time()
+        self.deadline = start + self.timeLimit if self.timeLimit else None
+        try:
+            self.searchFrom(list(self.masks), 0)
+            self.status = [NONE, UNIQUE][len(self.solutions)]
+        except SearchBudget:
+            self.status = BUDGET
+        except SearchDone:
+            self.status = MULTIPLE
+        self.seconds = time.time() - start
+        return self.status
+
+    def searchFrom(self, masks, depth):
+        self.nodes += 1
+        self.maxDepth = max(self.maxDepth, depth)
+        if self.nodes > self.maxNodes or (self.deadline and time.time() > self.deadline):
+            raise SearchBudget()
+
+        if not self.propagate(masks):
+            self.failures += 1
+            return
+
+        # Most constrained first
+        best, bestCount = [None, self.size + 1]
+        for e in range(self.size, self.size * self.types):
+            count = bitCount(masks[e * self.types])
+            if 1 < count < bestCount:
+                best, bestCount = [e, count]
+        if best is None:
+            self.solutions.append(masks)
+            if len(self.solutions) > 1:
+                raise SearchDone()
+            return
+
+        for row in bits(masks[best * self.types]):
+            branch = list(masks)
+            branch[best * self.types] = 1 << row
+            self.searchFrom(branch, depth + 1)
+
+    # Applies the constraints until they don't rule out anything more
+    # returns whether or not every entity can still go with something of every type
+    def propagate(self, masks):
+        changed = True
+        while changed:
+            before = list(masks)
+            if not (self.propagateOneToOne(masks) and self.propagateTransitivity(masks) and self.propagateXors(masks)
+                    and self.propagateComparisons(masks)):
+                return False
+            changed = masks != before
+        return True
+
+    def propagateOneToOne(self, masks):
+        types, size = [self.types, self.size]
+        for t in range(types):
+            for u in range(types):
+                if u == t:
+                    continue
+                cells = range(t * size * types + u, (t + 1) * size * types, types)
+
+                # Each of u's entities which goes with only one of t's (or can be the only one left) is taken
+                singles, once, twice = [0, 0, 0]
+                for cell in cells:
+                    mask = masks[cell]
+                    if not mask & (mask - 1):
+                        if mask & singles or not mask:
+                            return False
+                        singles |= mask
+                    twice |= once & mask
+                    once |= mask
+                if once != self.full:
+                    return False
+
+                hidden = once & ~twice
+                for cell in cells:
+                    mask = masks[cell]
+                    if mask & (mask - 1):
+                        mask = (mask & hidden) or (mask & ~singles)
+                        if mask & hidden and mask & (mask - 1):
+                            return False
+                        masks[cell] = mask
+
+                # And the other way around: t's bitmasks for u and u's for t must agree. (Bits are looped over inline,
+                # rather than with bits(), as this and transitivity are most of the search's time)
+                if u > t:
+                    columns = [0] * size
+                    for i, cell in enumerate(cells):
+                        mask = masks[cell]
+                        while mask:
+                            low = mask & -mask
+                            columns[low.bit_length() - 1] |= 1 << i
+                            mask ^= low
+                    rows = [0] * size
+                    for j in range(size):
+                        other = (u * size + j) * types + t
+                        masks[other] &= columns[j]
+                        mask = masks[other]
+                        while mask:
+                            low = mask & -mask
+                            rows[low.bit_length() - 1] |= 1 << j
+                            mask ^= low
+                    for i, cell in enumerate(cells):
+                        masks[cell] &= rows[i]
+        return True
+
+    def propagateTransitivity(self, masks):
+        types, size = [self.types, self.size]
+        for e in range(size * types):
+            t = e // size
+            base = e * types
+            for u in range(types):
+                if u == t:
+                    continue
+                for w in range(types):
+                    if w == t or w == u:
+                        continue
+                    reach, mask = [0, masks[base + w]]
+                    while mask:
+                        low = mask & -mask
+                        reach |= masks[(w * size + low.bit_length() - 1) * types + u]
+                        mask ^= low
+                    masks[base + u] &= reach
+                if not masks[base + u]:
+                    return False
+        return True
+
+    def propagateXors(self, masks):
+        types = self.types
+        for base, a, aRef, b, bRef in self.xors:
+            canBeA = masks[base * types + aRef[0]] >> aRef[1] & 1
+            canBeB = masks[base * types + bRef[0]] >> bRef[1] & 1
+            for u in range(types):
+                masks[base * types + u] &= (masks[a * types + u] if canBeA else 0) | (masks[b * types + u] if canBeB else 0)
+                if not masks[base * types + u]:
+                    return False
+        return True
+
+    def propagateComparisons(self, masks):
+        types = self.types
+        for lesser, greater, context, relation, inverse in self.comparisons:
+            lesserCell, greaterCell = [lesser * types + context, greater * types + context]
+            lesserContext, greaterContext = [masks[lesserCell], masks[greaterCell]]
+            masks[lesserCell] = supported(relation, lesserContext, greaterContext)
+            masks[greaterCell] = supported(inverse, greaterContext, lesserContext)
+            if not (masks[lesserCell] and masks[greaterCell]):
+                return False
+        return True
+
+    # returns each of the first type's entities and its matches in each of the other types, like GridSolver.solution(),
+    # for the first solution found (or, without one, the GridSolver's)
+    def solution(self):
+        if not self.solutions:
+            return self.grid.solution()
+
+        masks = self.solutions[0]
+        entities = self.grid.entities
+        rows = [[entities[0][row]] for row in range(self.size)]
+        for t in range(1, self.types):
+            for i in range(self.size):
+                rows[bitIndex(masks[(t * self.size + i) * self.types])].append(entities[t][i])
+        return sorted(', '.join(row) for row in rows)
+
+    def summary(self):
+        return "Searched {0} nodes ({1} dead ends, {2} deep) in {3:.3f} seconds: {4}".format(
+            self.nodes, self.failures, self.maxDepth, self.seconds,
+            {UNIQUE: 'unique solution', MULTIPLE: 'several solutions', NONE: 'no solution', BUDGET: 'gave up'}[self.status])
+
+
+# ************************************************************************************
+class SearchBudget(Exception):
+    pass
+
+
+class SearchDone(Exception):
+    pass
+
+
+# ************************************************************************************
+# returns the bitmask of the entities with a counterpart in 'others' under the relation
+def supported(relation, entities, others):
+    mask = 0
+    for k in bits(entities):
+        if relation[k] & others:
+            mask |= 1 << k
+    return mask
+
+
+def toMask(row):
+    mask = 0
+    for i, value in enumerate(row):
+        if value:
+            mask |= 1 << i
+    return mask
+
+
+def bits(mask):
+    i = 0
+    while mask:
+        if mask & 1:
+            yield i
+        mask >>= 1
+        i += 1
+
+
+def bitCount(mask):
+    return bin(mask).count('1')
+
+
+def bitIndex(mask):
+    return mask.bit_length() - 1
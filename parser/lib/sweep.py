@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+import os
+import json
+import time
+import argparse
+import itertools
+import multiprocessing
+
+import parse
+import benchmark
+from parse import PROMPT_COLORS
+from linkageCache import MemoryLinkageCache
+
+# How each configuration falls back to replacing a clue's entities (NER), as parse.py options
+NER_POLICIES = {
+    'fallback': {'nerFirst': False, 'nerFallback': True},   # as is, then with the entities replaced (the default)
+    'first': {'nerFirst': True, 'nerFallback': True},       # with the entities replaced, then as is ("--ner-first")
+    'plain': {'nerFirst': False, 'nerFallback': False},     # only as is ("--no-ner-fallback")
+    'only': {'nerFirst': True, 'nerFallback': False},       # only with the entities replaced
+}
+NER_FLAGS = {'fallback': [], 'first': ['--ner-first'], 'plain': ['--no-ner-fallback'], 'only': ['--ner-first', '--no-ner-fallback']}
+
+argparser = argparse.ArgumentParser(description="Sweep a grid of parser configurations over the puzzle corpus, comparing "
+                                                "their accuracy and throughput. Each of the grid's options takes one or more "
+                                                "values, and every combination of them is tried")
+argparser.add_argument('-i', '--input', type=str, default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data'),
+                       help='the data directory, containing a directory of puzzle directories for each tier')
+argparser.add_argument('-t', '--tiers', nargs="+", type=str, default=benchmark.TIERS, help='the tiers of puzzles to sweep over')
+argparser.add_argument('-j', '--jobs', type=int, default=multiprocessing.cpu_count(),
+                       help='number of worker processes to try the configurations with')
+argparser.add_argument('-s', '--save', type=str, help='file to save the results to, as JSON')
+argparser.add_argument('--cache', type=str,
+                       help='linkage cache file to read the linkages from (and add to). By default, every clue is parsed '
+                            'with link-grammar, once for the whole sweep')
+argparser.add_argument('--max-linkages', type=int, default=None, help='maximum number of linkages to consider for each clue')
+argparser.add_argument('--time-limit', type=float, default=None, help='maximum number of seconds to spend parsing each clue')
+argparser.add_argument('--null-tiers', nargs="+", type=str, default=[','.join(map(str, parse.DEFAULT_NULL_TIERS))],
+                       help='grid of comma-separated maximum numbers of null links to parse each clue with, e.g. "0,1,2" "0"')
+argparser.add_argument('--backends', nargs="+", type=str, default=[','.join(parse.DEFAULT_BACKENDS)],
+                       help='grid of comma-separated backends to parse each clue with, e.g. "linkgrammar" "chunker,linkgrammar"')
+argparser.add_argument('--matchers', nargs="+", type=str, default=['default'],
+                       help='grid of phrase matcher orders, e.g. "default" "reversed" "3,1,2" (see parse.py\'s "--matchers")')
+argparser.add_argument('--preferences', nargs="+", type=str, default=[','.join(parse.DEFAULT_PREFERENCES)],
+                       help='grid of ways of preferring one phrase match over another, e.g. "comparison,detail" "detail" '
+                            '"none" (see parse.py\'s "--preferences")')
+argparser.add_argument('--ner', nargs="+", type=str, choices=sorted(NER_POLICIES), default=['fallback'],
+                       help='grid of NER policies: "fallback" (as is, then with the entities replaced), "first" (the other '
+                            'way around), "plain" (only as is) or "only" (only with the entities replaced)')
+
+# The linkages parsed for the whole sweep (a MemoryLinkageCache) and the link-grammar parser, shared (copy-on-write)
+# with the forked workers
+CACHE = None
+PARSER = None
+
+
+# ************************************************************************************
+# returns [flags, options] for every combination of the grid's values, where flags are the parse.py arguments for
+# the configuration (besides the defaults)
+def getConfigs(args):
+    configs = []
+    for nullTiers, backends, matchers, preferences, ner in itertools.product(args.null_tiers, args.backends, args.matchers,
+                                                                             args.preferences, args.ner):
+        options = dict(NER_POLICIES[ner], nullTiers=[int(tier) for tier in nullTiers.split(',')],
+                       backends=parse.getBackends(backends), matchers=parse.getMatcherOrder(matchers),
+                       preferences=parse.getPreferences(preferences), maxLinkages=args.max_linkages,
+                       timeLimit=args.time_limit)
+
+        flags = []
+        if options['nullTiers'] != parse.DEFAULT_NULL_TIERS:
+            flags += ['--null-tiers', nullTiers]
+        if options['backends'] != parse.DEFAULT_BACKENDS:
+            flags += ['--backends', backends]
+        if options['matchers'] != parse.getMatcherOrder('default'):
+            flags += ['--matchers', matchers]
+        if options['preferences'] != parse.DEFAULT_PREFERENCES:
+            flags += ['--preferences', preferences]
+        configs.append([flags + NER_FLAGS[ner], options])
+
+    return configs
+
+
+# ************************************************************************************
+# Parses the linkages of every clue the configurations could need into the cache, once for all of them: each of the
+# clue's sentences (as is and/or with its entities replaced) with each of the configurations' null-link tiers
+# returns the number of sentences parsed
+def extractLinkages(inputDirs, configs, p, cache):
+    tiers = []
+    for flags, options in configs:
+        if 'linkgrammar' in options['backends']:
+            tiers += [tier for tier in parse.getNullTiers(options) if tier not in tiers]
+    ways = set()
+    for flags, options in configs:
+        ways.add(options['nerFirst'])
+        if options['nerFallback']:
+            ways.add(not options['nerFirst'])
+    streamOptions = {'cache': cache, 'maxLinkages': configs[0][1]['maxLinkages'], 'timeLimit': configs[0][1]['timeLimit']}
+
+    sentences = 0
+    for inputDir in inputDirs:
+        files = parse.PuzzleFiles(inputDir)
+        entityIndex = parse.EntityIndex(parse.parseEntitiesText(files.read('entities.txt')))
+        for clue in parse.parseStatementsText(files.read('clues.txt')):
+            if not clue:
+                continue
+            for ner in sorted(ways):
+                placeholders, sentence = parse.replaceEntities(entityIndex, clue) if ner else [None, clue]
+                index = placeholders.index if ner else entityIndex
+                if ner and sentence == clue:
+                    continue
+
+                # Clues decided by the sentence alone never get as far as link-grammar
+                if parse.parseFastClause(index, sentence):
+                    continue
+                for tier in tiers:
+                    stream = parse.LinkageStream(p, sentence, streamOptions, tier, time.time())
+                    try:
+                        for linkage in stream:
+                            pass
+                    finally:
+                        stream.close()
+                sentences += 1
+
+    return sentences
+
+
+# ************************************************************************************
+# Tries a configuration on every tier, inside a worker, with the linkages the sweep already parsed
+# returns the results, like benchmark.benchmark()'s
+def runConfig(job):
+    tierDirs, options = job
+    options = dict(options, cache=CACHE, writeActual=False)
+
+    results = {'tiers': {}}
+    for tier, tierDir in tierDirs:
+        results['tiers'][tier] = benchmark.benchmarkTier(tierDir, PARSER, options)
+    results['total'] = benchmark.summarize(results['tiers'].values())
+    return results
+
+
+# ************************************************************************************
+def sweep(dataDir, tiers, configs, jobs=1, cacheFile=None):
+    global CACHE, PARSER
+
+    tierDirs = []
+    for tier in tiers:
+        tierDir = os.path.join(dataDir, tier)
+        if not os.path.isdir(tierDir):
+            print PROMPT_COLORS['YELLOW'] + "Skipping missing tier: " + tierDir + PROMPT_COLORS['COLOR_NONE']
+            continue
+        tierDirs.append((tier, tierDir))
+    inputDirs = [inputDir for tier, tierDir in tierDirs for inputDir in sorted(parse.get_immediate_subdirectories(tierDir))]
+
+    # Load the dictionary and parse the linkages *before* forking the workers, so they all share them
+    start = time.time()
+    PARSER = parse.loadParser(parse.getParser())
+    CACHE = MemoryLinkageCache(parse.LinkageCache(cacheFile, getattr(PARSER, 'version', None)) if cacheFile else None)
+    sentences = extractLinkages(inputDirs, configs, PARSER, CACHE)
+    extraction = time.time() - start
+
+    start = time.time()
+    runs = [(tierDirs, options) for flags, options in configs]
+    if jobs > 1 and len(runs) > 1:
+        pool = multiprocessing.Pool(min(jobs, len(runs)))
+        try:
+            results = pool.map(runConfig, runs)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [runConfig(run) for run in runs]
+
+    return {
+        'extraction': {'sentences': sentences, 'seconds': extraction},
+        'wall': time.time() - start,
+        'configs': [{'flags': flags, 'options': options, 'results': result}
+                    for (flags, options), result in zip(configs, results)]
+    }
+
+
+# ************************************************************************************
+# Prints the configurations' results, the most accurate (and then the fastest) first. Their seconds are each
+# configuration's own, leaving out the linkage parsing which they all shared
+def printResults(results, jobs):
+    print PROMPT_COLORS['LIGHT_GRAY'] + "Parsed the linkages of {0} sentences in {1:.2f} seconds, shared by {2} configurations".format(
+        results['extraction']['sentences'], results['extraction']['seconds'], len(results['configs'])) + PROMPT_COLORS['COLOR_NONE']
+    print PROMPT_COLORS['LIGHT_GRAY'] + "Tried the configurations in {0:.2f} seconds, with {1} jobs".format(
+        results['wall'], jobs) + PROMPT_COLORS['COLOR_NONE']
+    print ""
+
+    print PROMPT_COLORS['WHITE'] + "{0:>4} {1:>9} {2:>9} {3:>9} {4:>9} {5:>11} {6:>9}  {7}".format(
+        '#', 'Accuracy', 'Seconds', 'Sent/sec', 'ms/sent', 'Links/sent', 'Timeouts', 'Configuration') + PROMPT_COLORS['COLOR_NONE']
+    totals = [config['results']['total'] for config in results['configs']]
+    ranked = sorted(range(len(totals)), key=lambda i: [-benchmark.accuracy(totals[i]), totals[i]['wall'], i])
+    for i in ranked:
+        config, total = [results['configs'][i], totals[i]]
+        print "{0:>4} {1:>8.1f}% {2:>9.2f} {3:>9.1f} {4:>9.1f} {5:>11.1f} {6:>9}  {7}".format(
+            i + 1, benchmark.accuracy(total), total['wall'], benchmark.throughput(total['sentences'], total['wall']),
+            1000 * benchmark.throughput(total['wall'], total['sentences']),
+            benchmark.throughput(float(total['stats'].get('linkages', 0)), total['sentences']), total['stats'].get('timeouts', 0),
+            ' '.join(config['flags']) or '(defaults)')
+
+
+# ************************************************************************************
+if __name__ == "__main__":
+    args = argparser.parse_args()
+
+    if args.time_limit:
+        parse.PARSER_OPTIONS['max_parse_time'] = int(parse.math.ceil(args.time_limit))
+    configs = getConfigs(args)
+
+    results = sweep(args.input, args.tiers, configs, args.jobs, args.cache)
+    printResults(results, args.jobs)
+
+    if args.save:
+        with open(args.save, 'w') as resultsFile:
+            json.dump(results, resultsFile, indent=2, sort_keys=True)
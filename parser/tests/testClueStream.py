@@ -0,0 +1,38 @@
+import os
+import sys
+import json
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+import clueStream
+
+
+# ************************************************************************************
+# Reading "--stream" records (see clueStream.readRecords)
+class TestReadRecords(unittest.TestCase):
+    def read(self, *records):
+        return list(clueStream.readRecords([json.dumps(record) for record in records]))
+
+    def testValid(self):
+        [(recordNum, record, error)] = self.read({'id': 'game1', 'entities': {'names': ['Greg']}, 'clue': 'Greg is red.'})
+        self.assertEqual([recordNum, record['clues'], error], [0, ['Greg is red.'], None])
+
+    def testInvalidClues(self):
+        for clues in [None, 'Greg is red.', [None], ['Greg is red.', 3]]:
+            [(recordNum, record, error)] = self.read({'entities': {'names': ['Greg']}, 'clues': clues})
+            self.assertIsNone(record)
+            self.assertIn('"clues" list of strings', error)
+
+    def testInvalidEntities(self):
+        for entities in [None, ['Greg'], {'names': 'Greg'}, {'names': [1]}, {'names': [None]}]:
+            [(recordNum, record, error)] = self.read({'entities': entities, 'clue': 'Greg is red.'})
+            self.assertIsNone(record)
+            self.assertIn('"entities"', error)
+
+    def testOffset(self):
+        lines = [json.dumps({'entities': {'names': ['Greg']}, 'clue': clue}) for clue in ['A', 'B', 'C']]
+        self.assertEqual([recordNum for recordNum, record, error in clueStream.readRecords(lines, 1)], [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+import parse
+
+RAM_PUZZLE = {'customers': ['Fernando', 'Jack', 'Rex', 'Wade'], 'RAM': ['1 GB', '3 GB', '6 GB', '12 GB'],
+              'hard drives': ['128 GB', '256 GB', '384 GB', '512 GB']}
+
+
+# ************************************************************************************
+# Entity recognition (see parse.EntityIndex), which needs no link-grammar
+class TestEntityIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = parse.EntityIndex(RAM_PUZZLE)
+
+    def testWholeWordsOnly(self):
+        self.assertEqual(self.index.find('Rex has 256 GB'), ['Rex', '256 GB'])
+        self.assertEqual(self.index.find('Wade has 12 GB of RAM'), ['Wade', '12 GB'])
+
+    def testEntityInsideAnother(self):
+        # Moderate/puzzle11 clue 2: '6 GB' is only found where it's a whole entity, not within '256 GB'
+        self.assertEqual(self.index.find("Rex's build has a hard drive that is 256 GB larger than the build with 6 GB of RAM."),
+                         ['Rex', '256 GB', '6 GB'])
+        self.assertEqual(self.index.find(['Rex', 'has', '256', 'GB']), ['Rex', '256 GB'])
+
+    def testPlurals(self):
+        index = parse.EntityIndex({'names': ['Penny Perry'], 'days': ['3 day', '4 day']})
+        self.assertEqual(index.find("Penny Perry's reservation is for 3 days."), ['Penny Perry', '3 day'])
+
+    def testSpans(self):
+        sentence = 'The 256 GB drive is not 6 GB'
+        self.assertEqual([sentence[start:end] for start, end, entity in self.index.spans(sentence)], ['256 GB', '6 GB'])
+
+    def testReused(self):
+        # "--stream"/"--daemon" workers reuse a puzzle's index for each of its clues (see parse.getEntityIndex)
+        index = parse.getEntityIndex(RAM_PUZZLE)
+        self.assertIs(parse.getEntityIndex(dict(RAM_PUZZLE)), index)
+        self.assertIsNot(parse.getEntityIndex(dict(RAM_PUZZLE, customers=['Greg', 'Jack', 'Rex', 'Wade'])), index)
+
+        for i in range(parse.ENTITY_INDEXES_SIZE):
+            parse.getEntityIndex({'names': [str(i)]})
+        self.assertEqual(len(parse.ENTITY_INDEXES), parse.ENTITY_INDEXES_SIZE)
+        self.assertIsNot(parse.getEntityIndex(RAM_PUZZLE), index)
+
+
+if __name__ == '__main__':
+    unittest.main()
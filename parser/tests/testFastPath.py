@@ -0,0 +1,80 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+import parse
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data')
+
+# Clues the fast path gets wrong, which parsing their linkages gets wrong just the same: (puzzle, clue number)
+KNOWN_FAILURES = set([
+    ('puzzles/example', 4),             # parseExpected.txt has the "Of X and Y" entities in the other order
+    ('puzzlesAdvanced/game3', 7),       # "the sixth person" isn't recognized as the entity '6th'
+    ('puzzlesAdvanced/game3', 11),      # "the fourth person" isn't recognized as the entity '4th'
+    ('puzzlesAdvanced/game4', 1),       # "Neither ... nor ..." has an "either" and an "or", but isn't either/or
+    ('puzzlesChallenging/puzzle10', 3), # parseExpected.txt has the "Of X and Y" entities in the other order
+    ('puzzlesModerate/puzzle04', 3),    # parseExpected.txt has 'Jamaice' rather than 'Jamaica'
+    ('puzzlesModerate/puzzle09', 4),    # parseExpected.txt has a big "not" for "Of X and Y, one ... and the other ..."
+    ('puzzlesModerate/puzzle11', 1),    # parseExpected.txt has the "Of X and Y" entities in the other order
+    ('puzzlesModerate/puzzle18', 2),    # parseExpected.txt has the "Of X and Y" entities in the other order
+])
+
+
+# ************************************************************************************
+# returns (puzzle, clue number, entityIndex, clue, expected parse) for each of the corpus's clues with an expected parse
+def corpusClues():
+    for tier in sorted(os.listdir(DATA_DIR)):
+        if not os.path.isdir(os.path.join(DATA_DIR, tier)):
+            continue
+        for puzzle in sorted(os.listdir(os.path.join(DATA_DIR, tier))):
+            files = parse.PuzzleFiles(os.path.join(DATA_DIR, tier, puzzle))
+            if not files.exists('parseExpected.txt'):
+                continue
+            entityIndex = parse.EntityIndex(parse.parseEntitiesText(files.read('entities.txt')))
+            expectedParses = parse.parseStatementsText(files.read('parseExpected.txt'))
+            for i, clue in enumerate(parse.parseStatementsText(files.read('clues.txt'))[:len(expectedParses)]):
+                yield tier + '/' + puzzle, i + 1, entityIndex, clue, expectedParses[i]
+
+
+# ************************************************************************************
+# The fast path (see parse.parseFastClause) skips link-grammar, so it must only decide clues the same way parsing
+# their linkages would. Checked against the corpus's expected parses, which needs no link-grammar
+class TestFastPath(unittest.TestCase):
+    def testCorpus(self):
+        wrong = []
+        fast = 0
+        for puzzle, number, entityIndex, clue, expected in corpusClues():
+            special = parse.parseFastClause(entityIndex, clue)
+            if not special:
+                continue
+            fast += 1
+            try:
+                actual = parse.formatParse(*special)
+            except TypeError:
+                actual = None
+            if actual != expected and (puzzle, number) not in KNOWN_FAILURES:
+                wrong.append("{0} clue {1}: {2} (expected {3})".format(puzzle, number, actual, expected))
+
+        self.assertGreater(fast, 0)
+        self.assertEqual(wrong, [])
+
+    def testEntityClausesNeedLinkages(self):
+        entityIndex = parse.EntityIndex({'Price': ['375', '440', '505', '570'],
+                                         'AC units': ['Binson C40', 'Chiller Z', 'Freezon Flux', 'Z-Free XL'],
+                                         'capacities': ['5000 BTUs', '10000 BTUs', '20000 BTUs', '25000 BTUs']})
+        # Easy/puzzle06 clue 3: a big "not", whose entities' order depends on the linkage
+        self.assertIsNone(parse.parseFastClause(entityIndex, 'The $570 unit, the air conditioner with the 20000 BTUs '
+                                                             'cooling capacity and the Chiller Z are all different units.'))
+        # Advanced/game3 clue 6: an "Of X and Y" with only one entity after the ", one" (the other's "third in line")
+        self.assertIsNone(parse.parseFastClause(entityIndex, 'Of the $570 unit and the Chiller Z, one has 5000 BTUs and '
+                                                             'the other was third in line.'))
+        self.assertEqual(parse.parseFastClause(entityIndex, 'Of the $570 unit and the Chiller Z, one has 5000 BTUs and '
+                                                            'the other is the Binson C40.'),
+                         [['xor(570, Chiller Z)', 'xor(5000 BTUs, Binson C40)'], 'is', None])
+        self.assertEqual(parse.parseFastClause(entityIndex, 'The Chiller Z is either the $570 unit or the $375 unit.'),
+                         [['Chiller Z', 'xor(570, 375)'], 'is', None])
+
+
+if __name__ == '__main__':
+    unittest.main()
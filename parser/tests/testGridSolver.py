@@ -0,0 +1,122 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+try:
+    import gridSolver
+    import searchSolver
+except ImportError:
+    gridSolver = None  # No NumPy
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data')
+
+# Puzzles whose expected parses don't solve to their answers.txt, even with search
+KNOWN_UNSOLVED = set([
+    'puzzlesAdvanced/game3',        # several solutions
+    'puzzlesChallenging/puzzle04',  # answers.txt has 'Tarco Inc.' and 'Hayco Inc.', entities.txt has no '.'
+    'puzzlesChallenging/puzzle07',  # answers.txt has just the numbers, without 'losses' and 'wins'
+    'puzzlesEasy/puzzle11',         # several solutions
+    'puzzlesEasy/puzzle19',         # several solutions
+    'puzzlesEasy/puzzle26',         # several solutions
+    'puzzlesEasy/puzzle28',         # several solutions
+    'puzzlesModerate/puzzle04',     # several solutions
+    'puzzlesModerate/puzzle09',     # the expected parses don't agree with answers.txt
+])
+
+# Puzzles which propagation alone can't finish, but search can: whether or not they've a unique solution
+SEARCHED = {
+    'puzzlesAdvanced/game3': False,
+    'puzzlesAdvanced/game4': True,
+    'puzzlesChallenging/puzzle01': True,
+    'puzzlesEasy/puzzle11': False,
+}
+
+
+# ************************************************************************************
+# returns (puzzle, entities.txt's contents, expected parses, answers) for each of the corpus's puzzles with answers
+def corpusPuzzles():
+    for tier in sorted(os.listdir(DATA_DIR)):
+        if not os.path.isdir(os.path.join(DATA_DIR, tier)):
+            continue
+        for puzzle in sorted(os.listdir(os.path.join(DATA_DIR, tier))):
+            puzzleDir = os.path.join(DATA_DIR, tier, puzzle)
+            if not all(os.path.exists(os.path.join(puzzleDir, name)) for name in ['parseExpected.txt', 'answers.txt']):
+                continue
+            with open(os.path.join(puzzleDir, 'entities.txt')) as entitiesFile:
+                entitiesContent = entitiesFile.read()
+            with open(os.path.join(puzzleDir, 'parseExpected.txt')) as statementsFile:
+                statements = [statement for statement in statementsFile.read().split('\n') if statement]
+            with open(os.path.join(puzzleDir, 'answers.txt')) as answersFile:
+                answers = [answer.strip() for answer in answersFile.read().split('\n') if answer.strip()]
+            yield tier + '/' + puzzle, entitiesContent, statements, answers
+
+
+# ************************************************************************************
+# Solving the corpus's puzzles from their expected parses, which needs no link-grammar (but does need NumPy)
+@unittest.skipIf(gridSolver is None, 'needs NumPy')
+class TestGridSolver(unittest.TestCase):
+    def testCorpus(self):
+        wrong = []
+        puzzles = 0
+        for puzzle, entitiesContent, statements, answers in corpusPuzzles():
+            puzzles += 1
+            solution, correct, error, searcher = gridSolver.solveParses(entitiesContent, statements, answers, {})
+            if error or correct != len(answers):
+                if puzzle not in KNOWN_UNSOLVED:
+                    wrong.append("{0}: {1} of {2} answers ({3})".format(puzzle, correct, len(answers), error))
+            elif puzzle in KNOWN_UNSOLVED:
+                wrong.append("{0}: solved, but is in KNOWN_UNSOLVED".format(puzzle))
+
+        self.assertGreater(puzzles, 0)
+        self.assertEqual(wrong, [])
+
+    def testContradiction(self):
+        entitiesContent = 'names, colors\n\nGreg, Kim\nred, blue\n'
+        solution, correct, error, searcher = gridSolver.solveParses(entitiesContent, ['is(Greg, red)', 'is(Kim, red)'])
+        self.assertIsNone(solution)
+        self.assertIsInstance(error, gridSolver.Contradiction)
+
+    def testSameAnswer(self):
+        self.assertTrue(gridSolver.sameAnswer('Theodore, Disraeli, A-, 12 minutes', 'Theodore, Disraeli, A-,12 minutes,'))
+        self.assertTrue(gridSolver.sameAnswer('Greg, $1200', 'Greg, $1,200'))
+        self.assertFalse(gridSolver.sameAnswer('Greg, 6 GB', 'Greg, 256 GB'))
+        self.assertFalse(gridSolver.sameAnswer('Greg, red', 'Greg, red, 12'))
+
+
+# ************************************************************************************
+# Searching (see searchSolver.SearchSolver) for the solutions of the puzzles propagation can't finish
+@unittest.skipIf(gridSolver is None, 'needs NumPy')
+class TestSearchSolver(unittest.TestCase):
+    def solver(self, puzzle):
+        for name, entitiesContent, statements, answers in corpusPuzzles():
+            if name == puzzle:
+                solver = gridSolver.readSolver(entitiesContent)
+                for statement in statements:
+                    solver.add(statement)
+                solver.solve()
+                return [solver, answers]
+
+    def testCorpus(self):
+        for puzzle, unique in sorted(SEARCHED.items()):
+            solver, answers = self.solver(puzzle)
+            self.assertFalse(solver.isSolved(), puzzle)
+
+            searcher = searchSolver.SearchSolver(solver)
+            self.assertEqual(searcher.search(), searchSolver.UNIQUE if unique else searchSolver.MULTIPLE, puzzle)
+            if unique:
+                self.assertEqual(len(searcher.solutions), 1)
+                self.assertTrue(all(any(gridSolver.sameAnswer(line, answer) for answer in answers)
+                                    for line in searcher.solution()), puzzle)
+            else:
+                self.assertEqual(len(searcher.solutions), 2)
+
+    def testBudget(self):
+        solver, answers = self.solver('puzzlesAdvanced/game3')
+        searcher = searchSolver.SearchSolver(solver, maxNodes=1)
+        self.assertEqual(searcher.search(), searchSolver.BUDGET)
+        self.assertEqual(searcher.solution(), solver.solution())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+import linkageCache
+from linkageCache import LinkageCache, MemoryLinkageCache, FlatLinkage, Constituent
+
+OPTIONS = {'max_null_count': 0}
+
+
+def linkages(*words):
+    return [FlatLinkage([Constituent('NP', [word]), Constituent('VP', ['is']), Constituent('ADJP', ['red'])])
+            for word in words]
+
+
+def flatten(cached):
+    flat, complete = cached
+    return [[[part.type, part.words] for part in linkage.constituent_phrases_flat] for linkage in flat], complete
+
+
+# ************************************************************************************
+# Storing linkages in the cache file and reading them back (see linkageCache.LinkageCache)
+class TestLinkageCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'cache', 'linkages.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def testRoundTrip(self):
+        cache = LinkageCache(self.path, 'v1')
+        self.assertIsNone(cache.get('Greg is red.', OPTIONS))
+        cache.put('Greg is red.', OPTIONS, linkages('Greg', 'Kim'), complete=False)
+        cache.close()
+
+        cache = LinkageCache(self.path, 'v1')
+        self.assertEqual(flatten(cache.get('Greg is red.', OPTIONS)), flatten([linkages('Greg', 'Kim'), False]))
+        self.assertEqual([cache.hits, cache.misses], [1, 0])
+        cache.close()
+
+    def testKeys(self):
+        cache = LinkageCache(self.path, 'v1')
+        cache.put('Greg is red.', OPTIONS, linkages('Greg'))
+        self.assertIsNone(cache.get('Greg is red.', {'max_null_count': 1}))
+        self.assertIsNone(LinkageCache(self.path, 'v2').get('Greg is red.', OPTIONS))
+        self.assertIsNone(LinkageCache(self.path, 'v1', rebuild=True).get('Greg is red.', OPTIONS))
+        self.assertIsNotNone(cache.get('Greg is red.', OPTIONS))
+        cache.close()
+
+    def testEviction(self):
+        cache = LinkageCache(self.path, 'v1', maxBytes=200)
+        for i in range(10):
+            cache.put('Sentence {0}.'.format(i), OPTIONS, linkages('Greg'))
+        cache.put('Sentence 9.', OPTIONS, linkages('Greg', 'Kim'))
+
+        db = cache.connect()
+        total = db.execute('SELECT SUM(size) FROM linkages').fetchone()[0]
+        self.assertLessEqual(total, 200)
+        self.assertEqual(db.execute("SELECT value FROM totals WHERE name = 'size'").fetchone()[0], total)
+        self.assertIsNone(cache.get('Sentence 0.', OPTIONS))
+        self.assertIsNotNone(cache.get('Sentence 9.', OPTIONS))
+        cache.close()
+
+    def testTouchInterval(self):
+        cache = LinkageCache(self.path, 'v1')
+        cache.put('Greg is red.', OPTIONS, linkages('Greg'))
+        db = cache.connect()
+        db.execute('UPDATE linkages SET used = used - ?', (linkageCache.TOUCH_INTERVAL - 10,))
+        used = db.execute('SELECT used FROM linkages').fetchone()[0]
+        cache.get('Greg is red.', OPTIONS)
+        self.assertEqual(db.execute('SELECT used FROM linkages').fetchone()[0], used)
+
+        db.execute('UPDATE linkages SET used = used - 10')
+        cache.get('Greg is red.', OPTIONS)
+        self.assertGreater(db.execute('SELECT used FROM linkages').fetchone()[0], used)
+        cache.close()
+
+
+# ************************************************************************************
+# Keeping linkages in memory, in front of a cache file (see linkageCache.MemoryLinkageCache)
+class TestMemoryLinkageCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'linkages.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def testRoundTrip(self):
+        cache = MemoryLinkageCache()
+        self.assertIsNone(cache.get('Greg is red.', OPTIONS))
+        cache.put('Greg is red.', OPTIONS, linkages('Greg'))
+        self.assertEqual(flatten(cache.get('Greg is red.', OPTIONS)), flatten([linkages('Greg'), True]))
+        self.assertEqual([cache.hits, cache.misses], [1, 1])
+
+    def testBacking(self):
+        cache = MemoryLinkageCache(LinkageCache(self.path, 'v1'))
+        cache.put('Greg is red.', OPTIONS, linkages('Greg'), complete=False)
+        cache.close()
+
+        cache = MemoryLinkageCache(LinkageCache(self.path, 'v1'))
+        self.assertEqual(flatten(cache.get('Greg is red.', OPTIONS)), flatten([linkages('Greg'), False]))
+        self.assertEqual(cache.backing.hits, 1)
+        cache.get('Greg is red.', OPTIONS)
+        self.assertEqual(cache.backing.hits, 1)
+        cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import unittest
+import multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+import metrics
+
+
+# ************************************************************************************
+# Rewriting the metrics file mid-run (see metrics.PeriodicWriter), as "--metrics-interval" does
+class TestPeriodicWriter(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'metrics.json')
+        self.metrics = metrics.Metrics(enabled=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def read(self):
+        with open(self.path) as metricsFile:
+            return dict((name, sum(counter['value'] for counter in counters))
+                        for name, counters in json.load(metricsFile)['counters'].items())
+
+    def testWritesWhileRecording(self):
+        writer = metrics.PeriodicWriter(self.metrics, self.path, interval=0.01)
+        writer.start()
+        self.metrics.inc('clues_total')
+        for i in range(100):
+            if os.path.exists(self.path) and self.read() == {'clues_total': 1}:
+                break
+            time.sleep(0.01)
+        self.assertEqual(self.read(), {'clues_total': 1})
+
+        writer.stop()
+        self.assertFalse(writer.is_alive())
+
+    def testWorkerSnapshots(self):
+        # A worker's metrics so far, sent mid-puzzle, and the rest of them, sent with its results, add up
+        worker = metrics.Metrics(enabled=True)
+        worker.inc('clues_total', outcome='correct')
+        worker.observe('linkages_per_clue', 3, metrics.COUNT_BUCKETS)
+
+        writer = metrics.PeriodicWriter(self.metrics, self.path, interval=60, queue=multiprocessing.Queue())
+        writer.start()
+        writer.queue.put(worker.snapshot())
+        while writer.queue.empty():  # put() sends it from a thread of its own
+            time.sleep(0.01)
+        worker.clear()
+        worker.inc('clues_total', outcome='correct')
+        writer.merge(worker.snapshot())
+
+        writer.stop()
+        self.assertEqual(self.read(), {'clues_total': 2})
+        self.assertEqual(self.metrics.histograms[('linkages_per_clue', ())].count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
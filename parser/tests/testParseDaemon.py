@@ -0,0 +1,30 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+import parseDaemon
+
+ENTITIES = {'names': ['Greg', 'Ann'], 'colors': ['red', 'blue']}
+
+
+# ************************************************************************************
+# Validating daemon requests (see parseDaemon.ParseDaemon.respond), which happens before any clue is parsed
+class TestRequests(unittest.TestCase):
+    def respond(self, request):
+        daemon = type('Daemon', (object,), {'timeout': None})()
+        return parseDaemon.ParseDaemon.respond.im_func(daemon, request)
+
+    def testInvalidTimeouts(self):
+        for timeout in ['5', 0, -1, True, None, [5], float('nan')]:
+            with self.assertRaises(parseDaemon.RequestError):
+                self.respond({'entities': ENTITIES, 'clue': 'Greg is red.', 'timeout': timeout})
+
+    def testInvalidClues(self):
+        for request in [[], {'entities': ENTITIES}, {'entities': ENTITIES, 'clues': [None]}, {'clue': 'Greg is red.'}]:
+            with self.assertRaises(parseDaemon.RequestError):
+                self.respond(request)
+
+
+if __name__ == '__main__':
+    unittest.main()
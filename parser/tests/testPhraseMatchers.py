@@ -0,0 +1,132 @@
+import os
+import re
+import sys
+import bisect
+import random
+import unittest
+import sre_parse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+import parse
+
+
+# ************************************************************************************
+# Compiling the PHRASE_MATCHERS' POS regexes (see parse.compilePosPattern), which needs no link-grammar
+class TestCompilePosPattern(unittest.TestCase):
+    def testCodes(self):
+        self.assertEqual(parse.compilePosPattern('(NP) (VP) (ADJP)', set([1, 2, 3])),
+                         ('(N)(V)(J)', {1: 1, 2: 2, 3: 3}))
+        self.assertEqual(parse.compilePosPattern('(WHNP)? (ADVP|PP)*', set([1, 2])), ('(W)?(D|P)*', {1: 1, 2: 2}))
+
+    def testKeepGroups(self):
+        pattern, renumbered = parse.compilePosPattern('(NP) ((VP) (PP)) (NP)', set([1, 4, 5]))
+        self.assertEqual(pattern, '(N)(?:(?:V)(P))(N)')
+        self.assertEqual(renumbered, {1: 1, 4: 2, 5: 3})
+        self.assertEqual(re.match(pattern, 'NVPN').groups(), ('N', 'P', 'N'))
+
+    def testMatchPhrases(self):
+        table = parse.ConstituentTable([parse.Constituent('S', []), parse.Constituent('NP', ['Greg']),
+                                        parse.Constituent('VP', ['is']), parse.Constituent('ADJP', ['older']),
+                                        parse.Constituent('PP', ['than']), parse.Constituent('NP', ['Kim'])])
+        self.assertEqual(table.posCodes, 'SNVJPN')
+        [(matcher, regs)] = parse.matchPhrases(table.posCodes)
+        self.assertEqual(matcher['name'], 'Present (ADJP)')
+        self.assertEqual([table.getWords(regs[idx]) for idx in matcher['entities']], [['Greg'], ['Kim']])
+        self.assertEqual([table.getWords(regs[idx]) for idx in matcher['comparison']], [['older']])
+
+
+
+# ************************************************************************************
+# returns each of the matcher's group indexes' POS idx ranges when its original regex matches the tags (joined by
+# spaces, as parseConstituentParts used to match them), or None. Every tag is bracketed, so that (like the compiled
+# matchers) a tag only ever matches a whole tag, rather than the tail of a longer one (e.g. NP in WHNP)
+def matchOriginal(matcher, tags):
+    match = re.match(bracketTags(matcher['reg']), ' '.join(bracketTags(tag) for tag in tags))
+    if not match:
+        return None
+
+    starts, offset = [[], 0]
+    for tag in tags:
+        starts.append(offset)
+        offset += len(bracketTags(tag)) + 1
+    return dict((idx, [bisect.bisect_left(starts, offset) for offset in match.span(idx)] if match.start(idx) >= 0 else [-1, -1])
+                for idx in matcher['groups'])
+
+
+def bracketTags(reg):
+    return re.sub(r"[A-Z]+", lambda tag: '<' + tag.group(0) + '>', reg)
+
+
+# returns a random string the (bracketed) regex matches, or None if the one it came up with isn't a sequence of tags
+def generate(rng, reg):
+    posStr = generateParsed(rng, sre_parse.parse(bracketTags(reg)))
+    return posStr if re.match(r"^<[A-Z]+>( <[A-Z]+>)*$", posStr) else None
+
+
+def generateParsed(rng, parsed):
+    posStr = ''
+    for op, av in parsed:
+        if op == 'literal':
+            posStr += chr(av)
+        elif op in ['max_repeat', 'min_repeat'] and list(av[2]) == [('any', None)]:
+            tags = ' '.join(bracketTags(rng.choice(TAGS)) for i in range(rng.randint(0, 3)))
+            posStr += rng.choice(['', ' ']) + tags + rng.choice(['', ' '])
+        elif op in ['max_repeat', 'min_repeat']:
+            posStr += ''.join(generateParsed(rng, av[2]) for i in range(rng.randint(av[0], min(av[1], av[0] + 2))))
+        elif op == 'subpattern':
+            posStr += generateParsed(rng, av[1])
+        elif op == 'branch':
+            posStr += generateParsed(rng, rng.choice(av[1]))
+    return posStr
+
+
+# returns the tags with one of them replaced, added or removed (or none of them)
+def mutate(rng, tags):
+    tags = list(tags)
+    i = rng.randint(0, len(tags))
+    mutation = rng.choice(['replace', 'add', 'remove', None])
+    if mutation == 'replace' and i < len(tags):
+        tags[i] = rng.choice(TAGS)
+    elif mutation == 'add':
+        tags.insert(i, rng.choice(TAGS))
+    elif mutation == 'remove' and i < len(tags):
+        del tags[i]
+    return tags
+
+
+TAGS = sorted(parse.POS_CODES)
+
+
+# ************************************************************************************
+# The compiled PHRASE_MATCHERS must match exactly the tags their original regexes did, with the same groups
+class TestOriginalRegexes(unittest.TestCase):
+    def assertSameMatches(self, tags):
+        matches = dict((matcher['name'], regs) for matcher, regs in parse.matchPhrases(parse.ConstituentTable(
+            [parse.Constituent(tag, []) for tag in tags]).posCodes))
+        for matcher in parse.PHRASE_MATCHERS:
+            regs = matches.get(matcher['name'])
+            actual = dict((idx, list(span)) for idx, span in regs.items()) if regs is not None else None
+            self.assertEqual(actual, matchOriginal(matcher, tags), "{0} on {1}".format(matcher['name'], ' '.join(tags)))
+
+    def testSpaceBoundedWildcard(self):
+        # '^S .* SBAR' needs a tag between the S and the SBAR
+        self.assertSameMatches(['S', 'SBAR', 'WHNP', 'S', 'VP', 'NP', 'VP', 'NP'])
+        self.assertSameMatches(['S', 'NP', 'SBAR', 'WHNP', 'S', 'VP', 'NP', 'VP', 'NP'])
+
+    def testGenerated(self):
+        rng = random.Random(0)
+        sequences = 0
+        for matcher in parse.PHRASE_MATCHERS:
+            for i in range(300):
+                posStr = generate(rng, matcher['reg'])
+                if not posStr:
+                    continue
+                tags = re.findall(r"<([A-Z]+)>", posStr)
+                self.assertSameMatches(tags)
+                self.assertSameMatches(mutate(rng, tags))
+                sequences += 2
+        self.assertGreater(sequences, 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
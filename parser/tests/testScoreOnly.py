@@ -0,0 +1,65 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import StringIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+import parse
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data')
+
+# Parsed with the chunker alone, so neither the run nor the scoring needs link-grammar
+OPTIONS = {'backends': ['chunker']}
+
+
+# ************************************************************************************
+# "--score-only" (see parse.scorePuzzle) must give the same totals as the run which wrote parseActual.txt
+class TestScoreOnly(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.puzzle = os.path.join(self.dir, 'puzzle')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def quietly(self, function, *args, **kwargs):
+        stdout = sys.stdout
+        sys.stdout = StringIO.StringIO()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            sys.stdout = stdout
+
+    def writePuzzle(self, clues, expectedParses):
+        os.makedirs(self.puzzle)
+        parse.writeFile(os.path.join(self.puzzle, 'entities.txt'), 'names, colors\n\nGreg, Kim\nred, blue')
+        parse.writeFile(os.path.join(self.puzzle, 'clues.txt'), '\n'.join(clues))
+        parse.writeFile(os.path.join(self.puzzle, 'parseExpected.txt'), '\n'.join(expectedParses))
+
+    def testFailedClue(self):
+        # Clue 1 fails, and clue 2's (wrong) parse is clue 1's expected one. Clue 3 has no expected parse
+        self.writePuzzle(['Nobody said anything at all.', 'Greg is red.', 'Kim is blue.'], ['is(Greg, red)', 'is(Kim, blue)'])
+        counts = self.quietly(parse.main, self.puzzle, options=OPTIONS)
+        self.assertEqual(counts, [3, 1, 2])
+        self.assertEqual(self.quietly(parse.scorePuzzle, self.puzzle), counts)
+
+    def testCorpusPuzzle(self):
+        shutil.copytree(os.path.join(DATA_DIR, 'puzzlesEasy', 'puzzle03'), self.puzzle)
+        counts = self.quietly(parse.main, self.puzzle, options=OPTIONS)
+        self.assertEqual(self.quietly(parse.scorePuzzle, self.puzzle), counts)
+
+    def testUnrecorded(self):
+        # Without ACTUAL_CLUES_FILE, parseActual.txt can only be scored if every clue has a line in it
+        self.writePuzzle(['Nobody said anything at all.', 'Greg is red.'], ['is(Greg, red)', 'is(Kim, blue)'])
+        self.quietly(parse.main, self.puzzle, options=OPTIONS)
+        os.remove(os.path.join(self.puzzle, parse.ACTUAL_CLUES_FILE))
+        self.assertEqual(self.quietly(parse.scorePuzzle, self.puzzle), [0, 0, 0])
+
+        parse.writeFile(os.path.join(self.puzzle, 'parseActual.txt'), 'is(Greg, red)\nis(Greg, red)')
+        self.assertEqual(self.quietly(parse.scorePuzzle, self.puzzle), [2, 1, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()